@@ -1,28 +1,73 @@
+import functools
+import os
+import re
+import uuid
 import streamlit as st
-import time
 import pandas as pd
 import plotly.express as px
 from modules.data_handler import DataStreamer
-from modules.compliance_engine import ComplianceEngine
-from modules.stats_engine import calculate_benfords_law, get_performance_report, get_benford_interpretation
-from modules.pdf_export import generate_audit_pdf
+from modules.compliance_engine import ComplianceEngine, has_flag, with_flag_labels
+from modules.stats_engine import get_benford_interpretation
+from modules.pdf_export import ReportCache, generate_audit_pdf, report_key
+from modules.incident_log import IncidentLog
+from modules.live_stream import LiveStreamRuntime
+from modules.result_cache import StepSummaryCache, default_results_dir
+from modules.sketches import AccountSketchCache
+from modules import instrumentation
 
-# Session State Initialisierung
+# Aktualisierungstakt der Live-Ansicht (unabhängig von Scan-Verzögerung und Scoring-Dauer)
+UI_REFRESH_SECONDS = 0.5
+# Einzelauflistung im PDF begrenzen, weitere Incidents erscheinen verdichtet im Anhang
+PDF_MAX_ROWS = 5_000
+# Ziel für den JSONL-Export der Diagnose-Kennzahlen
+DIAGNOSTICS_LOG = "data/diagnostics.jsonl"
+# Ein Journal je Sitzung: Zurücksetzen darf nur das eigene Log löschen
+INCIDENT_LOG_DIR = "data/incidents"
+
+def incident_log_path():
+    """
+    Journal der aktuellen Sitzung. Die Kennung steht als Query-Parameter in der URL,
+    so stellt ein Neuladen bzw. ein Neustart des Servers das Log dieses Tabs wieder her.
+    """
+    journal = st.query_params.get("journal", "")
+    if not re.fullmatch(r"[0-9a-f]{32}", journal):
+        journal = uuid.uuid4().hex
+        st.query_params["journal"] = journal
+    return os.path.join(INCIDENT_LOG_DIR, f"{journal}.csv")
+
+# Session State Initialisierung (Log wird lokal gespeichert und übersteht einen Neustart)
 if 'incident_log' not in st.session_state:
-    st.session_state.incident_log = pd.DataFrame()
+    st.session_state.incident_log = IncidentLog(path=incident_log_path())
+if 'report_cache' not in st.session_state:
+    st.session_state.report_cache = ReportCache()
 
 st.set_page_config(page_title="Sentinel Audit Monitor", layout="wide")
 
 
 @st.cache_resource
 def get_resources():
-    streamer = DataStreamer("data/PS_20174392719_1491204439457_log.csv")
+    data_path = "data/PS_20174392719_1491204439457_log.csv"
+    streamer = DataStreamer(data_path)
     streamer.load_data()
-    return streamer, ComplianceEngine()
+    # Einzelprozess als Standard; mehr Worker erst nach Messung mit benchmarks/bench_parallel.py
+    engine = ComplianceEngine(workers=1)
+    # Kennzahlen je Step nur für angefragte Zeiträume berechnen und auf der Platte ablegen;
+    # Zeiträume werden per Präfixsumme beantwortet
+    summary_cache = StepSummaryCache(streamer, spill_dir=default_results_dir(data_path))
+    # Konten-Skizzen je Step (verschiedene Konten, Top-Empfänger), nur für angefragte Steps
+    sketch_cache = AccountSketchCache(streamer)
+    return streamer, engine, summary_cache, sketch_cache
 
-streamer, engine = get_resources()
+streamer, engine, summary_cache, sketch_cache = get_resources()
 
-tab_live, tab_stats = st.tabs(["📡 Live Monitoring", "📊 Statistische Revision"])
+# Diagnose-Reiter nur bei aktivierter Messung (SENTINEL_DIAGNOSTICS=1)
+tab_names = ["📡 Live Monitoring", "📊 Statistische Revision"]
+if instrumentation.is_enabled():
+    tab_names.append("🩺 Diagnose")
+# Mit Zustand: nur der gewählte Reiter wird ausgeführt (tab.open), die Revision rechnet
+# also nicht bei jeder Interaktion im Live-Reiter mit
+tabs = st.tabs(tab_names, key="active_tab", on_change="rerun")
+tab_live, tab_stats = tabs[0], tabs[1]
     
 with tab_live:
     with st.sidebar:
@@ -30,9 +75,19 @@ with tab_live:
         
         # SEKTION 1: LIVE MONITORING
         st.subheader("📡 Live-Monitoring Steuerung")
-        selected_step = st.slider("Simuliere Analyse für Step:", 1, 743, 1)
-        batch_speed = st.slider("Scan-Verzögerung (Sekunden):", 0.5, 10.0, 3.0)
+        replay_mode = st.radio("Modus:", ["Simulation", "Lasttest"], horizontal=True)
+        if replay_mode == "Simulation":
+            selected_step = st.slider("Simuliere Analyse für Step:", 1, 743, 1)
+            batch_speed = st.slider("Scan-Verzögerung (Sekunden):", 0.0, 10.0, 3.0)
+        else:
+            # Wiedergabe mit Ziel-Rate, um das Scoring unter Produktionslast zu prüfen
+            replay_steps = st.slider("Steps für den Replay:", streamer.min_step, streamer.max_step, (1, 5))
+            target_rate = st.number_input("Ziel-Rate (tx/s):", min_value=10, max_value=1_000_000, value=5_000, step=500)
+            batch_window = st.number_input("Batch-Fenster (Sekunden):", min_value=0.01, max_value=5.0, value=0.1, step=0.05)
+            replay_seed = st.number_input("Seed:", min_value=0, value=42, step=1)
         start_btn = st.button("Live Scan starten")
+        if st.button("Incident Log zurücksetzen"):
+            st.session_state.incident_log.clear()
         
         st.divider() # Optische Trennung
         
@@ -40,8 +95,8 @@ with tab_live:
         st.subheader("📊 Revisions-Filter")
         step_range = st.slider(
             "Zeitspanne wählen (Steps):",
-            min_value=int(streamer.df['step'].min()),
-            max_value=int(streamer.df['step'].max()),
+            min_value=streamer.min_step,
+            max_value=streamer.max_step,
             value=(1, 100)
         )
         st.info("Diese Filter gelten für den Reiter 'Statistische Revision'.")
@@ -54,41 +109,45 @@ with tab_live:
         if val == "MEDIUM": return 'background-color: rgba(255, 165, 0, 0.3)'
         return ''
 
-    if start_btn:
-        for batch in streamer.stream_generator(step=selected_step):
-            # Analyse durchführen
-            analyzed_batch = engine.process_batch(batch)
-            
-            # High Risk Daten extrahieren
-            current_high_risk = analyzed_batch[analyzed_batch['risk_level'] == "HIGH"].copy()
-            
-            if not current_high_risk.empty:
-                st.session_state.incident_log = pd.concat(
-                    [st.session_state.incident_log, current_high_risk], 
-                    ignore_index=True
-                ).drop_duplicates()
+    def on_batch(analyzed_batch):
+        # High Risk Daten extrahieren
+        current_high_risk = analyzed_batch[analyzed_batch['risk_level'] == "HIGH"]
+        
+        if not current_high_risk.empty:
+            # Append-only, Duplikate über Transaktions-Schlüssel (kein Kopieren des gesamten Logs)
+            st.session_state.incident_log.append(current_high_risk)
+
+    def render(snapshot):
+        batch = snapshot['batch']
+        analyzed_batch = snapshot['analyzed']
+
+        # Aufbau der Live-Ansicht inkl. Styler (Diagnose-Stufe ui.render_live)
+        with instrumentation.stage("ui.render_live", rows=len(batch)):
 
             # UI Aktualisierung
             with placeholder.container():
-                st.subheader(f"Echtzeit-Analyse - Step {selected_step}")
-                
+                if replay_mode == "Simulation":
+                    st.subheader(f"Echtzeit-Analyse - Step {selected_step}")
+                else:
+                    st.subheader(f"Lasttest - Steps {replay_steps[0]} bis {replay_steps[1]} ({target_rate:,} tx/s Ziel)")
+            
                 # Daten filtern für die Anzeige im aktuellen Batch
-                high_risk_count = len(current_high_risk)
-                
+                high_risk_count = snapshot['alerts']
+            
                 # KPIs
                 k1, k2, k3, k4 = st.columns(4)
                 k1.metric("Transaktionen", len(batch))
                 k2.metric("Volumen", f"{batch['amount'].sum():,.2f} €")
                 k3.metric("Kritische Warnungen", high_risk_count, delta_color="inverse")
-                k4.metric("Integritäts-Fehler", len(analyzed_batch[analyzed_batch['flags'].str.contains("INTEGRITY")]))
+                k4.metric("Integritäts-Fehler", int(has_flag(analyzed_batch, "INTEGRITY_ERROR", engine.rules).sum()))
 
-                # Haupttabelle
-                styled_df = analyzed_batch.style.map(
+                # Haupttabelle (Flags nur für die Anzeige in Klartext übersetzen)
+                styled_df = with_flag_labels(analyzed_batch, engine.rules).style.map(
                     highlight_risk, subset=['risk_level']
                 )
                 st.write("Alle eingehenden Transaktionen (Aktueller Stream):")
                 st.dataframe(styled_df, width="stretch", height=450)
-                
+            
                 # Aktueller Status-Alert
                 if high_risk_count > 0:
                     st.error(f"⚠️ {high_risk_count} High-Risk Transaktion(en) im aktuellen Batch identifiziert!")
@@ -99,89 +158,133 @@ with tab_live:
 
                 # DAS INCIDENT LOG (Die persistente Tabelle)
                 st.subheader("Historie der identifizierten Verdachtsfälle (Incident Log)")
-                
+            
                 if not st.session_state.incident_log.empty:
                     st.write("Diese Fälle müssen manuell durch einen Auditor geprüft werden:")
                     st.dataframe(
-                        st.session_state.incident_log, 
+                        with_flag_labels(st.session_state.incident_log.view(), engine.rules), 
                         width="stretch", 
                         height=350
                     )
                 else:
                     st.info("Bisher keine kritischen Vorfälle gespeichert.")
 
-                time.sleep(batch_speed)
+    if start_btn:
+        # Producer (Takt = Scan-Verzögerung) und Scoring laufen asynchron,
+        # die Oberfläche wird in festem Takt aktualisiert
+        # Konto-Historie (Velocity, TRANSFER->CASH_OUT-Ketten, Fan-In) gehört zu genau einem Scan:
+        # eigene zustandsbehaftete Engine je Scan, damit sich Sitzungen nicht gegenseitig stören
+        live_engine = ComplianceEngine(rules=engine.rules, stateful=True)
+        if replay_mode == "Simulation":
+            runtime = LiveStreamRuntime(live_engine, delay=batch_speed, refresh_interval=UI_REFRESH_SECONDS)
+            batches = streamer.stream_generator(step=selected_step)
+        else:
+            runtime = LiveStreamRuntime(live_engine, refresh_interval=UI_REFRESH_SECONDS)
+            batches = streamer.replay(*replay_steps, rate=target_rate, window=batch_window, seed=int(replay_seed))
+        stream_stats = runtime.run_sync(batches, on_batch=on_batch, on_update=render)
+        st.caption(
+            f"Scan beendet: {stream_stats['transactions']:,} Transaktionen in {stream_stats['elapsed_s']:.1f}s "
+            f"({stream_stats['tx_per_sec']:,.0f} tx/s), Alarm-Latenz Ø {stream_stats['alert_latency_ms_mean']:.1f} ms"
+        )
+        if replay_mode == "Lasttest":
+            replay_stats = batches.stats()
+            st.caption(
+                f"Replay: Ziel {replay_stats['target_rate']:,} tx/s, erreicht {replay_stats['achieved_rate']:,.0f} tx/s "
+                f"({(replay_stats['rate_ratio'] or 0) * 100:.1f}%) in {replay_stats['batches']:,} Batches"
+            )
 
 with tab_stats:
-    st.header("📊 Forensische Gesamtrevision")
-    
-    # --- FIX: FILTERLOGIK ANWENDEN ---
-    # Wir nehmen den Original-DF und filtern ihn sofort basierend auf der Sidebar
-    # step_range kommt aus deiner Sidebar: st.sidebar.slider(..., value=(1, 100))
-    audit_df = streamer.df[
-        (streamer.df['step'] >= step_range[0]) & 
-        (streamer.df['step'] <= step_range[1])
-    ]
+    if tab_stats.open:
+        st.header("📊 Forensische Gesamtrevision")
     
-    st.info(f"Analysierter Zeitraum: Step **{step_range[0]}** bis **{step_range[1]}** "
-            f"({len(audit_df):,} Transaktionen)")
-
-    # --- SEKTION 1: Mathematische Forensik ---
-    st.subheader("1. Benford's Law Analyse")
-    # WICHTIG: Nutze audit_df statt full_df
-    benford_df = calculate_benfords_law(audit_df['amount'])
-    fig_benford = px.bar(benford_df, x='Ziffer', y=['Tatsächlich', 'Benford'], barmode='group')
-    st.plotly_chart(fig_benford, use_container_width=True)
-
-    message, level = get_benford_interpretation(benford_df)
-    if level == "success": st.success(message)
-    elif level == "warning": st.warning(message)
-    else: st.error(message)
-
-    st.divider()
-
-    # --- SEKTION 2: Forensische Prüfung der Konten-Leerung ---
-    st.subheader("2. Audit-Check: Effizienz der 100%-Liquidation")
-    # WICHTIG: Nutze audit_df statt full_df
-    mask_100_percent = (audit_df['amount'] == audit_df['oldbalanceOrg']) & (audit_df['oldbalanceOrg'] > 0)
-    liquidation_df = audit_df[mask_100_percent].copy()
+        # --- FIX: FILTERLOGIK ANWENDEN ---
+        # Zeitraum aus der Sidebar als Slice über den Step-Index (kein Scan, keine Kopie)
+        # step_range kommt aus deiner Sidebar: st.sidebar.slider(..., value=(1, 100))
+        audit_df = streamer.get_step_range(*step_range)
+
+        @functools.cache
+        def step_summary():
+            """StepSummary des Zeitraums, erst beim ersten Zugriff im Lauf angefordert."""
+            # Bereits ausgewertete Steps (auch aus früheren Sitzungen) werden wiederverwendet
+            with st.spinner("Berechne Kennzahlen für den Zeitraum..."):
+                return summary_cache.summary(engine, *step_range)
     
-    tp_count = len(liquidation_df[liquidation_df['isFraud'] == 1])
-    fp_count = len(liquidation_df[liquidation_df['isFraud'] == 0])
-
-    plot_data = pd.DataFrame({
-        'Kategorie': ['Betrug (Volltreffer)', 'Legal (Fehlalarm)'],
-        'Anzahl': [tp_count, fp_count],
-        'Status': ['Fraud', 'Clean']
-    })
-
-    fig_liq_bar = px.bar(
-        plot_data, x='Anzahl', y='Kategorie', color='Status',
-        orientation='h', text='Anzahl',
-        title="Validierung der 100%-Liquidation-Regel (Zeitraum-spezifisch)",
-        color_discrete_map={'Fraud': '#ef553b', 'Clean': '#636efa'}
-    )
-    fig_liq_bar.update_traces(textposition='outside')
-    st.plotly_chart(fig_liq_bar, use_container_width=True)
-
-    # Abdeckung berechnen bezogen auf den Zeitraum
-    total_fraud_in_period = audit_df['isFraud'].sum()
-    fraud_coverage_pct = (tp_count / total_fraud_in_period) * 100 if total_fraud_in_period > 0 else 0
-
-    st.success(f"""
-    **Strategisches Audit-Fazit (Zeitraum):**
-    * **Präzision:** Die Regel isoliert **{tp_count:,}** Fraud-Fälle. 
-    * **Abdeckungsgrad:** Das sind **{fraud_coverage_pct:.1f}%** des Betrugs in diesem Zeitraum (**{total_fraud_in_period:,}** Fälle).
-    """)
-
-    # --- SEKTION 3: DIE GÜTEPRÜFUNG ---
-    st.divider()
-    st.subheader("3. Validierung der Kontroll-Güte")
+        st.info(f"Analysierter Zeitraum: Step **{step_range[0]}** bis **{step_range[1]}** "
+                f"({len(audit_df):,} Transaktionen)")
+
+        # --- SEKTION 1: Mathematische Forensik ---
+        st.subheader("1. Benford's Law Analyse")
+        n_digits = st.radio("Ziffern-Test:", [1, 2], horizontal=True,
+                            format_func=lambda n: "Erste Ziffer" if n == 1 else "Erste zwei Ziffern")
+        # Ziffernhäufigkeiten aus der vorberechneten Step-Summary (identisch zu calculate_benfords_law)
+        benford_df = step_summary().benford(*step_range, n_digits=n_digits)
+        fig_benford = px.bar(benford_df, x='Ziffer', y=['Tatsächlich', 'Benford'], barmode='group')
+        st.plotly_chart(fig_benford, use_container_width=True)
+
+        conformity = step_summary().benford_conformity(*step_range, n_digits=n_digits)
+        b1, b2, b3 = st.columns(3)
+        b1.metric("Chi-Quadrat", f"{conformity['chi2']:,.1f}",
+                  help=f"Kritischer Wert (5%, {conformity['dof']} FG): {conformity['chi2_critical']}")
+        b2.metric("MAD", f"{conformity['mad']:.4f}")
+        b3.metric("Nigrini-Einstufung", conformity['conformity'])
+
+        # Die Interpretation basiert immer auf dem Erste-Ziffer-Test
+        message, level = get_benford_interpretation(step_summary().benford(*step_range))
+        if level == "success": st.success(message)
+        elif level == "warning": st.warning(message)
+        else: st.error(message)
+
+        st.divider()
+
+        # --- SEKTION 2: Forensische Prüfung der Konten-Leerung ---
+        st.subheader("2. Audit-Check: Effizienz der 100%-Liquidation")
+        # TP/FP der Regel (amount == oldbalanceOrg > 0) aus der Step-Summary
+        liquidation = step_summary().liquidation(*step_range)
+        tp_count = liquidation['tp_count']
+        fp_count = liquidation['fp_count']
+
+        plot_data = pd.DataFrame({
+            'Kategorie': ['Betrug (Volltreffer)', 'Legal (Fehlalarm)'],
+            'Anzahl': [tp_count, fp_count],
+            'Status': ['Fraud', 'Clean']
+        })
+
+        fig_liq_bar = px.bar(
+            plot_data, x='Anzahl', y='Kategorie', color='Status',
+            orientation='h', text='Anzahl',
+            title="Validierung der 100%-Liquidation-Regel (Zeitraum-spezifisch)",
+            color_discrete_map={'Fraud': '#ef553b', 'Clean': '#636efa'}
+        )
+        fig_liq_bar.update_traces(textposition='outside')
+        st.plotly_chart(fig_liq_bar, use_container_width=True)
+
+        # Abdeckung berechnen bezogen auf den Zeitraum
+        total_fraud_in_period = liquidation['total_fraud']
+        fraud_coverage_pct = liquidation['coverage']
+
+        st.success(f"""
+        **Strategisches Audit-Fazit (Zeitraum):**
+        * **Präzision:** Die Regel isoliert **{tp_count:,}** Fraud-Fälle. 
+        * **Abdeckungsgrad:** Das sind **{fraud_coverage_pct:.1f}%** des Betrugs in diesem Zeitraum (**{total_fraud_in_period:,}** Fälle).
+        """)
+
+        # --- SEKTION 3: DIE GÜTEPRÜFUNG ---
+        st.divider()
+        st.subheader("3. Validierung der Kontroll-Güte")
     
-    if st.button("Detaillierte Audit-Validierung"):
-        with st.spinner("Berechne Risiko-Szenarien..."):
-            analyzed_audit = engine.process_batch(audit_df)
-            reports = get_performance_report(analyzed_audit)
+        # Ergebnis über Reruns hinweg halten (z.B. für den PDF-Export), gültig je Zeitraum und Regelsatz
+        validation_key = (tuple(step_range), summary_cache.key(engine))
+        if st.button("Detaillierte Audit-Validierung"):
+            with st.spinner("Berechne Risiko-Szenarien..."):
+                # Konfusionsmatrizen je Step stammen aus dem Ergebnis-Cache derselben Engine
+                st.session_state.validation = {
+                    "key": validation_key,
+                    "reports": step_summary().performance_report(*step_range)
+                }
+        validation = st.session_state.get('validation')
+        reports = validation['reports'] if validation and validation['key'] == validation_key else None
+
+        if reports is not None:
             total_tx = reports['total_count']
 
             # --- REIHE 1: STANDARD ---
@@ -206,7 +309,7 @@ with tab_stats:
                 st.plotly_chart(fig2, use_container_width=True)
 
             # --- REIHE 2: HIGH CONFIDENCE ---
-            st.subheader("Szenario B: High-Confidence Audit (Score >= 55)")
+            st.subheader(f"Szenario B: High-Confidence Audit (Score >= {engine.rules.high_confidence_score})")
             h = reports['high_confidence']
             col3, col4 = st.columns(2)
             with col3:
@@ -230,46 +333,142 @@ with tab_stats:
             st.divider()
             m1, m2, m3 = st.columns(3)
             m1.metric("Recall-Verlust", f"{(s['recall'] - h['recall'])*100:.1f}% weniger Treffer", delta_color="inverse")
-            
+        
             total_saved = (s['tp']+s['fp']) - (h['tp']+h['fp'])
             m2.metric("Eingesparte Alarme", f"{total_saved:,}")
-            
+        
             reduction_pct = (total_saved / (s['tp']+s['fp']) * 100) if (s['tp']+s['fp']) > 0 else 0
             m3.metric("Effizienz-Steigerung", f"-{reduction_pct:.1f}% Aufwand")
 
             st.success(f"Strategie-Check: Durch den Fokus auf High-Confidence Fälle reduzieren wir die Prüflast um **{reduction_pct:.1f}%**.")
     
-    # --- PDF EXPORT BUTTON ---
-    st.divider()
-    st.subheader("📑 Finaler Audit-Export")
-
-    if 'reports' in locals() and 'tp_count' in locals():
-        # Alle notwendigen Daten für die Funktion bündeln
-        liq_data = {
-            "tp_count": tp_count,
-            "coverage": fraud_coverage_pct,
-            "total_fraud": total_fraud_in_period
-        }
-        
-        try:
-            # PDF generieren
-            pdf_bytes = generate_audit_pdf(
-                st.session_state.incident_log, 
-                reports, 
-                step_range, 
-                liq_data
+        # --- SEKTION 4: SCHWELLEN-ANALYSE ---
+        st.divider()
+        st.subheader("4. Schwellen-Analyse (frei wählbarer Cutoff)")
+        # Alle Schwellen in einem Durchgang aus den Score-Histogrammen der Step-Summary
+        sweep = step_summary().threshold_sweep(*step_range)
+        sweep = sweep[sweep['alerts'] > 0]
+
+        if not sweep.empty:
+            min_cutoff, max_cutoff = int(sweep['threshold'].min()), int(sweep['threshold'].max())
+            if min_cutoff < max_cutoff:
+                cutoff = st.slider(
+                    "Alarm ab Risk-Score:", min_cutoff, max_cutoff,
+                    min(max(engine.rules.high_confidence_score, min_cutoff), max_cutoff)
+                )
+            else:
+                # Nur eine Schwelle mit Alarmen: st.slider verlangt min < max
+                cutoff = min_cutoff
+                st.caption(f"Alarme nur ab Risk-Score {cutoff}, kein alternativer Cutoff im Zeitraum.")
+            curve = sweep.rename(columns={'precision': 'Precision', 'recall': 'Recall', 'alert_rate': 'Alarmquote'})
+            fig_sweep = px.line(
+                curve, x='threshold', y=['Precision', 'Recall', 'Alarmquote'], line_shape='hv',
+                labels={'threshold': 'Risk-Score-Schwelle', 'value': 'Anteil', 'variable': 'Kennzahl'},
+                title="Precision, Recall und Alarmlast je Schwelle"
             )
+            fig_sweep.add_vline(x=cutoff, line_dash="dash")
+            st.plotly_chart(fig_sweep, use_container_width=True)
+
+            selected = sweep.set_index('threshold').loc[cutoff]
+            t1, t2, t3, t4 = st.columns(4)
+            t1.metric("Precision", f"{selected['precision'] * 100:.1f}%")
+            t2.metric("Recall", f"{selected['recall'] * 100:.1f}%")
+            t3.metric("Alarme", f"{int(selected['alerts']):,}")
+            t4.metric("Übersehene Betrugsfälle", f"{int(selected['fn']):,}")
+        else:
+            st.info("Keine Transaktionen im gewählten Zeitraum.")
+
+        # --- SEKTION 5: KONTEN-ANALYSE ---
+        st.divider()
+        st.subheader("5. Konten-Analyse (Näherung über Skizzen)")
+        with st.spinner("Berechne Konten-Skizzen für den Zeitraum..."):
+            accounts = sketch_cache.range(*step_range)
+
+        a1, a2, a3, a4 = st.columns(4)
+        a1.metric("Auftraggeber-Konten", f"≈ {accounts.distinct_origins:,.0f}")
+        a2.metric("Empfänger-Konten", f"≈ {accounts.distinct_destinations:,.0f}")
+        a3.metric("Konten in Betrugsfällen", f"≈ {accounts.fraud_accounts:,.0f}")
+        a4.metric("Wiederverwendung (Betrug)", f"{accounts.fraud_reuse:.2f}x",
+                  help="Auftritte je beteiligtem Konto in Betrugsfällen (1,00 = jedes Konto nur einmal)")
+        st.caption("Verschiedene Konten per HyperLogLog (Standardfehler ca. 1,6 %).")
+
+        top_cols = st.columns(2)
+        for col, (summary, title, unit) in zip(top_cols, (
+                (accounts.dest_count, "Top-Empfänger nach Anzahl", "Transaktionen"),
+                (accounts.dest_volume, "Top-Empfänger nach Volumen", "Volumen (€)"))):
+            with col:
+                st.write(f"**{title}**")
+                top = summary.top(10).rename(columns={
+                    'account': 'Konto', 'estimate': unit, 'upper_bound': 'Obergrenze'})
+                st.dataframe(top, width="stretch", hide_index=True)
+                st.caption(f"Nicht gelistete Konten: höchstens {summary.threshold:,.0f} (Space-Saving-Schranke).")
+
+        # --- PDF EXPORT BUTTON ---
+        st.divider()
+        st.subheader("📑 Finaler Audit-Export")
+
+        if reports is not None:
+            # Alle notwendigen Daten für die Funktion bündeln
+            liq_data = {
+                "tp_count": tp_count,
+                "coverage": fraud_coverage_pct,
+                "total_fraud": total_fraud_in_period
+            }
+        
+            try:
+                # PDF nur neu erzeugen, wenn sich Log, Zeitraum oder Kennzahlen geändert haben
+                incident_log = st.session_state.incident_log
+                pdf_bytes = st.session_state.report_cache.get_or_build(
+                    report_key(incident_log.version, step_range, reports, liq_data,
+                               rules=engine.rules, max_rows=PDF_MAX_ROWS),
+                    lambda: generate_audit_pdf(
+                        incident_log.view(),
+                        reports,
+                        step_range,
+                        liq_data,
+                        rules=engine.rules,
+                        max_rows=PDF_MAX_ROWS
+                    )
+                )
             
-            # Download Button anzeigen
-            st.download_button(
-                label="📥 Vollständigen Audit-Bericht (PDF) exportieren",
-                data=pdf_bytes,
-                file_name=f"Audit_Report_Steps_{step_range[0]}_{step_range[1]}.pdf",
-                mime="application/pdf",
-                use_container_width=True
-            )
-        except Exception as e:
-            st.error(f"Fehler im Export-Modul: {e}")
-            # Debugging Hilfe: st.write(e) 
-    else:
-        st.info("💡 Führe erst die 'Detaillierte Audit-Validierung' durch, um den Bericht zu generieren.")
\ No newline at end of file
+                # Download Button anzeigen
+                st.download_button(
+                    label="📥 Vollständigen Audit-Bericht (PDF) exportieren",
+                    data=pdf_bytes,
+                    file_name=f"Audit_Report_Steps_{step_range[0]}_{step_range[1]}.pdf",
+                    mime="application/pdf",
+                    use_container_width=True
+                )
+            except Exception as e:
+                st.error(f"Fehler im Export-Modul: {e}")
+                # Debugging Hilfe: st.write(e) 
+        else:
+            st.info("💡 Führe erst die 'Detaillierte Audit-Validierung' durch, um den Bericht zu generieren.")
+
+if instrumentation.is_enabled():
+    with tabs[2]:
+        st.header("🩺 Laufzeit-Diagnose")
+        st.caption("Latenz je Stufe seit Start bzw. letztem Zurücksetzen (Perzentile aus logarithmischen Buckets).")
+        records = instrumentation.snapshot()
+        peak_rss = instrumentation.process_peak_rss_mb()
+        if peak_rss is not None:
+            st.metric("Speicher-Hochwasser (Prozess)", f"{peak_rss:,.0f} MiB",
+                      help="ru_maxrss des Server-Prozesses seit dem Start, gilt für alle Stufen gemeinsam")
+
+        if records:
+            diag_df = pd.DataFrame(records)
+            st.dataframe(diag_df, width="stretch", hide_index=True)
+            fig_diag = px.bar(diag_df, x='stage', y=['p50_ms', 'p95_ms', 'p99_ms'], barmode='group', log_y=True,
+                              labels={'stage': 'Stufe', 'value': 'Latenz (ms)', 'variable': 'Perzentil'})
+            st.plotly_chart(fig_diag, use_container_width=True)
+
+            d1, d2, d3 = st.columns(3)
+            d1.download_button("📥 Kennzahlen als JSONL", instrumentation.to_jsonl(records),
+                               file_name="diagnostics.jsonl", mime="application/x-ndjson")
+            if d2.button(f"An {DIAGNOSTICS_LOG} anhängen"):
+                instrumentation.export_jsonl(DIAGNOSTICS_LOG)
+                st.success(f"Kennzahlen an {DIAGNOSTICS_LOG} angehängt.")
+            if d3.button("Messwerte zurücksetzen"):
+                instrumentation.reset()
+        else:
+            st.info("Noch keine Messwerte aufgezeichnet.")
@@ -0,0 +1,65 @@
+"""
+Revision ohne Oberfläche (z.B. als nächtlicher Lauf über einen ganzen Monat).
+Lädt die Quelle, bewertet den Zeitraum mit dem Regelsatz, berechnet Güte- und
+Benford-Kennzahlen und schreibt den Audit-Bericht als PDF.
+
+    python audit.py data/PS_20174392719_1491204439457_log.csv --steps 1 743 --out audit.pdf --workers 4
+"""
+import argparse
+import json
+import sys
+import time
+
+from modules.batch_audit import run_batch_audit
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("source", help="Transaktions-CSV im PaySim-Format")
+    parser.add_argument("--steps", type=int, nargs=2, default=None, metavar=("VON", "BIS"),
+                        help="Zeitraum in Stunden (Standard: gesamter Datensatz)")
+    parser.add_argument("--rules", default=None, help="Regel-Konfiguration (Standard: config/rules.json)")
+    parser.add_argument("--out", default=None, help="Pfad des PDF-Berichts")
+    parser.add_argument("--json", default=None, help="Kennzahlen zusätzlich als JSON ablegen")
+    parser.add_argument("--workers", type=int, default=1, help="Anzahl Prozesse")
+    parser.add_argument("--shards", type=int, default=None, help="Anzahl Step-Partitionen (Standard: 2 je Worker)")
+    parser.add_argument("--chunk-rows", type=int, default=1_000_000)
+    parser.add_argument("--pdf-max-rows", type=int, default=5_000, help="Einzelauflistung im PDF begrenzen")
+    parser.add_argument("--cache-dir", default=None, help="Ort des Spalten-Caches (Standard: neben der Quelle)")
+    parser.add_argument("-q", "--quiet", action="store_true")
+    args = parser.parse_args(argv)
+
+    log = (lambda message: None) if args.quiet else print
+    start = time.perf_counter()
+    try:
+        result = run_batch_audit(
+            args.source, steps=args.steps, rules_path=args.rules, workers=args.workers,
+            shards=args.shards, chunk_rows=args.chunk_rows, pdf_path=args.out,
+            pdf_max_rows=args.pdf_max_rows, cache_dir=args.cache_dir, log=log
+        )
+    except (OSError, ValueError) as e:
+        print(f"Fehler: {e}", file=sys.stderr)
+        return 2
+    elapsed = time.perf_counter() - start
+
+    reports, liquidation, benford = result["reports"], result["liquidation"], result["benford"]
+    log(f"Transaktionen:       {result['rows']:,} (Steps {result['steps'][0]}-{result['steps'][1]})")
+    log(f"Incidents (HIGH):    {result['incidents']:,}")
+    for name, label in (("standard", "Standard"), ("high_confidence", "High-Confidence")):
+        r = reports[name]
+        log(f"{label + ':':<20} Recall {r['recall'] * 100:5.1f}% | Precision {r['precision'] * 100:5.1f}% | "
+            f"TP {r['tp']:,} FP {r['fp']:,} FN {r['fn']:,}")
+    log(f"Liquidation-Regel:   {liquidation['tp_count']:,} Fälle ({liquidation['coverage']:.1f}% des Betrugs)")
+    log(f"Benford (1. Ziffer): MAD {benford['mad']:.4f} ({benford['conformity']})")
+    log(f"Laufzeit:            {elapsed:.1f} s ({result['rows'] / max(elapsed, 1e-9):,.0f} Zeilen/s)")
+
+    if args.json:
+        payload = {key: result[key] for key in ("source", "steps", "rows", "incidents", "shards", "workers",
+                                                "reports", "liquidation", "benford", "pdf_path", "timings")}
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+"""
+Kosten der zustandsbehafteten Regeln je Transaktion.
+Spielt die Steps eines Datensatzes in Stream-Reihenfolge ab und misst die Zustands-
+Aktualisierung (AccountState.evaluate) getrennt vom zeilenweisen Scoring.
+
+    python benchmarks/bench_account_state.py data/PS_20174392719_1491204439457_log.csv --steps 1 48
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.compliance_engine import ComplianceEngine
+from modules.data_handler import DataStreamer
+from modules.rule_registry import RuleRegistry
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("csv")
+    parser.add_argument("--steps", type=int, nargs=2, default=(1, 48))
+    parser.add_argument("--batch-size", type=int, default=1_000)
+    parser.add_argument("--capacity", type=int, default=None, help="überschreibt account_state.capacity")
+    args = parser.parse_args()
+
+    streamer = DataStreamer(args.csv)
+    streamer.load_data()
+    rules = RuleRegistry.from_file()
+    if args.capacity:
+        limits = rules.config.account_state.model_copy(update={"capacity": args.capacity})
+        rules = RuleRegistry(rules.config.model_copy(update={"account_state": limits}))
+    engine = ComplianceEngine(rules=rules, stateful=True)
+    state = engine.account_state
+
+    rows = 0
+    state_s = score_s = 0.0
+    for batch in streamer.replay(*args.steps, batch_size=args.batch_size, shuffle=False):
+        t0 = time.perf_counter()
+        engine.score_batch(batch)
+        t1 = time.perf_counter()
+        state.evaluate(batch)
+        t2 = time.perf_counter()
+        score_s += t1 - t0
+        state_s += t2 - t1
+        rows += len(batch)
+
+    stats = state.stats()
+    print(f"Transaktionen:        {rows:,}")
+    print(f"Zustand je Tx:        {state_s / rows * 1e6:.2f} µs ({rows / state_s:,.0f} tx/s)")
+    print(f"Zeilen-Regeln je Tx:  {score_s / rows * 1e6:.2f} µs")
+    print(f"Konten im Zustand:    {stats['accounts']:,} / {stats['capacity']:,} "
+          f"(verdrängt {stats['evicted']:,}, verfallen {stats['expired']:,})")
+    print(f"Slot-Speicher:        {stats['nbytes'] / 2**20:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Erste Ziffer(n) für die Benford-Analyse: numerischer Kern (leading_digit_counts, log10/floor,
+blockweise) gegen die frühere String-Extraktion (astype(str).str[0]) auf denselben Beträgen.
+Die String-Variante kennt nur die erste Ziffer und verliert Beträge unter 1; verglichen
+wird daher auf Beträgen >= 1. Ohne CSV wird ein synthetischer Datensatz erzeugt.
+
+    python benchmarks/bench_benford.py data/PS_20174392719_1491204439457_log.csv
+    python benchmarks/bench_benford.py --rows 2000000
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from bench_scoring import best_of
+from modules.data_handler import DataStreamer
+from modules.stats_engine import leading_digit_counts
+from modules.synthetic_data import generate_paysim
+
+
+def string_counts(amounts):
+    """Frühere Extraktion über temporäre Python-Strings (nur erste Ziffer)."""
+    digits = amounts.astype(str).str[0].astype(int)
+    return np.bincount(digits[digits > 0], minlength=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("csv", nargs="?", default=None)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.csv:
+        streamer = DataStreamer(args.csv)
+        streamer.load_data()
+        amounts = streamer.df['amount']
+    else:
+        amounts = generate_paysim(args.rows, seed=args.seed)['amount']
+    comparable = amounts[amounts >= 1]
+
+    str_s, by_string = best_of(lambda: string_counts(comparable), 1)
+    num_s, numeric = best_of(lambda: leading_digit_counts(comparable.to_numpy()), args.repeat)
+    two_s, _ = best_of(lambda: leading_digit_counts(amounts.to_numpy(), n_digits=2), args.repeat)
+    identical = np.array_equal(by_string, numeric)
+
+    print(f"Beträge:          {len(amounts):,} ({len(amounts) - len(comparable):,} unter 1)")
+    print(f"String-basiert:   {len(comparable) / str_s:14,.0f} Zeilen/s")
+    print(f"log10/floor:      {len(comparable) / num_s:14,.0f} Zeilen/s ({str_s / num_s:.0f}x)")
+    print(f"Zwei Ziffern:     {len(amounts) / two_s:14,.0f} Zeilen/s")
+    print(f"Parität (>= 1):  {'identisch' if identical else 'ABWEICHUNG'}")
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""
+Live-Scan unter Last: dauerhafter Durchsatz des LiveStreamRuntime ohne Verzögerung
+(delay=0) und End-to-End-Latenz vom Ausgeben eines Batches bis zum Alarm.
+Zum Vergleich läuft dieselbe Batch-Folge direkt durch ComplianceEngine.process_batch
+(ohne Queue und Hilfsthread). Ohne CSV wird ein synthetischer Datensatz erzeugt und wie
+in der App über den Spalten-Cache des DataStreamer geladen.
+
+    python benchmarks/bench_live_stream.py data/PS_20174392719_1491204439457_log.csv --steps 1 20
+    python benchmarks/bench_live_stream.py --rows 2000000 --steps 1 20
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.compliance_engine import ComplianceEngine
+from modules.data_handler import DataStreamer, StreamReplay
+from modules.live_stream import LiveStreamRuntime
+from modules.synthetic_data import write_paysim_csv
+
+
+def load_steps(csv, steps):
+    """DataFrame und Zeilenbereiche je Step für die Steps aus --steps."""
+    streamer = DataStreamer(csv)
+    streamer.load_data()
+    return streamer.df, [streamer.step_rows(step, step) for step in range(steps[0], steps[1] + 1)]
+
+
+def direct(engine, replay):
+    """Gleiche Batches ohne Runtime: reine Scoring-Kosten je Batch."""
+    start = time.perf_counter()
+    rows = sum(len(engine.process_batch(batch)) for batch in replay)
+    return rows / (time.perf_counter() - start)
+
+
+def print_stats(label, stats):
+    print(f"{label:<28} {stats['tx_per_sec']:>10,.0f} tx/s  {stats['batches']:>7,} Batches  "
+          f"Alarm-Latenz Ø {stats['alert_latency_ms_mean']:7.2f} ms  p95 {stats['alert_latency_ms_p95']:7.2f} ms  "
+          f"max {stats['alert_latency_ms_max']:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("csv", nargs="?", default=None)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--steps", type=int, nargs=2, default=(1, 20))
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[10, 100, 1_000])
+    parser.add_argument("--rate", type=int, default=5_000, help="Ziel-Rate für die Latenzmessung (tx/s)")
+    parser.add_argument("--window", type=float, default=0.1, help="Batch-Fenster bei --rate (Sekunden)")
+    args = parser.parse_args()
+
+    if args.csv:
+        df, bounds = load_steps(args.csv, args.steps)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            df, bounds = load_steps(write_paysim_csv(os.path.join(tmp, "paysim.csv"), args.rows, seed=args.seed),
+                                    args.steps)
+            df = df.copy()
+    engine = ComplianceEngine()
+    print(f"Transaktionen:              {sum(b - a for a, b in bounds):,} (Steps {args.steps[0]}-{args.steps[1]})")
+
+    # Dauerlast: delay=0, der Producer wartet nur auf freie Plätze in der Queue
+    runtime = LiveStreamRuntime(engine, delay=0.0)
+    for size in args.batch_sizes:
+        replay = StreamReplay(df, bounds, batch_size=size, seed=args.seed)
+        print(f"{'process_batch direkt':<28} {direct(engine, replay):>10,.0f} tx/s  (Batch {size:,})")
+        print_stats(f"Runtime delay=0 (Batch {size:,})", runtime.run_sync(replay))
+
+    # Latenz bei Ziel-Rate: Batches kommen im Takt des Fensters, die Queue bleibt leer
+    replay = StreamReplay(df, bounds, rate=args.rate, window=args.window, seed=args.seed)
+    stats = runtime.run_sync(replay)
+    print_stats(f"Runtime {args.rate:,} tx/s", stats)
+    replay_stats = replay.stats()
+    print(f"{'':<28} erreicht {replay_stats['achieved_rate']:,.0f} tx/s "
+          f"({(replay_stats['rate_ratio'] or 0) * 100:.1f}% der Ziel-Rate)")
+
+
+if __name__ == "__main__":
+    main()
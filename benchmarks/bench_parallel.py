@@ -0,0 +1,63 @@
+"""
+Skalierung der parallelen Bewertung: score_batch im Einzelprozess gegen
+score_batch_parallel mit 1, 2, 4 und 8 Workern auf demselben Batch, inklusive
+Paritätsprüfung. Ohne CSV wird ein synthetischer Datensatz erzeugt.
+
+    python benchmarks/bench_parallel.py data/PS_20174392719_1491204439457_log.csv --rows 2000000
+    python benchmarks/bench_parallel.py --rows 1000000 --workers 1 2 4 8
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from bench_scoring import best_of
+from modules.compliance_engine import ComplianceEngine
+from modules.data_handler import DataStreamer
+from modules.synthetic_data import generate_paysim
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("csv", nargs="?", default=None)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    if args.csv:
+        streamer = DataStreamer(args.csv)
+        streamer.load_data()
+        df = streamer.df.iloc[:args.rows]
+    else:
+        df = generate_paysim(args.rows, seed=args.seed)
+    engine = ComplianceEngine()
+
+    base_s, expected = best_of(lambda: engine.score_batch(df), args.repeat)
+    print(f"Transaktionen:   {len(df):,} (CPUs: {os.cpu_count()})")
+    print(f"{'Einzelprozess:':<16} {len(df) / base_s:12,.0f} Zeilen/s")
+
+    identical = True
+    try:
+        for workers in args.workers:
+            # Erster Aufruf startet den Pool und ist nicht Teil der Messung
+            engine.score_batch_parallel(df, workers)
+            seconds, result = best_of(lambda: engine.score_batch_parallel(df, workers), args.repeat)
+            same = all(np.array_equal(expected[c].to_numpy(), result[c].to_numpy())
+                       for c in ("risk_score", "risk_level", "flags"))
+            identical &= same
+            print(f"{f'{workers} Worker:':<16} {len(df) / seconds:12,.0f} Zeilen/s "
+                  f"({base_s / seconds:.2f}x){'' if same else '  ABWEICHUNG'}")
+    finally:
+        engine.close()
+
+    print(f"Parität:         {'identisch' if identical else 'ABWEICHUNG'}")
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
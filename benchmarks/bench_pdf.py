@@ -0,0 +1,48 @@
+"""
+Laufzeit und Größe des Audit-PDFs bei 1k/10k/100k Incidents.
+Die Incidents stammen aus einem bewerteten synthetischen Datensatz; gemessen wird
+generate_audit_pdf ohne Begrenzung und mit der Standard-Begrenzung des Batch-Audits.
+
+    python benchmarks/bench_pdf.py --sizes 1000 10000 100000
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_scoring import best_of
+from modules.compliance_engine import ComplianceEngine
+from modules.pdf_export import generate_audit_pdf
+from modules.stats_engine import get_performance_report
+from modules.synthetic_data import generate_paysim
+
+LIQ = {"tp_count": 0, "coverage": 0.0, "total_fraud": 0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--max-rows", type=int, default=5_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    engine = ComplianceEngine()
+    analyzed = engine.process_batch(generate_paysim(max(args.sizes), seed=args.seed))
+    stats = get_performance_report(analyzed, engine.rules.high_confidence_score)
+
+    print(f"{'Incidents':>10} {'Limit':>8} {'Zeit':>10} {'Zeilen/s':>12} {'Größe':>10}")
+    for size in args.sizes:
+        incidents = analyzed.head(size)
+        for max_rows in (None, args.max_rows):
+            if max_rows is not None and max_rows >= size:
+                continue
+            seconds, pdf = best_of(lambda: generate_audit_pdf(incidents, stats, (1, 743), LIQ,
+                                                              rules=engine.rules, max_rows=max_rows), args.repeat)
+            limit = "-" if max_rows is None else f"{max_rows:,}"
+            print(f"{size:>10,} {limit:>8} {seconds:>9.2f}s {size / seconds:>12,.0f} {len(pdf) / 1024:>8,.0f}KB")
+
+
+if __name__ == "__main__":
+    main()
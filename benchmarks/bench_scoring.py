@@ -0,0 +1,61 @@
+"""
+Durchsatz der Bewertung: zeilenweise Prüfung (check_transaction) gegen die spaltenweise
+Auswertung (score_batch) auf denselben Zeilen, inklusive Paritätsprüfung.
+Ohne CSV wird ein synthetischer Datensatz erzeugt.
+
+    python benchmarks/bench_scoring.py data/PS_20174392719_1491204439457_log.csv --rows 50000
+    python benchmarks/bench_scoring.py --rows 50000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from modules.compliance_engine import ComplianceEngine
+from modules.data_handler import DataStreamer
+from modules.synthetic_data import generate_paysim
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("csv", nargs="?", default=None)
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.csv:
+        streamer = DataStreamer(args.csv)
+        streamer.load_data()
+        df = streamer.df.iloc[:args.rows]
+    else:
+        df = generate_paysim(args.rows, seed=args.seed)
+    engine = ComplianceEngine()
+
+    row_s, row_wise = best_of(lambda: engine.process_batch(df, vectorized=False), 1)
+    col_s, columnar = best_of(lambda: engine.process_batch(df), args.repeat)
+    identical = all(np.array_equal(row_wise[c].to_numpy(), columnar[c].to_numpy())
+                    for c in ("risk_score", "risk_level", "flags"))
+
+    print(f"Transaktionen:   {len(df):,}")
+    print(f"Zeilenweise:     {len(df) / row_s:12,.0f} Zeilen/s")
+    print(f"Spaltenweise:    {len(df) / col_s:12,.0f} Zeilen/s ({row_s / col_s:.0f}x)")
+    print(f"Parität:         {'identisch' if identical else 'ABWEICHUNG'}")
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
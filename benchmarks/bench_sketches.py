@@ -0,0 +1,90 @@
+"""
+Genauigkeit und Kosten der Konten-Skizzen im Vergleich zur exakten Auswertung.
+Baut die Skizzen für einen Zeitraum wie die App über den AccountSketchCache auf und
+vergleicht verschiedene Konten (HyperLogLog) sowie die Top-Empfänger nach Anzahl und
+Volumen (Space-Saving) mit pandas nunique/groupby auf denselben Zeilen.
+
+    python benchmarks/bench_sketches.py data/PS_20174392719_1491204439457_log.csv --steps 1 743
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from modules.data_handler import DataStreamer
+from modules.sketches import AccountSketchCache
+
+
+def top_overlap(estimated, exact, n):
+    """Anteil der exakten Top-n, die auch in den geschätzten Top-n stehen."""
+    return len(set(estimated['account'][:n]) & set(exact.index[:n])) / max(min(n, len(exact)), 1)
+
+def relative_error(estimate, exact):
+    return abs(estimate - exact) / exact if exact else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("csv")
+    parser.add_argument("--steps", type=int, nargs=2, default=(1, 743))
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    streamer = DataStreamer(args.csv)
+    streamer.load_data()
+    lo, hi = args.steps
+    frame = streamer.get_step_range(lo, hi)
+
+    start = time.perf_counter()
+    cache = AccountSketchCache(streamer)
+    cache.range(lo, hi)
+    build_s = time.perf_counter() - start
+    start = time.perf_counter()
+    result = cache.range(lo, hi)
+    query_s = time.perf_counter() - start
+    sketches = cache.sketches
+
+    start = time.perf_counter()
+    names = frame[['nameOrig', 'nameDest']].astype(object)
+    fraud = frame[frame['isFraud'] == 1]
+    fraud_names = fraud[['nameOrig', 'nameDest']].astype(object)
+    exact = {
+        "distinct_origins": names['nameOrig'].nunique(),
+        "distinct_destinations": names['nameDest'].nunique(),
+        "distinct_accounts": pd.unique(names.to_numpy().ravel()).size,
+        "fraud_accounts": pd.unique(fraud_names.to_numpy().ravel()).size,
+    }
+    by_dest = frame.assign(nameDest=names['nameDest']).groupby('nameDest')['amount']
+    exact_count = by_dest.size().sort_values(ascending=False, kind='stable')
+    exact_volume = by_dest.sum().sort_values(ascending=False, kind='stable')
+    exact_s = time.perf_counter() - start
+
+    print(f"Transaktionen:          {len(frame):,} (Steps {lo}-{hi})")
+    print(f"Skizzen aufbauen:       {build_s:.2f} s, Zeitraum-Abfrage {query_s * 1000:.1f} ms")
+    print(f"Exakte Auswertung:      {exact_s:.2f} s")
+    estimates = result.as_dict()
+    for key, value in exact.items():
+        print(f"{key + ':':<24}{estimates[key]:>12,.0f} geschätzt / {value:>12,} exakt "
+              f"({relative_error(estimates[key], value) * 100:.2f}% Abweichung)")
+
+    for label, summary, reference in (("Anzahl", result.dest_count, exact_count),
+                                      ("Volumen", result.dest_volume, exact_volume)):
+        top = summary.top(args.top)
+        true_values = reference.reindex(top['account']).to_numpy()
+        within = np.all((top['estimate'].to_numpy() <= true_values + 1e-6)
+                        & (true_values <= top['upper_bound'].to_numpy() + 1e-6))
+        print(f"Top-{args.top} Empfänger ({label}): {top_overlap(top, reference, args.top) * 100:.0f}% Übereinstimmung, "
+              f"Schranken {'eingehalten' if within else 'VERLETZT'}, "
+              f"max. Unterschätzung {np.max(true_values - top['estimate'].to_numpy()):,.2f}")
+    summaries = sketches.dest_count + sketches.dest_volume + [s for pair in cache._blocks.values() for s in pair]
+    size = sketches.registers.nbytes + sum(len(s) for s in summaries if s) * 24
+    print(f"Speicher der Skizzen:   ~{size / 2**20:.1f} MiB für {len(sketches.registers)} Steps")
+
+
+if __name__ == "__main__":
+    main()
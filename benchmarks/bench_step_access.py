@@ -0,0 +1,57 @@
+"""
+Zugriff auf einzelne Steps: boolescher Filter über den ganzen Datensatz im Vergleich
+zum Step-Index (get_step_data). Beide Varianten laufen über alle Steps des Datensatzes,
+die Ergebnisse werden je Step verglichen.
+
+    python benchmarks/bench_step_access.py data/PS_20174392719_1491204439457_log.csv
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.data_handler import DataStreamer
+
+
+def scan_step(df, step):
+    """Bisheriger Zugriff: Vergleich über alle Zeilen, Ergebnis als Kopie."""
+    return df[df['step'] == step]
+
+
+def run(fn, steps, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = sum(len(fn(step)) for step in steps)
+        best = min(best, time.perf_counter() - start)
+    return best, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("csv")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    streamer = DataStreamer(args.csv)
+    streamer.load_data()
+    df = streamer.df
+    steps = range(streamer.min_step, streamer.max_step + 1)
+
+    for step in steps:
+        assert (scan_step(df, step).index == streamer.get_step_data(step).index).all(), step
+
+    scan_s, scan_rows = run(lambda step: scan_step(df, step), steps, args.repeat)
+    index_s, index_rows = run(streamer.get_step_data, steps, args.repeat)
+    assert scan_rows == index_rows == len(df)
+
+    print(f"Transaktionen:          {len(df):,} ({len(steps)} Steps)")
+    print(f"Boolescher Filter:      {scan_s:8.3f} s ({scan_s / len(steps) * 1e6:8.1f} us/Step)")
+    print(f"Step-Index:             {index_s:8.3f} s ({index_s / len(steps) * 1e6:8.1f} us/Step)")
+    print(f"Beschleunigung:         {scan_s / index_s:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Schwellen-Analyse im Vergleich zur Auswertung der zwei festen Szenarien.
+Misst auf demselben bewerteten Zeitraum get_performance_report (zwei Szenarien),
+threshold_sweep (alle Schwellen) und StepSummary.threshold_sweep (aus Präfixsummen).
+
+    python benchmarks/bench_threshold_sweep.py data/PS_20174392719_1491204439457_log.csv --steps 1 743
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.compliance_engine import ComplianceEngine
+from modules.data_handler import DataStreamer
+from modules.stats_engine import build_step_summary, get_performance_report, threshold_sweep
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("csv")
+    parser.add_argument("--steps", type=int, nargs=2, default=(1, 743))
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    streamer = DataStreamer(args.csv)
+    streamer.load_data()
+    engine = ComplianceEngine()
+    analyzed = engine.process_batch(streamer.get_step_range(*args.steps))
+    summary = build_step_summary(streamer.get_step_range(*args.steps), engine)
+
+    report_s, _ = best_of(lambda: get_performance_report(analyzed, engine.rules.high_confidence_score), args.repeat)
+    sweep_s, sweep = best_of(lambda: threshold_sweep(analyzed, engine.rules.score_range), args.repeat)
+    summary_s, _ = best_of(lambda: summary.threshold_sweep(*args.steps), args.repeat)
+
+    print(f"Transaktionen:                  {len(analyzed):,}")
+    print(f"get_performance_report (2 Sz.): {report_s * 1000:8.1f} ms")
+    print(f"threshold_sweep ({len(sweep)} Schwellen): {sweep_s * 1000:8.1f} ms ({sweep_s / report_s:.2f}x)")
+    print(f"StepSummary.threshold_sweep:    {summary_s * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""
+Reproduzierbare Mess-Suite auf synthetischen PaySim-Daten.
+Erzeugt (bzw. verwendet) einen Datensatz mit festem Seed, misst Laden, Step-Zugriff,
+Scoring, Benford-Analyse, Gütebericht und PDF-Export und legt die Bestwerte als JSON ab.
+compare vergleicht zwei solche Dateien und meldet Verschlechterungen (Exit-Code 1).
+
+    python benchmarks/suite.py generate data/synthetic/paysim-1000000-42-v2.csv --rows 1000000
+    python benchmarks/suite.py run --rows 1000000 --out benchmarks/baseline.json
+    python benchmarks/suite.py run --rows 1000000 --out current.json --compare benchmarks/baseline.json
+    python benchmarks/suite.py compare benchmarks/baseline.json current.json --tolerance 0.25
+
+Stammen Basis und aktueller Lauf von Rechnern mit anderer CPU-Anzahl oder Plattform, sind die
+Zeiten nicht vergleichbar: compare warnt dann und wertet keine Regressionen
+(--ignore-environment erzwingt die Bewertung).
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from modules.compliance_engine import ComplianceEngine
+from modules.data_handler import DataStreamer
+from modules.pdf_export import generate_audit_pdf
+from modules.stats_engine import calculate_benfords_law, get_performance_report
+from modules.synthetic_data import GENERATOR_VERSION, write_paysim_csv
+
+DEFAULT_DATA_DIR = "data/synthetic"
+# Ohne Übereinstimmung dieser Angaben sind Laufzeiten nicht vergleichbar
+COMPARABLE_ENVIRONMENT = ("cpus", "platform", "machine")
+# Abweichungen hier werden nur gemeldet (z.B. Bibliotheks-Updates sollen als Regression auffallen)
+REPORTED_ENVIRONMENT = ("python", "numpy", "pandas")
+# Obergrenze der Einzelauflistung im PDF wie in app.py
+PDF_MAX_ROWS = 5_000
+
+
+def dataset_path(rows, seed, data_dir=DEFAULT_DATA_DIR):
+    return os.path.join(data_dir, f"paysim-{rows}-{seed}-v{GENERATOR_VERSION}.csv")
+
+def ensure_dataset(rows, seed, data_dir=DEFAULT_DATA_DIR):
+    """Pfad des synthetischen Datensatzes; wird nur erzeugt, wenn er noch nicht existiert."""
+    path = dataset_path(rows, seed, data_dir)
+    if not os.path.exists(path):
+        os.makedirs(data_dir, exist_ok=True)
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        write_paysim_csv(tmp_path, rows, seed=seed)
+        os.replace(tmp_path, path)
+    return path
+
+
+def measure(fn, repeat, setup=None):
+    """Laufzeiten von fn über repeat Wiederholungen (setup läuft jeweils vorher, ungemessen)."""
+    times = []
+    result = None
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return times, result
+
+def _entry(times, rows, calls=1):
+    # Bei mehreren Aufrufen je Messung (Step-Zugriff) werden Zeiten je Aufruf abgelegt
+    return {"min_s": min(times) / calls, "median_s": statistics.median(times) / calls,
+            "repeat": len(times), "rows": rows, "calls": calls}
+
+
+def run_suite(csv_path, repeat=5, log=print):
+    """Führt alle Messfälle aus und gibt {name: Messwerte} zurück."""
+    results = {}
+    # Teure Fälle (CSV-Parsing, Cache-Aufbau, PDF) mit weniger, aber mindestens zwei Wiederholungen
+    heavy = max(repeat // 2, 2)
+
+    def record(name, times, rows, calls=1):
+        results[name] = _entry(times, rows, calls)
+        log(f"  {name:<34} {results[name]['min_s'] * 1000:10.2f} ms")
+
+    # Laden: CSV direkt, Aufbau des Binär-Caches, Laden aus dem warmen Cache
+    cache_dir = f"{csv_path}.bench.colcache"
+    times, streamer = measure(lambda: _loaded(DataStreamer(csv_path, use_cache=False)), heavy)
+    record("data.load_data.csv", times, len(streamer.df))
+    times, _ = measure(lambda: _loaded(DataStreamer(csv_path, cache_dir=cache_dir)), heavy,
+                       setup=lambda: shutil.rmtree(cache_dir, ignore_errors=True))
+    record("data.load_data.cache_build", times, len(streamer.df))
+    times, streamer = measure(lambda: _loaded(DataStreamer(csv_path, cache_dir=cache_dir)), repeat)
+    record("data.load_data.cached", times, len(streamer.df))
+
+    # Step-Zugriff: alle Steps nacheinander, abgelegt je Aufruf
+    steps = range(streamer.min_step, streamer.max_step + 1)
+    times, _ = measure(lambda: [streamer.get_step_data(step) for step in steps], repeat)
+    record("data.get_step_data", times, len(streamer.df), calls=len(steps))
+
+    # Scoring: ein stark belegter Step (Live-Batch) und der gesamte Datensatz
+    engine = ComplianceEngine()
+    df = streamer.df
+    busy_step = int(streamer.min_step + np.argmax(np.diff(streamer.step_offsets)))
+    step_df = streamer.get_step_data(busy_step)
+    times, _ = measure(lambda: engine.process_batch(step_df), repeat)
+    record("engine.process_batch.step", times, len(step_df))
+    times, analyzed = measure(lambda: engine.process_batch(df), repeat)
+    record("engine.process_batch.full", times, len(df))
+
+    times, _ = measure(lambda: calculate_benfords_law(df['amount']), repeat)
+    record("stats.calculate_benfords_law", times, len(df))
+    times, reports = measure(lambda: get_performance_report(analyzed, engine.rules.high_confidence_score), repeat)
+    record("stats.get_performance_report", times, len(df))
+
+    # PDF: Incident Log des gesamten Zeitraums (HIGH-Fälle), Einzelauflistung wie in der App begrenzt
+    incidents = analyzed[analyzed['risk_level'] == "HIGH"]
+    total_fraud = int(analyzed['isFraud'].sum())
+    tp_count = int(incidents['isFraud'].sum())
+    liq_metrics = {"tp_count": tp_count, "total_fraud": total_fraud,
+                   "coverage": tp_count / total_fraud * 100 if total_fraud else 0.0}
+    step_range = (streamer.min_step, streamer.max_step)
+    times, _ = measure(lambda: generate_audit_pdf(incidents, reports, step_range, liq_metrics,
+                                                  rules=engine.rules, max_rows=PDF_MAX_ROWS), heavy)
+    record("pdf.generate_audit_pdf", times, len(incidents))
+
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    return results
+
+def _loaded(streamer):
+    streamer.load_data()
+    return streamer
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {"python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__,
+            "platform": platform.platform(), "machine": platform.machine(), "cpus": os.cpu_count(),
+            "commit": commit, "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z")}
+
+
+def compare(baseline, current, tolerance=0.25, min_delta_s=0.001):
+    """
+    Vergleicht die Bestwerte zweier Läufe je Messfall.
+    Gibt Zeilen (name, alt, neu, Faktor, Status) zurück; Status ist "REGRESSION" bei
+    einer Verlangsamung über tolerance, "schneller" bei einer Verbesserung darüber.
+    Abweichungen unter min_delta_s je Aufruf gelten als Messrauschen.
+    """
+    rows = []
+    for name, base in baseline["results"].items():
+        cur = current["results"].get(name)
+        if cur is None:
+            rows.append((name, base["min_s"], None, None, "fehlt"))
+            continue
+        ratio = cur["min_s"] / base["min_s"] if base["min_s"] > 0 else float("inf")
+        if abs(cur["min_s"] - base["min_s"]) < min_delta_s:
+            status = "ok"
+        elif ratio > 1 + tolerance:
+            status = "REGRESSION"
+        elif ratio < 1 / (1 + tolerance):
+            status = "schneller"
+        else:
+            status = "ok"
+        rows.append((name, base["min_s"], cur["min_s"], ratio, status))
+    for name in current["results"].keys() - baseline["results"].keys():
+        rows.append((name, None, current["results"][name]["min_s"], None, "neu"))
+    return rows
+
+def environment_differences(baseline, current, keys=COMPARABLE_ENVIRONMENT):
+    """Abweichende Umgebungsangaben als (Schlüssel, Basis, aktuell)."""
+    base_env, cur_env = baseline.get("environment", {}), current.get("environment", {})
+    return [(key, base_env.get(key), cur_env.get(key)) for key in keys if base_env.get(key) != cur_env.get(key)]
+
+def print_comparison(baseline, current, tolerance, min_delta_s=0.001, ignore_environment=False):
+    """Gibt den Vergleich aus; False bei Regressionen in vergleichbarer Umgebung."""
+    for key in ("rows", "seed", "generator"):
+        if baseline["dataset"].get(key) != current["dataset"].get(key):
+            print(f"Warnung: Datensätze unterscheiden sich ({key}: {baseline['dataset'].get(key)} "
+                  f"vs. {current['dataset'].get(key)})")
+    for key, old, new in environment_differences(baseline, current, REPORTED_ENVIRONMENT):
+        print(f"Hinweis: {key} {old} -> {new}")
+    differences = environment_differences(baseline, current)
+    for key, old, new in differences:
+        print(f"Warnung: Umgebung weicht von der Basis ab ({key}: {old} vs. {new})")
+
+    rows = compare(baseline, current, tolerance, min_delta_s)
+    print(f"{'Messfall':<34} {'Basis ms':>10} {'Aktuell ms':>10} {'Faktor':>7}  Status")
+    for name, old, new, ratio, status in rows:
+        old_ms = f"{old * 1000:10.2f}" if old is not None else f"{'-':>10}"
+        new_ms = f"{new * 1000:10.2f}" if new is not None else f"{'-':>10}"
+        factor = f"{ratio:7.2f}" if ratio is not None else f"{'-':>7}"
+        print(f"{name:<34} {old_ms} {new_ms} {factor}  {status}")
+    regressions = [row[0] for row in rows if row[4] == "REGRESSION"]
+    if differences and not ignore_environment:
+        print("Keine Bewertung: Basis mit passender CPU-Anzahl und Plattform aufnehmen "
+              "(oder --ignore-environment)")
+        return True
+    if regressions:
+        print(f"{len(regressions)} Regression(en) über {tolerance:.0%}: {', '.join(regressions)}")
+    return not regressions
+
+
+def _load_json(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser("generate", help="synthetischen Datensatz als CSV schreiben")
+    generate.add_argument("path")
+    generate.add_argument("--rows", type=int, default=1_000_000)
+    generate.add_argument("--seed", type=int, default=42)
+    generate.add_argument("--steps", type=int, default=743)
+
+    run = commands.add_parser("run", help="Messfälle ausführen und als JSON ablegen")
+    run.add_argument("--rows", type=int, default=1_000_000)
+    run.add_argument("--seed", type=int, default=42)
+    run.add_argument("--csv", default=None, help="vorhandenen Datensatz statt des synthetischen verwenden")
+    run.add_argument("--data-dir", default=DEFAULT_DATA_DIR)
+    run.add_argument("--repeat", type=int, default=5)
+    run.add_argument("--out", default=None)
+    run.add_argument("--compare", default=None, metavar="BASELINE", help="direkt mit einer Basis vergleichen")
+    run.add_argument("--tolerance", type=float, default=0.25)
+    run.add_argument("--min-delta-ms", type=float, default=1.0, help="kleinere Abweichungen gelten als Rauschen")
+    run.add_argument("--ignore-environment", action="store_true",
+                     help="auch bei anderer CPU-Anzahl oder Plattform auf Regressionen prüfen")
+
+    cmp = commands.add_parser("compare", help="zwei Ergebnisdateien vergleichen")
+    cmp.add_argument("baseline")
+    cmp.add_argument("current")
+    cmp.add_argument("--tolerance", type=float, default=0.25)
+    cmp.add_argument("--min-delta-ms", type=float, default=1.0, help="kleinere Abweichungen gelten als Rauschen")
+    cmp.add_argument("--ignore-environment", action="store_true",
+                     help="auch bei anderer CPU-Anzahl oder Plattform auf Regressionen prüfen")
+
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        start = time.perf_counter()
+        write_paysim_csv(args.path, args.rows, seed=args.seed, steps=args.steps)
+        print(f"{args.rows:,} Zeilen nach {args.path} ({time.perf_counter() - start:.1f} s)")
+        return 0
+
+    if args.command == "compare":
+        return 0 if print_comparison(_load_json(args.baseline), _load_json(args.current), args.tolerance,
+                                        args.min_delta_ms / 1000, args.ignore_environment) else 1
+
+    csv_path = args.csv or ensure_dataset(args.rows, args.seed, args.data_dir)
+    print(f"Datensatz: {csv_path}")
+    report = {
+        "dataset": {"path": csv_path, "rows": None if args.csv else args.rows,
+                    "seed": None if args.csv else args.seed,
+                    "generator": None if args.csv else GENERATOR_VERSION},
+        "environment": environment(),
+        "results": run_suite(csv_path, args.repeat),
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Ergebnisse: {args.out}")
+    if args.compare:
+        return 0 if print_comparison(_load_json(args.compare), report, args.tolerance, args.min_delta_ms / 1000,
+                                     args.ignore_environment) else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
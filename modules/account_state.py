@@ -0,0 +1,145 @@
+from collections import OrderedDict
+
+import numpy as np
+
+from modules.instrumentation import timed
+
+# Typen, bei denen Geld das Auftraggeberkonto verlässt (CASH_IN ist ein Zufluss)
+OUTFLOW_TYPES = ('TRANSFER', 'CASH_OUT', 'PAYMENT', 'DEBIT')
+
+
+class AccountState:
+    """
+    Zustand je Konto für die zustandsbehafteten Regeln eines Regelsatzes.
+    Jedes Konto belegt einen Slot in festen NumPy-Spalten (44 Byte je Konto); der Index
+    Konto -> Slot ist ein OrderedDict in Zugriffsreihenfolge. Ist die Kapazität erreicht, wird
+    das am längsten unbenutzte Konto verdrängt (LRU), Konten ohne Aktivität seit ttl_steps
+    verfallen. Gleitende Fenster werden mit zwei Zählern (aktuelles und vorheriges Fenster,
+    anteilig gewichtet) angenähert, statt jede Transaktion vorzuhalten.
+    """
+
+    def __init__(self, rules):
+        config = rules.config
+        self.kinds = [rule.kind for rule in config.stateful_rules]
+        self.params = config.params
+        self.capacity = config.account_state.capacity
+        self.ttl_steps = config.account_state.ttl_steps
+        self.window_steps = config.account_state.window_steps
+        self.reset()
+
+    def reset(self):
+        n = self.capacity
+        self._index = OrderedDict()
+        self._free = []
+        self.last_step = np.zeros(n, dtype=np.int32)
+        self.window = np.zeros(n, dtype=np.int32)
+        self.out_cur = np.zeros(n, dtype=np.float64)
+        self.out_prev = np.zeros(n, dtype=np.float64)
+        self.in_cur = np.zeros(n, dtype=np.int32)
+        self.in_prev = np.zeros(n, dtype=np.int32)
+        self.pending_amount = np.zeros(n, dtype=np.float64)
+        self.pending_step = np.full(n, -1, dtype=np.int32)
+        self.evicted = 0
+        self.expired = 0
+
+    def __len__(self):
+        return len(self._index)
+
+    @property
+    def nbytes(self):
+        """Speicher der Slot-Spalten (ohne Index und Kontonamen)."""
+        return sum(a.nbytes for a in (self.last_step, self.window, self.out_cur, self.out_prev,
+                                      self.in_cur, self.in_prev, self.pending_amount, self.pending_step))
+
+    def _slot(self, account, step):
+        """Slot des Kontos (legt ihn bei Bedarf an) und rollt das Fenster auf den aktuellen Step."""
+        slot = self._index.get(account)
+        if slot is not None and step - self.last_step[slot] > self.ttl_steps:
+            # Abgelaufen: wie ein neues Konto behandeln
+            del self._index[account]
+            self._free.append(slot)
+            self.expired += 1
+            slot = None
+        if slot is None:
+            if self._free:
+                slot = self._free.pop()
+            elif len(self._index) < self.capacity:
+                slot = len(self._index)
+            else:
+                _, slot = self._index.popitem(last=False)
+                self.evicted += 1
+            self._index[account] = slot
+            self.window[slot] = step // self.window_steps
+            self.out_cur[slot] = self.out_prev[slot] = 0.0
+            self.in_cur[slot] = self.in_prev[slot] = 0
+            self.pending_step[slot] = -1
+        else:
+            self._index.move_to_end(account)
+            window = step // self.window_steps
+            if window != self.window[slot]:
+                # Aktuelles Fenster wird zum vorherigen (oder verfällt, wenn es älter ist)
+                adjacent = window == self.window[slot] + 1
+                self.out_prev[slot] = self.out_cur[slot] if adjacent else 0.0
+                self.in_prev[slot] = self.in_cur[slot] if adjacent else 0
+                self.out_cur[slot] = 0.0
+                self.in_cur[slot] = 0
+                self.window[slot] = window
+        self.last_step[slot] = step
+        return slot
+
+    def _expire(self, step):
+        # Der Index ist nach letztem Zugriff sortiert: vorne stehen die ältesten Konten
+        while self._index:
+            account, slot = next(iter(self._index.items()))
+            if step - self.last_step[slot] <= self.ttl_steps:
+                break
+            del self._index[account]
+            self._free.append(slot)
+            self.expired += 1
+
+    @timed("engine.account_state", rows_arg=1)
+    def evaluate(self, batch_df):
+        """
+        Aktualisiert den Zustand in Zeilenreihenfolge und gibt eine Maske je
+        zustandsbehafteter Regel (Reihenfolge wie im Regelsatz) zurück.
+        """
+        n = len(batch_df)
+        masks = {kind: np.zeros(n, dtype=bool) for kind in ("velocity", "transfer_cashout", "fan_in")}
+        if n == 0:
+            return [masks[kind] for kind in self.kinds]
+
+        velocity_amount = self.params.get("velocity_amount", np.inf)
+        chain_max_steps = self.params.get("chain_max_steps", self.ttl_steps)
+        chain_min_ratio = self.params.get("chain_min_ratio", 1.0)
+        fan_in_min_count = self.params.get("fan_in_min_count", np.inf)
+        w = self.window_steps
+
+        rows = zip(batch_df['step'].tolist(), batch_df['type'].tolist(), batch_df['amount'].tolist(),
+                   batch_df['nameOrig'].tolist(), batch_df['nameDest'].tolist())
+        for i, (step, kind, amount, orig, dest) in enumerate(rows):
+            # Anteil des vorherigen Fensters, der noch im gleitenden Fenster liegt
+            carry = 1.0 - (step % w) / w
+            if kind in OUTFLOW_TYPES:
+                o = self._slot(orig, step)
+                self.out_cur[o] += amount
+                if self.out_cur[o] + carry * self.out_prev[o] > velocity_amount:
+                    masks["velocity"][i] = True
+                if kind == 'CASH_OUT' and self.pending_step[o] >= 0:
+                    if (step - self.pending_step[o] <= chain_max_steps
+                            and amount >= chain_min_ratio * self.pending_amount[o]):
+                        masks["transfer_cashout"][i] = True
+                        self.pending_step[o] = -1
+            if kind == 'TRANSFER':
+                d = self._slot(dest, step)
+                self.pending_amount[d] = amount
+                self.pending_step[d] = step
+                self.in_cur[d] += 1
+                if self.in_cur[d] + carry * self.in_prev[d] >= fan_in_min_count:
+                    masks["fan_in"][i] = True
+
+        self._expire(step)
+        return [masks[kind] for kind in self.kinds]
+
+    def stats(self):
+        return {"accounts": len(self), "capacity": self.capacity, "evicted": self.evicted,
+                "expired": self.expired, "nbytes": self.nbytes}
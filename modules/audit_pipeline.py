@@ -0,0 +1,55 @@
+import os
+
+from modules.incident_log import append_incidents_csv
+from modules.stats_engine import StepSummaryBuilder
+
+
+def run_chunked_audit(streamer, engine, chunk_size=500_000, steps=None,
+                      incidents_path=None, incident_level="HIGH"):
+    """
+    Out-of-Core-Revision: liest die Quelle blockweise, bewertet jeden Block mit der Engine
+    und verbucht ihn in laufenden Aggregaten (Benford, Konfusionsmatrizen, Liquidation je Step).
+    Nur die Incidents (risk_level == incident_level) werden nach incidents_path geschrieben,
+    alles andere wird nach dem Block verworfen. Der Speicherbedarf ist durch chunk_size begrenzt.
+
+    steps: optionaler Zeitraum (lo, hi); bei nach Step sortierter Quelle wird nach hi abgebrochen.
+    """
+    if incidents_path and os.path.exists(incidents_path):
+        os.remove(incidents_path)
+
+    builder = StepSummaryBuilder(engine)
+    rows = 0
+    incidents = 0
+    sorted_so_far = True
+    last_step = None
+
+    for chunk in streamer.iter_chunks(chunk_size):
+        chunk_steps = chunk['step']
+        if sorted_so_far:
+            sorted_so_far = chunk_steps.is_monotonic_increasing and (last_step is None or chunk_steps.iloc[0] >= last_step)
+            last_step = chunk_steps.iloc[-1]
+
+        if steps is not None:
+            lo, hi = steps
+            if sorted_so_far and chunk_steps.iloc[0] > hi:
+                break
+            chunk = chunk[(chunk_steps >= lo) & (chunk_steps <= hi)]
+            if chunk.empty:
+                continue
+
+        scored = builder.add(chunk)
+        rows += len(chunk)
+
+        hits = (scored['risk_level'] == incident_level).to_numpy()
+        if hits.any():
+            incidents += int(hits.sum())
+            if incidents_path:
+                found = chunk[hits].join(scored[hits])
+                append_incidents_csv(incidents_path, found)
+
+    return {
+        "summary": builder.result(),
+        "rows": rows,
+        "incidents": incidents,
+        "incidents_path": incidents_path,
+    }
@@ -0,0 +1,157 @@
+import json
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from modules.compliance_engine import ComplianceEngine
+from modules.data_handler import DataStreamer, load_columnar_rows
+from modules.incident_log import with_plain_values
+from modules.pdf_export import generate_audit_pdf
+from modules.rule_registry import RuleRegistry, RuleSetConfig
+from modules.stats_engine import StepSummaryBuilder
+
+
+def shard_steps(streamer, lo, hi, n_shards):
+    """
+    Teilt lo..hi in höchstens n_shards zusammenhängende Step-Bereiche mit ähnlicher Zeilenzahl.
+    Grundlage ist der Step-Index des Streamers, die Daten werden dafür nicht gelesen.
+    """
+    lo = max(lo, streamer.min_step)
+    hi = min(hi, streamer.max_step)
+    if hi < lo:
+        return []
+    # Zeilen bis einschließlich Step lo + i, relativ zum Beginn von lo
+    ends = streamer.step_offsets[lo - streamer.min_step + 1:hi - streamer.min_step + 2]
+    cumulative = ends - streamer.step_offsets[lo - streamer.min_step]
+    targets = np.linspace(0, cumulative[-1], max(n_shards, 1) + 1)[1:-1]
+    cuts = np.unique(np.searchsorted(cumulative, targets, side='left'))
+    bounds = [lo] + [lo + int(c) + 1 for c in cuts if lo + c < hi] + [hi + 1]
+    return [(a, b - 1) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+
+def audit_shard(streamer, engine, lo, hi, chunk_rows=1_000_000, incident_level="HIGH"):
+    """Bewertet die Steps lo..hi blockweise; liefert StepSummary und Incidents des Bereichs."""
+    frame = streamer.get_step_range(lo, hi)
+    return _audit_frame(engine, lo, hi, frame, lambda positions: frame.iloc[positions], chunk_rows, incident_level)
+
+def _audit_frame(engine, lo, hi, frame, fetch_rows, chunk_rows, incident_level):
+    """
+    Gemeinsamer Kern: frame enthält mindestens die Spalten des StepSummaryBuilders,
+    fetch_rows(positionen) liefert die vollständigen Zeilen der Incidents (Positionen in frame).
+    """
+    builder = StepSummaryBuilder(engine, steps=(lo, hi))
+    incidents = []
+    for start in range(0, len(frame), chunk_rows):
+        chunk = frame.iloc[start:start + chunk_rows]
+        scored = builder.add(chunk)
+        hits = (scored['risk_level'] == incident_level).to_numpy()
+        if hits.any():
+            # Als einfache Werte zurückgeben: das Ergebnis wird aus dem Worker-Prozess gepickelt
+            found = fetch_rows(start + np.flatnonzero(hits))
+            incidents.append(with_plain_values(found).join(scored[hits]))
+    found = pd.concat(incidents) if incidents else None
+    return builder.result(), found, len(frame)
+
+_worker_engines = {}
+
+def _audit_shard_task(task):
+    """
+    Worker: liest nur die Zeilen seiner Steps und nur die Spalten, die Scoring und Summary
+    brauchen, per Memory-Mapping aus dem Spalten-Cache. Das Konten-Wörterbuch wird nicht
+    aufgebaut; Kontonummern werden nur für die Incidents aufgelöst.
+    """
+    cache_dir, rules_json, lo, hi, start, end, chunk_rows, incident_level = task
+    engine = _worker_engines.get(rules_json)
+    if engine is None:
+        rules = RuleRegistry(RuleSetConfig.model_validate(json.loads(rules_json)))
+        engine = _worker_engines[rules_json] = ComplianceEngine(rules=rules)
+
+    columns = StepSummaryBuilder(engine).columns
+    frame = load_columnar_rows(cache_dir, slice(start, end), columns)
+    return _audit_frame(engine, lo, hi, frame, lambda positions: load_columnar_rows(cache_dir, start + positions),
+                        chunk_rows, incident_level)
+
+
+def run_batch_audit(source, steps=None, rules_path=None, workers=1, shards=None,
+                    chunk_rows=1_000_000, incident_level="HIGH", pdf_path=None, pdf_max_rows=5_000,
+                    cache_dir=None, log=None):
+    """
+    Nächtliche Revision ohne Oberfläche: Laden -> Scoring -> Statistik -> PDF.
+    Der Zeitraum wird in Step-Partitionen (shards, Standard 2 je Worker) zerlegt; bei
+    workers > 1 bewertet jeder Prozess seine Partitionen auf dem per Memory-Mapping
+    geteilten Spalten-Cache, die Teilergebnisse werden per StepSummaryBuilder.merge
+    zusammengeführt. Zustandsbehaftete Regeln werden nicht ausgewertet, da sie die
+    Stream-Reihenfolge über Partitionsgrenzen hinweg voraussetzen.
+    """
+    log = log or (lambda message: None)
+    timings = {}
+    start = time.perf_counter()
+
+    # Der Spalten-Cache wird einmal im Hauptprozess aufgebaut, die Worker laden ihn nur noch
+    streamer = DataStreamer(source, cache_dir=cache_dir)
+    streamer.load_data()
+    engine = ComplianceEngine(rules_path=rules_path)
+    lo, hi = steps if steps is not None else (streamer.min_step, streamer.max_step)
+    lo, hi = max(lo, streamer.min_step), min(hi, streamer.max_step)
+    if hi < lo:
+        raise ValueError(f"Keine Steps im Zeitraum {steps} (Datensatz: {streamer.min_step}-{streamer.max_step})")
+    timings["load_s"] = time.perf_counter() - start
+    log(f"Datensatz geladen: {len(streamer.df):,} Zeilen, Steps {lo}-{hi}")
+
+    partitions = shard_steps(streamer, lo, hi, shards or max(workers, 1) * 2)
+    start = time.perf_counter()
+    if workers > 1 and len(partitions) > 1:
+        rules_json = engine.rules.config.model_dump_json()
+        tasks = [(streamer.cache_dir, rules_json, a, b, *streamer.step_rows(a, b), chunk_rows, incident_level)
+                 for a, b in partitions]
+        # spawn wie in der Engine: keine geerbten Threads oder Sperren aus dem Elternprozess
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            results = list(pool.map(_audit_shard_task, tasks))
+    else:
+        results = [audit_shard(streamer, engine, a, b, chunk_rows, incident_level) for a, b in partitions]
+
+    builder = StepSummaryBuilder(engine, steps=(lo, hi))
+    rows = 0
+    for (a, b), (summary, _, shard_rows) in zip(partitions, results):
+        builder.merge(summary)
+        rows += shard_rows
+        log(f"  Steps {a}-{b}: {shard_rows:,} Zeilen")
+    found = [incidents for _, incidents, _ in results if incidents is not None]
+    incidents = pd.concat(found) if found else pd.DataFrame()
+    summary = builder.result()
+    timings["score_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    reports = summary.performance_report(lo, hi)
+    liquidation = summary.liquidation(lo, hi)
+    result = {
+        "source": source,
+        "steps": (lo, hi),
+        "rows": rows,
+        "incidents": len(incidents),
+        "shards": partitions,
+        "workers": workers,
+        "reports": reports,
+        "liquidation": liquidation,
+        "benford": summary.benford_conformity(lo, hi),
+        "summary": summary,
+        "incident_df": incidents,
+        "pdf_path": pdf_path,
+    }
+    timings["stats_s"] = time.perf_counter() - start
+
+    if pdf_path:
+        start = time.perf_counter()
+        liq_data = {key: liquidation[key] for key in ("tp_count", "coverage", "total_fraud")}
+        pdf_bytes = generate_audit_pdf(incidents, reports, (lo, hi), liq_data,
+                                       rules=engine.rules, max_rows=pdf_max_rows)
+        with open(pdf_path, "wb") as f:
+            f.write(pdf_bytes)
+        timings["pdf_s"] = time.perf_counter() - start
+        log(f"PDF geschrieben: {pdf_path}")
+
+    result["timings"] = timings
+    return result
@@ -1,48 +1,273 @@
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
 import pandas as pd
 import numpy as np
 
+from modules.account_state import AccountState
+from modules.instrumentation import timed
+from modules.rule_registry import RuleRegistry, RuleSetConfig
+
+# Unterhalb dieser Zeilenzahl lohnt sich die Verteilung auf Prozesse nicht
+PARALLEL_MIN_ROWS = 200_000
+
 class ComplianceEngine:
-    def __init__(self, threshold_high_amount=500000):
-        self.threshold_high_amount = threshold_high_amount
+    def __init__(self, threshold_high_amount=None, rules=None, rules_path=None, workers=1, stateful=False):
+        """
+        rules: bereits geladene RuleRegistry, alternativ rules_path auf eine Regel-Konfiguration.
+        Ohne Angabe wird config/rules.json verwendet. threshold_high_amount überschreibt
+        den gleichnamigen Parameter des Regelsatzes.
+        workers > 1 verteilt große Batches nach Steps auf einen Prozess-Pool.
+        stateful aktiviert die zustandsbehafteten Regeln (Konto-Historie über alle Batches
+        hinweg); die Batches müssen dann in Stream-Reihenfolge eintreffen.
+        """
+        overrides = {}
+        if threshold_high_amount is not None:
+            overrides["threshold_high_amount"] = threshold_high_amount
+        if rules is None:
+            rules = RuleRegistry.from_file(rules_path, **overrides)
+        elif overrides:
+            rules = RuleRegistry(rules.config.model_copy(update={"params": {**rules.config.params, **overrides}}))
+        self.rules = rules
+        self.threshold_high_amount = rules.config.params.get("threshold_high_amount")
+        self.workers = workers
+        self.account_state = AccountState(rules) if stateful and rules.config.stateful_rules else None
+        self._pool = None
+        self._pool_size = 0
 
     def check_transaction(self, row):
         """
         Prüft eine einzelne Transaktion auf Compliance-Verstöße.
-        Gibt ein Dictionary mit Score und Flags zurück.
+        Gibt ein Dictionary mit Score und Flags (Bitmaske, Bit i = Regel i) zurück.
         """
+        masks = self.rules.plan.evaluate(row)
         score = 0
-        flags = []
-
-        # Regel 1: Schwellenwert-Prüfung (Threshold)
-        if row['amount'] > self.threshold_high_amount:
-            score += 40
-            flags.append("HIGH_AMOUNT")
-
-        # Regel 2: Vollständige Konto-Leerung (Indiz für Fraud/Kontoübernahme)
-        if row['amount'] == row['oldbalanceOrg'] and row['amount'] > 0:
-            score += 30
-            flags.append("FULL_BALANCE_TRANSFER")
-
-        # Regel 3: Mathematische Inkonsistenz (Datenintegrität)
-        # Prüfung: Ist der neue Kontostand logisch korrekt? 
-        expected_balance = row['oldbalanceOrg'] - row['amount']
-        if abs(expected_balance - row['newbalanceOrig']) > 0.01:
-            if row['type'] in ['TRANSFER', 'CASH_OUT']: # Nur bei Abgängen relevant
-                score += 20
-                flags.append("INTEGRITY_ERROR")
-
-        # Regel 4: Zielkonto-Check (Nur für Demo-Zwecke: Transfer auf Konten ohne Historie)
-        if row['oldbalanceDest'] == 0 and row['newbalanceDest'] == 0 and row['amount'] > 0:
-            score += 25
-            flags.append("ZERO_BALANCE_DESTINATION")
+        flags = 0
+        for bit, (mask, weight) in enumerate(zip(masks, self.rules.weights)):
+            if mask:
+                score += int(weight)
+                flags |= 1 << bit
 
         return {
             "risk_score": score,
-            "risk_level": "HIGH" if score >= 50 else "MEDIUM" if score >= 20 else "LOW",
-            "flags": ", ".join(flags) if flags else "CLEAN"
+            "risk_level": self.rules.risk_level(score),
+            "flags": flags
         }
 
-    def process_batch(self, batch_df):
+    @timed("engine.score_batch", rows_arg=1)
+    def score_batch(self, batch_df):
+        """
+        Spaltenweise Variante von check_transaction.
+        Wertet den kompilierten Regelsatz als NumPy-Masken über den gesamten Batch aus und
+        liefert risk_score, risk_level und flags identisch zur zeilenweisen Prüfung.
+        """
+        masks = self.rules.plan.evaluate(batch_df)
+        flag_dtype = self.rules.flag_dtype
+
+        scores = np.zeros(len(batch_df), dtype=np.int64)
+        flags = np.zeros(len(batch_df), dtype=flag_dtype)
+        for bit, (mask, weight) in enumerate(zip(masks, self.rules.weights)):
+            mask = np.asarray(mask, dtype=bool)
+            scores += mask * weight
+            flags |= mask.astype(flag_dtype) << flag_dtype.type(bit)
+
+        return pd.DataFrame({
+            "risk_score": scores,
+            "risk_level": self.rules.risk_levels(scores),
+            "flags": flags
+        }, index=batch_df.index)
+
+    def score(self, batch_df, workers=None):
+        """Risiko-Spalten eines Batches; große Batches laufen bei workers > 1 parallel."""
+        workers = self.workers if workers is None else workers
+        if workers > 1 and len(batch_df) >= PARALLEL_MIN_ROWS:
+            results = self.score_batch_parallel(batch_df, workers)
+        else:
+            results = self.score_batch(batch_df)
+        return self._apply_account_state(batch_df, results)
+
+    @timed("engine.process_batch", rows_arg=1)
+    def process_batch(self, batch_df, vectorized=True, workers=None):
         """Verarbeitet einen ganzen Batch und fügt Risiko-Spalten hinzu."""
-        results = batch_df.apply(self.check_transaction, axis=1, result_type='expand')
-        return pd.concat([batch_df, results], axis=1)
\ No newline at end of file
+        if vectorized:
+            results = self.score(batch_df, workers)
+        elif len(batch_df) == 0:
+            # apply liefert für leere Frames keine Spalten; Ergebnis-Spalten mit passenden Typen
+            results = self._apply_account_state(batch_df, self.score_batch(batch_df))
+        else:
+            results = batch_df.apply(self.check_transaction, axis=1, result_type='expand')
+            results = results.astype({"flags": self.rules.flag_dtype})
+            results = self._apply_account_state(batch_df, results)
+        return pd.concat([batch_df, results], axis=1)
+
+    def _apply_account_state(self, batch_df, results):
+        """Ergänzt Score und Flags um die zustandsbehafteten Regeln (nur mit stateful=True)."""
+        if self.account_state is None:
+            return results
+        masks = self.account_state.evaluate(batch_df)
+        flag_dtype = self.rules.flag_dtype
+        offset = self.rules.stateful_offset
+
+        scores = results['risk_score'].to_numpy(dtype=np.int64, copy=True)
+        flags = results['flags'].to_numpy(dtype=flag_dtype, copy=True)
+        for bit, (mask, weight) in enumerate(zip(masks, self.rules.weights[offset:]), start=offset):
+            scores += mask * weight
+            flags |= mask.astype(flag_dtype) << flag_dtype.type(bit)
+
+        return pd.DataFrame({
+            "risk_score": scores,
+            "risk_level": self.rules.risk_levels(scores),
+            "flags": flags
+        }, index=batch_df.index)
+
+    def reset_state(self):
+        """Verwirft die Konto-Historie der zustandsbehafteten Regeln."""
+        if self.account_state is not None:
+            self.account_state.reset()
+
+    # --- Parallele Ausführung ---
+
+    def _get_pool(self, workers):
+        if self._pool is None or self._pool_size != workers:
+            self.close()
+            # spawn statt fork: Streamlit läuft mit mehreren Threads
+            self._pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            self._pool_size = workers
+        return self._pool
+
+    def close(self):
+        """Beendet den Prozess-Pool (falls gestartet)."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+            self._pool_size = 0
+
+    @timed("engine.score_batch_parallel", rows_arg=1)
+    def score_batch_parallel(self, batch_df, workers=None):
+        """
+        Wie score_batch, aber verteilt auf einen Prozess-Pool.
+        Die Regel-Spalten werden einmal in Shared Memory kopiert (Text-Spalten als Codes),
+        die Worker lesen ihre Step-Partition direkt daraus und schreiben Score und Flags in
+        gemeinsame Ergebnis-Puffer. Die Reihenfolge bleibt dadurch ohne Merge erhalten.
+        """
+        workers = workers or self.workers
+        n = len(batch_df)
+        blocks = []
+        try:
+            inputs = {}
+            for col in self.rules.plan.columns:
+                series = batch_df[col]
+                if series.dtype.kind in "biuf":
+                    values, categories = series.to_numpy(), None
+                else:
+                    codes, uniques = pd.factorize(series)
+                    values, categories = codes, list(uniques)
+                block, spec = _to_shared(values)
+                blocks.append(block)
+                inputs[col] = spec + (categories,)
+
+            flag_dtype = self.rules.flag_dtype
+            score_block, score_spec = _to_shared(np.zeros(n, dtype=np.int64))
+            flag_block, flag_spec = _to_shared(np.zeros(n, dtype=flag_dtype))
+            blocks += [score_block, flag_block]
+
+            rules_json = self.rules.config.model_dump_json()
+            tasks = [(rules_json, inputs, score_spec, flag_spec, start, end)
+                     for start, end in _step_partitions(batch_df['step'].to_numpy(), workers * 4)]
+            list(self._get_pool(workers).map(_score_partition, tasks))
+
+            scores = _from_shared(score_block, score_spec).copy()
+            flags = _from_shared(flag_block, flag_spec).copy()
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+        return pd.DataFrame({
+            "risk_score": scores,
+            "risk_level": self.rules.risk_levels(scores),
+            "flags": flags
+        }, index=batch_df.index)
+
+
+def _to_shared(values):
+    """Legt ein Array in einem neuen Shared-Memory-Block ab und gibt Block und Beschreibung zurück."""
+    block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+    np.ndarray(values.shape, dtype=values.dtype, buffer=block.buf)[:] = values
+    return block, (block.name, values.dtype.str, values.shape)
+
+def _from_shared(block, spec):
+    _, dtype, shape = spec
+    return np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+
+def _step_partitions(steps, n_parts):
+    """Zeilenbereiche ähnlicher Größe, deren Grenzen auf Step-Wechseln liegen (bei sortierten Steps)."""
+    n = len(steps)
+    bounds = np.linspace(0, n, max(n_parts, 1) + 1).astype(np.int64)
+    if n and (steps[1:] >= steps[:-1]).all():
+        bounds[1:-1] = np.searchsorted(steps, steps[bounds[1:-1]], side='left')
+    bounds = np.unique(bounds)
+    return [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+_worker_engines = {}
+
+def _score_partition(task):
+    """Worker: bewertet die Zeilen start:end aus Shared Memory und schreibt das Ergebnis zurück."""
+    rules_json, inputs, score_spec, flag_spec, start, end = task
+    engine = _worker_engines.get(rules_json)
+    if engine is None:
+        rules = RuleRegistry(RuleSetConfig.model_validate(json.loads(rules_json)))
+        engine = _worker_engines[rules_json] = ComplianceEngine(rules=rules)
+
+    blocks = []
+    try:
+        data = {}
+        for col, (name, dtype, shape, categories) in inputs.items():
+            block = shared_memory.SharedMemory(name=name)
+            blocks.append(block)
+            values = _from_shared(block, (name, dtype, shape))[start:end]
+            data[col] = values if categories is None else pd.Categorical.from_codes(values, categories=categories)
+        result = engine.score_batch(pd.DataFrame(data, copy=False))
+
+        for spec, column in ((score_spec, "risk_score"), (flag_spec, "flags")):
+            block = shared_memory.SharedMemory(name=spec[0])
+            blocks.append(block)
+            _from_shared(block, spec)[start:end] = result[column].to_numpy()
+        # Alle Sichten auf die Blöcke freigeben, bevor sie geschlossen werden
+        del data, result, values
+    finally:
+        for block in blocks:
+            block.close()
+    return end - start
+
+
+# --- Flag-Helfer ---
+# Die flags-Spalte ist eine Bitmaske (uint8/uint16). Abfragen laufen direkt auf den
+# Bits, Klartext wird nur für die Anzeige (Tabelle, PDF) erzeugt.
+
+_default_rules = None
+
+def _rules_or_default(rules):
+    global _default_rules
+    if rules is not None:
+        return rules
+    if _default_rules is None:
+        _default_rules = RuleRegistry.from_file()
+    return _default_rules
+
+def has_flag(df, flag, rules=None):
+    """Boolesche Maske aller Zeilen, bei denen das Flag gesetzt ist, z.B. has_flag(df, "INTEGRITY_ERROR")."""
+    bit = _rules_or_default(rules).flag_bit(flag)
+    return (df['flags'].to_numpy() & bit) != 0
+
+def decode_flags(flags, rules=None):
+    """Übersetzt eine Flag-Spalte in Klartext ("HIGH_AMOUNT, INTEGRITY_ERROR" bzw. "CLEAN")."""
+    return _rules_or_default(rules).decode_flags(flags)
+
+def with_flag_labels(df, rules=None):
+    """Kopie für die Anzeige, bei der die Bitmaske durch Klartext-Labels ersetzt ist."""
+    if 'flags' not in df.columns:
+        return df
+    return df.assign(flags=decode_flags(df['flags'], rules))
@@ -1,39 +1,383 @@
+import asyncio
+import json
+import os
+import shutil
 import pandas as pd
+import numpy as np
 import time
-import random
+
+from modules import instrumentation
+from modules.instrumentation import timed
+
+COLUMNS = ['step', 'type', 'amount', 'nameOrig', 'oldbalanceOrg',
+           'newbalanceOrig', 'nameDest', 'oldbalanceDest', 'newbalanceDest', 'isFraud']
+
+# Kontonummern beider Spalten teilen sich ein Wörterbuch (gleiche ID = gleicher Code)
+ACCOUNT_COLUMNS = ['nameOrig', 'nameDest']
+
+# Bei Formatänderungen erhöhen, damit bestehende Caches neu aufgebaut werden
+CACHE_VERSION = 3
+
 
 class DataStreamer:
-    def __init__(self, file_path):
+    def __init__(self, file_path, use_cache=True, cache_dir=None):
         self.file_path = file_path
+        self.use_cache = use_cache
+        self.cache_dir = cache_dir or default_cache_dir(file_path)
         self.df = None
         self.current_step = 1
+        # Step-Index: step_offsets[i] ist die erste Zeile von Step min_step + i,
+        # der letzte Eintrag die Gesamtzahl der Zeilen
+        self.min_step = None
+        self.max_step = None
+        self.step_offsets = None
 
+    @timed("data.load_data")
     def load_data(self):
-        """Lädt den Datensatz initial."""
-        cols = ['step', 'type', 'amount', 'nameOrig', 'oldbalanceOrg', 
-                'newbalanceOrig', 'nameDest', 'oldbalanceDest', 'newbalanceDest', 'isFraud']
-        self.df = pd.read_csv(self.file_path, usecols=cols)
+        """
+        Lädt den Datensatz initial.
+        Mit use_cache wird die CSV einmalig in einen spaltenbasierten Binär-Cache überführt
+        und danach per Memory-Mapping geladen; ändert sich die Quelldatei, wird neu aufgebaut.
+        """
+        if self.use_cache:
+            if not cache_is_fresh(self.file_path, self.cache_dir):
+                build_columnar_cache(self.file_path, self.cache_dir)
+            self.df = load_columnar_cache(self.cache_dir)
+        else:
+            self.df = pd.read_csv(self.file_path, usecols=COLUMNS)
+        self._build_step_index()
+
+    def fingerprint(self):
+        """Identität des geladenen Datenstands (Quelldatei bzw. Quelle des Caches und Zeilenzahl)."""
+        if os.path.exists(self.file_path):
+            source = source_fingerprint(self.file_path)
+        else:
+            source = (_read_meta(self.cache_dir) or {}).get("source")
+        return {"source": source, "rows": 0 if self.df is None else len(self.df)}
+
+    def iter_chunks(self, chunk_size=500_000):
+        """
+        Liest die Quelldatei blockweise (Out-of-Core), ohne sie vollständig zu laden.
+        Der Speicherbedarf wird durch chunk_size begrenzt, nicht durch die Dateigröße.
+        """
+        reader = pd.read_csv(self.file_path, usecols=COLUMNS, chunksize=chunk_size,
+                             dtype={'type': 'category'})
+        with reader:
+            start = time.perf_counter()
+            for chunk in reader:
+                if instrumentation.is_enabled():
+                    instrumentation.record("data.read_chunk", time.perf_counter() - start, len(chunk))
+                yield chunk
+                start = time.perf_counter()
+
+    def _build_step_index(self):
+        """Sortiert einmalig nach Step (stabil) und legt die Offsets je Step an."""
+        steps = self.df['step'].to_numpy()
+        if len(steps) and not (steps[1:] >= steps[:-1]).all():
+            self.df = self.df.sort_values('step', kind='stable', ignore_index=True)
+            steps = self.df['step'].to_numpy()
+
+        if len(steps) == 0:
+            self.min_step, self.max_step = 1, 0
+            self.step_offsets = np.zeros(1, dtype=np.int64)
+            return
+        self.min_step, self.max_step = int(steps[0]), int(steps[-1])
+        self.step_offsets = np.searchsorted(steps, np.arange(self.min_step, self.max_step + 2), side='left')
+
+    def _offset(self, step):
+        i = min(max(int(step) - self.min_step, 0), len(self.step_offsets) - 1)
+        return self.step_offsets[i]
+
+    def step_rows(self, lo, hi):
+        """Zeilenbereich (start, end) der Steps lo..hi im nach Step sortierten Datensatz."""
+        if hi < lo:
+            return 0, 0
+        return int(self._offset(lo)), int(self._offset(hi + 1))
+
+    @timed("data.get_step_range", rows_arg="result")
+    def get_step_range(self, lo, hi):
+        """Alle Zeilen mit lo <= step <= hi als Slice ohne Kopie (O(1) über den Step-Index)."""
+        start, end = self.step_rows(lo, hi)
+        return self.df.iloc[start:end]
 
     def get_step_data(self, step):
         """Filtert Daten für einen spezifischen Step."""
-        return self.df[self.df['step'] == step]
+        return self.get_step_range(step, step)
 
     def stream_generator(self, step):
-            """
-            Simuliert den Live-Stream innerhalb eines Steps mit variabler Batch-Größe.
-            """
-            step_data = self.get_step_data(step)
-            shuffled_data = step_data.sample(frac=1).reset_index(drop=True)
-            
-            current_idx = 0
-            total_rows = len(shuffled_data)
-            
-            while current_idx < total_rows:
-                dynamic_batch_size = random.randint(8, 12)
-                
-                # Ende des Batches berechnen
-                end_idx = min(current_idx + dynamic_batch_size, total_rows)
-                
-                yield shuffled_data.iloc[current_idx:end_idx]
-                
-                current_idx = end_idx
\ No newline at end of file
+        """
+        Simuliert den Live-Stream innerhalb eines Steps mit variabler Batch-Größe (8-12 Zeilen).
+        """
+        return self.replay(step, step, batch_size=(8, 12))
+
+    def replay(self, lo, hi=None, rate=None, batch_size=(8, 12), window=None, seed=None, shuffle=True):
+        """
+        Spielt die Steps lo..hi als Transaktionsstrom ab (siehe StreamReplay).
+        rate: Ziel-Durchsatz in tx/s (None = so schnell wie möglich)
+        batch_size: feste Größe (int) oder Zufallsbereich (lo, hi)
+        window: Batch = alle Transaktionen eines Zeitfensters von window Sekunden bei rate
+        seed: macht Reihenfolge und Batch-Größen reproduzierbar
+        """
+        hi = lo if hi is None else hi
+        bounds = [(self._offset(step), self._offset(step + 1)) for step in range(lo, hi + 1)]
+        return StreamReplay(self.df, bounds, rate=rate, batch_size=batch_size,
+                            window=window, seed=seed, shuffle=shuffle)
+
+
+class StreamReplay:
+    """
+    Wiedergabe eines Step-Bereichs als Strom von Batches, synchron (for) oder asynchron (async for).
+    Gemischt wird je Step über eine Permutation der Zeilenpositionen; kopiert werden nur die
+    Zeilen des jeweils ausgegebenen Batches. Mit rate wird jeder Batch zu seinem Sollzeitpunkt
+    (Startzeit + bisher ausgegebene Zeilen / rate) ausgegeben, sodass sich Verzögerungen nicht
+    aufsummieren. stats() vergleicht erreichte und Ziel-Rate.
+    """
+
+    def __init__(self, df, bounds, rate=None, batch_size=(8, 12), window=None, seed=None, shuffle=True):
+        if rate is not None and rate <= 0:
+            raise ValueError("rate muss positiv sein")
+        if window is not None and (rate is None or window <= 0):
+            raise ValueError("window erfordert eine Ziel-Rate und eine positive Fensterlänge")
+        if isinstance(batch_size, int):
+            batch_size = (batch_size, batch_size)
+        if not 1 <= batch_size[0] <= batch_size[1]:
+            raise ValueError("batch_size muss >= 1 sein")
+        self.df = df
+        self.bounds = bounds
+        self.rate = rate
+        self.batch_size = batch_size
+        self.window = window
+        self.seed = seed
+        self.shuffle = shuffle
+        self.total_rows = sum(end - start for start, end in bounds)
+        self._reset()
+
+    def __len__(self):
+        return self.total_rows
+
+    def _reset(self):
+        self.rows = 0
+        self.batches = 0
+        self._started = None
+        self._last_emit = None
+        self._rows_before_last = 0
+
+    def _batches(self):
+        """Batches ohne Taktung: (Sollzeitpunkt relativ zum Start in Sekunden, DataFrame)."""
+        rng = np.random.default_rng(self.seed)
+        carry = 0.0
+        emitted = 0
+        for start, end in self.bounds:
+            positions = start + rng.permutation(end - start) if self.shuffle else np.arange(start, end)
+            i = 0
+            while i < len(positions):
+                if self.window is not None:
+                    # Zeilen, die im Zeitfenster eintreffen; Nachkommaanteil ins nächste Fenster
+                    due = self.rate * self.window + carry
+                    size = max(int(due), 1)
+                    carry = due - size
+                else:
+                    size = int(rng.integers(self.batch_size[0], self.batch_size[1] + 1))
+                batch = self.df.iloc[positions[i:i + size]]
+                offset = emitted / self.rate if self.rate else 0.0
+                yield offset, batch
+                emitted += len(batch)
+                i += size
+
+    def _emitted(self, batch):
+        now = time.perf_counter()
+        self._rows_before_last = self.rows
+        self._last_emit = now
+        self.rows += len(batch)
+        self.batches += 1
+
+    def __iter__(self):
+        self._reset()
+        self._started = time.perf_counter()
+        for offset, batch in self._batches():
+            wait = self._started + offset - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+            self._emitted(batch)
+            yield batch
+
+    async def __aiter__(self):
+        self._reset()
+        self._started = time.perf_counter()
+        for offset, batch in self._batches():
+            wait = self._started + offset - time.perf_counter()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._emitted(batch)
+            yield batch
+
+    def stats(self):
+        """Ziel- und erreichte Rate; gemessen zwischen erstem und letztem ausgegebenen Batch."""
+        span = (self._last_emit - self._started) if self._last_emit is not None else 0.0
+        achieved = self._rows_before_last / span if span > 0 else 0.0
+        return {
+            "rows": self.rows,
+            "batches": self.batches,
+            "target_rate": self.rate,
+            "achieved_rate": achieved,
+            "rate_ratio": achieved / self.rate if self.rate and achieved else None,
+        }
+
+
+# --- Spaltenbasierter Cache ---
+# Layout: ein Verzeichnis mit einer .npy-Datei je Spalte (memory-mapbar), dem
+# Kontonummern-Wörterbuch (accounts.npy, feste Breite) und meta.json mit Schema
+# und Fingerabdruck der Quelldatei.
+
+def default_cache_dir(file_path):
+    return f"{file_path}.colcache"
+
+def source_fingerprint(file_path):
+    """Größe und Änderungszeitpunkt der Quelldatei, reicht zur Erkennung von Änderungen."""
+    stat = os.stat(file_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+def _read_meta(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, "meta.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def cache_is_fresh(file_path, cache_dir):
+    """True, wenn der Cache existiert, zur aktuellen Version passt und die Quelle unverändert ist."""
+    meta = _read_meta(cache_dir)
+    if meta is None or meta.get("version") != CACHE_VERSION:
+        return False
+    if not os.path.exists(file_path):
+        # Nur der Cache liegt vor (z.B. Quelldatei archiviert): weiterverwenden
+        return True
+    return meta.get("source") == source_fingerprint(file_path)
+
+def _smallest_int_dtype(values):
+    if len(values) == 0:
+        return np.dtype(np.int8)
+    lo, hi = values.min(), values.max()
+    for dtype in (np.int8, np.int16, np.int32, np.int64):
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return np.dtype(dtype)
+
+def _compact_numeric(values):
+    """Kleinster verlustfreier Datentyp: int8/int16/int32 bzw. float32, sonst unverändert."""
+    if np.issubdtype(values.dtype, np.integer):
+        return values.astype(_smallest_int_dtype(values), copy=False)
+    if np.issubdtype(values.dtype, np.floating):
+        as_float32 = values.astype(np.float32)
+        # float32 nur, wenn jeder Wert exakt zurückgewandelt werden kann (Cent-Beträge meist nicht)
+        if np.array_equal(as_float32.astype(values.dtype), values, equal_nan=True):
+            return as_float32
+    return values
+
+@timed("data.build_columnar_cache")
+def build_columnar_cache(file_path, cache_dir=None):
+    """Überführt die CSV einmalig in den spaltenbasierten Cache und gibt das Cache-Verzeichnis zurück."""
+    cache_dir = cache_dir or default_cache_dir(file_path)
+    fingerprint = source_fingerprint(file_path)
+    raw = pd.read_csv(file_path, usecols=COLUMNS, dtype={'type': 'category', 'nameOrig': str, 'nameDest': str})
+    # Nach Step sortiert ablegen, damit der Step-Index beim Laden ohne Kopie auskommt
+    if not raw['step'].is_monotonic_increasing:
+        raw = raw.sort_values('step', kind='stable', ignore_index=True)
+
+    tmp_dir = f"{cache_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    schema = {}
+    # Ein gemeinsames, sortiertes Wörterbuch für Auftraggeber- und Zielkonten
+    account_codes, accounts = pd.factorize(pd.concat([raw[c] for c in ACCOUNT_COLUMNS], ignore_index=True),
+                                           sort=True)
+    account_codes = account_codes.astype(_smallest_int_dtype(account_codes), copy=False)
+    np.save(os.path.join(tmp_dir, "accounts.npy"), np.asarray(accounts, dtype=bytes))
+
+    for i, col in enumerate(ACCOUNT_COLUMNS):
+        np.save(os.path.join(tmp_dir, f"{col}.npy"), account_codes[i * len(raw):(i + 1) * len(raw)])
+        schema[col] = {"kind": "account"}
+
+    for col in COLUMNS:
+        if col in ACCOUNT_COLUMNS:
+            continue
+        if col == 'type':
+            codes = raw[col].cat.codes.to_numpy()
+            np.save(os.path.join(tmp_dir, f"{col}.npy"), codes)
+            schema[col] = {"kind": "category", "categories": list(raw[col].cat.categories)}
+        else:
+            np.save(os.path.join(tmp_dir, f"{col}.npy"), _compact_numeric(raw[col].to_numpy()))
+            schema[col] = {"kind": "numeric"}
+
+    meta = {"version": CACHE_VERSION, "source": fingerprint, "rows": len(raw),
+            "columns": COLUMNS, "schema": schema}
+    with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+    # Erst den fertigen Cache sichtbar machen, damit ein Abbruch keinen halben Cache hinterlässt
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    os.replace(tmp_dir, cache_dir)
+    return cache_dir
+
+def load_columnar_rows(cache_dir, rows, columns=None):
+    """
+    Liest ausgewählte Zeilen (Slice oder Positionen) und Spalten direkt aus dem Cache, ohne das
+    Konten-Wörterbuch aufzubauen: Kontospalten werden nur für diese Zeilen in Text aufgelöst.
+    Der Index entspricht den Zeilenpositionen im Cache.
+    """
+    meta = _read_meta(cache_dir)
+    if meta is None:
+        raise FileNotFoundError(f"Kein gültiger Cache unter {cache_dir}")
+    columns = meta["columns"] if columns is None else [c for c in meta["columns"] if c in columns]
+
+    accounts = None
+    data = {}
+    for col in columns:
+        values = np.load(os.path.join(cache_dir, f"{col}.npy"), mmap_mode='r')[rows]
+        spec = meta["schema"][col]
+        if spec["kind"] == "numeric":
+            data[col] = values
+        elif spec["kind"] == "category":
+            data[col] = pd.Categorical.from_codes(values, categories=spec["categories"])
+        else:
+            if accounts is None:
+                accounts = np.load(os.path.join(cache_dir, "accounts.npy"), mmap_mode='r')
+            data[col] = accounts[values].astype(str)
+    if isinstance(rows, slice):
+        index = pd.RangeIndex(*rows.indices(meta["rows"]))
+    else:
+        index = pd.Index(np.asarray(rows))
+    return pd.DataFrame(data, index=index, copy=False)
+
+@timed("data.load_columnar_cache", rows_arg="result")
+def load_columnar_cache(cache_dir):
+    """Lädt den Cache als DataFrame; numerische Spalten bleiben per Memory-Mapping auf der Platte."""
+    meta = _read_meta(cache_dir)
+    if meta is None:
+        raise FileNotFoundError(f"Kein gültiger Cache unter {cache_dir}")
+
+    def column(name):
+        return np.load(os.path.join(cache_dir, f"{name}.npy"), mmap_mode='r')
+
+    accounts_dtype = None
+    data = {}
+    for col in meta["columns"]:
+        spec = meta["schema"][col]
+        if spec["kind"] == "numeric":
+            data[col] = column(col)
+        elif spec["kind"] == "category":
+            data[col] = pd.Categorical.from_codes(column(col), categories=spec["categories"])
+        else:
+            # Wörterbuch nur einmal aufbauen und von beiden Kontospalten teilen.
+            # CategoricalDtype prüft die Kategorien auf Eindeutigkeit; per Hash-Tabelle kostet
+            # das bei Millionen Konten Sekunden. build_columnar_cache speichert das Wörterbuch
+            # sortiert ohne Duplikate: Die Monotonie-Prüfung bestätigt das in einem linearen
+            # Durchlauf und hinterlegt dabei auch is_unique, das CategoricalDtype dann nutzt.
+            if accounts_dtype is None:
+                accounts = pd.Index(np.load(os.path.join(cache_dir, "accounts.npy")).astype(str))
+                if not (accounts.is_monotonic_increasing and accounts.is_unique):
+                    raise ValueError(f"Konten-Wörterbuch in {cache_dir} ist nicht sortiert und eindeutig")
+                accounts_dtype = pd.CategoricalDtype(accounts)
+            data[col] = pd.Categorical.from_codes(column(col), dtype=accounts_dtype, validate=False)
+    return pd.DataFrame(data, copy=False)
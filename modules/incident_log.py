@@ -0,0 +1,173 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from modules.instrumentation import timed
+
+# Identität einer Transaktion (PaySim hat keine Transaktions-ID)
+KEY_COLUMNS = ['step', 'type', 'amount', 'nameOrig', 'nameDest', 'oldbalanceOrg']
+
+
+def with_plain_values(df):
+    """
+    Kopie mit kategorialen Spalten als einfache Werte. Wenige Incidents tragen sonst das
+    gesamte Kategorien-Wörterbuch (Millionen Konten) mit, z.B. in to_csv oder beim Pickling.
+    """
+    return df.assign(**{
+        c: df[c].to_numpy() for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)
+    })
+
+def append_incidents_csv(path, df):
+    """Hängt Fälle an eine CSV-Datei an (Kopfzeile nur beim ersten Schreiben)."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    write_header = not os.path.exists(path) or os.path.getsize(path) == 0
+    with_plain_values(df).to_csv(path, mode='a', header=write_header, index=False)
+
+
+class _ColumnBuffer:
+    """Spaltenpuffer mit Kapazitätsverdopplung (amortisiert O(1) je angehängter Zeile)."""
+
+    def __init__(self, series, capacity):
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # Kategoriale Spalten (z.B. aus dem Spalten-Cache) als Codes ablegen
+            self.kind = "category"
+            self.dtype = series.dtype
+            storage = series.cat.codes.dtype
+        elif series.dtype.kind in "biufcmM":
+            self.kind = "numeric"
+            self.dtype = series.dtype
+            storage = series.dtype
+        else:
+            self.kind = "object"
+            self.dtype = np.dtype(object)
+            storage = self.dtype
+        self.data = np.empty(capacity, dtype=storage)
+
+    def _values(self, series):
+        if self.kind == "category":
+            if series.dtype == self.dtype:
+                return series.cat.codes.to_numpy()
+            # Andere Kategorien: auf Objekt-Speicher umstellen
+            self._to_object()
+        if self.kind == "object":
+            return series.astype(object).to_numpy()
+        return series.to_numpy().astype(self.data.dtype, copy=False)
+
+    def _to_object(self):
+        codes = self.data
+        categories = np.asarray(self.dtype.categories, dtype=object)
+        self.data = np.where(codes >= 0, categories[np.maximum(codes, 0)], None).astype(object)
+        self.kind = "object"
+        self.dtype = np.dtype(object)
+
+    def write(self, start, series):
+        values = self._values(series)
+        end = start + len(values)
+        if end > len(self.data):
+            grown = np.empty(max(end, 2 * len(self.data)), dtype=self.data.dtype)
+            grown[:start] = self.data[:start]
+            self.data = grown
+        self.data[start:end] = values
+
+    def view(self, size):
+        values = self.data[:size]
+        values.flags.writeable = False
+        if self.kind == "category":
+            return pd.Categorical.from_codes(values, dtype=self.dtype, validate=False)
+        if self.kind == "object":
+            return pd.array(values, dtype=object, copy=False)
+        return values
+
+
+class IncidentLog:
+    """
+    Append-only Incident Log für den Live-Scan.
+    Neue Fälle werden in spaltenweise Puffer geschrieben statt das gesamte Log bei jedem
+    Batch per pd.concat zu kopieren. Duplikate werden über einen Hash der Transaktions-
+    Identität (KEY_COLUMNS) erkannt. Mit path wird jedes Append zusätzlich an eine
+    CSV-Datei angehängt und das Log beim nächsten Start von dort wiederhergestellt.
+    """
+
+    def __init__(self, path=None, initial_capacity=1024):
+        self.path = path
+        self.initial_capacity = initial_capacity
+        self.version = 0
+        self._reset()
+        if path and os.path.exists(path) and os.path.getsize(path) > 0:
+            self.append(pd.read_csv(path), persist=False)
+
+    def _reset(self):
+        self._columns = None
+        self._order = []
+        self._size = 0
+        self._keys = set()
+        self._view = None
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def empty(self):
+        return self._size == 0
+
+    def _row_keys(self, df):
+        keys = [c for c in KEY_COLUMNS if c in df.columns] or list(df.columns)
+        # Kategoriale Spalten vorher auflösen: hash_pandas_object würde sonst das gesamte
+        # Kategorien-Wörterbuch (Millionen Konten) bei jedem Batch hashen
+        key_df = pd.DataFrame({
+            c: df[c].to_numpy() if isinstance(df[c].dtype, pd.CategoricalDtype) else df[c]
+            for c in keys
+        })
+        return pd.util.hash_pandas_object(key_df, index=False).to_numpy()
+
+    @timed("incident_log.append", rows_arg=1)
+    def append(self, df, persist=True):
+        """Hängt neue Fälle an; bereits bekannte Transaktionen werden übersprungen. Gibt die Anzahl neuer Zeilen zurück."""
+        if df.empty:
+            return 0
+
+        new_rows = []
+        for i, key in enumerate(self._row_keys(df)):
+            if key not in self._keys:
+                self._keys.add(key)
+                new_rows.append(i)
+        if not new_rows:
+            return 0
+        new = df.iloc[new_rows] if len(new_rows) < len(df) else df
+
+        if self._columns is None:
+            self._order = list(new.columns)
+            self._columns = {c: _ColumnBuffer(new[c], self.initial_capacity) for c in self._order}
+        for c in self._order:
+            self._columns[c].write(self._size, new[c])
+        self._size += len(new)
+        self.version += 1
+        self._view = None
+
+        if persist and self.path:
+            self._persist(new)
+        return len(new)
+
+    def _persist(self, new):
+        append_incidents_csv(self.path, new[self._order])
+
+    def view(self):
+        """Schreibgeschützte DataFrame-Sicht auf das Log (wird je Version nur einmal aufgebaut)."""
+        if self._view is None:
+            if self._columns is None:
+                self._view = pd.DataFrame()
+            else:
+                self._view = pd.DataFrame(
+                    {c: self._columns[c].view(self._size) for c in self._order}, copy=False
+                )
+        return self._view
+
+    def clear(self):
+        """Leert das Log inklusive der Datei auf der Platte."""
+        self._reset()
+        self.version += 1
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,179 @@
+import bisect
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows: kein getrusage, Speicher-Hochwasser entfällt
+    resource = None
+
+# Aktivierung per Umgebungsvariable (SENTINEL_DIAGNOSTICS=1) oder set_enabled()
+ENV_VAR = "SENTINEL_DIAGNOSTICS"
+
+# Latenz-Buckets: logarithmisch von 1 µs bis 100 s, vier Buckets je Zehnerpotenz
+_BUCKET_EDGES = [10 ** (exp / 4) for exp in range(-24, 9)]
+
+_enabled = os.environ.get(ENV_VAR, "").lower() in ("1", "true", "yes")
+_lock = threading.Lock()
+_stages = {}
+
+
+def is_enabled():
+    return _enabled
+
+def set_enabled(enabled=True):
+    global _enabled
+    _enabled = bool(enabled)
+
+def reset():
+    with _lock:
+        _stages.clear()
+
+def process_peak_rss_mb():
+    """
+    Speicher-Hochwasser des gesamten Prozesses (ru_maxrss) in MiB, None ohne getrusage.
+    Der Wert gilt prozessweit seit dem Start und lässt sich keiner Stufe zuordnen.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux meldet KiB, macOS Bytes
+    return (peak if sys.platform == "darwin" else peak * 1024) / 2**20
+
+
+class _StageStats:
+    __slots__ = ("count", "total_s", "max_s", "rows", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+        self.rows = 0
+        self.buckets = [0] * (len(_BUCKET_EDGES) + 1)
+
+    def percentile(self, q):
+        """Obere Bucket-Grenze, unter der mindestens q der Messungen liegen."""
+        target = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= target:
+                return min(_BUCKET_EDGES[i], self.max_s) if i < len(_BUCKET_EDGES) else self.max_s
+        return self.max_s
+
+
+def record(name, seconds, rows=0):
+    """Verbucht eine Messung für die Stufe name (wird nur bei aktivierter Messung aufgerufen)."""
+    with _lock:
+        stats = _stages.get(name)
+        if stats is None:
+            stats = _stages[name] = _StageStats()
+        stats.count += 1
+        stats.total_s += seconds
+        stats.max_s = max(stats.max_s, seconds)
+        stats.rows += rows
+        stats.buckets[bisect.bisect_left(_BUCKET_EDGES, seconds)] += 1
+
+
+class _Stage:
+    __slots__ = ("name", "rows", "start")
+
+    def __init__(self, name, rows):
+        self.name = name
+        self.rows = rows
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self.start, self.rows)
+        return False
+
+
+class _NoStage:
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        # stage(...).rows = n bleibt ohne Aktivierung folgenlos
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NO_STAGE = _NoStage()
+
+def stage(name, rows=0):
+    """Kontextmanager für eine Messstufe; ohne Aktivierung ein geteiltes No-op-Objekt."""
+    return _Stage(name, rows) if _enabled else _NO_STAGE
+
+def timed(name, rows_arg=None):
+    """
+    Dekorator für eine Messstufe. rows_arg: Position des Arguments, dessen len() als
+    Zeilenzahl verbucht wird (bei Methoden zählt self als Position 0), oder "result".
+    Ohne Aktivierung kostet ein Aufruf nur die Prüfung eines Modul-Flags.
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            result = fn(*args, **kwargs)
+            if rows_arg == "result":
+                rows = len(result)
+            elif rows_arg is not None and len(args) > rows_arg:
+                rows = len(args[rows_arg])
+            else:
+                rows = 0
+            record(name, time.perf_counter() - start, rows)
+            return result
+        return wrapper
+    return decorate
+
+
+def snapshot():
+    """Kennzahlen je Stufe: Aufrufe, Latenz (Mittel, p50/p95/p99, Max) in ms, Zeilen/s."""
+    with _lock:
+        result = []
+        for name, stats in sorted(_stages.items(), key=lambda item: item[0]):
+            result.append({
+                "stage": name,
+                "count": stats.count,
+                "total_ms": stats.total_s * 1000,
+                "mean_ms": stats.total_s / stats.count * 1000,
+                "p50_ms": stats.percentile(0.50) * 1000,
+                "p95_ms": stats.percentile(0.95) * 1000,
+                "p99_ms": stats.percentile(0.99) * 1000,
+                "max_ms": stats.max_s * 1000,
+                "rows": stats.rows,
+                "rows_per_s": stats.rows / stats.total_s if stats.rows and stats.total_s > 0 else None,
+            })
+    return result
+
+def to_jsonl(records=None):
+    """
+    Kennzahlen als JSON Lines mit Zeitstempel: zuerst eine Zeile mit dem Speicher-Hochwasser
+    des Prozesses (ohne stage), danach eine Zeile je Stufe.
+    """
+    timestamp = time.strftime("%Y-%m-%dT%H:%M:%S%z")
+    records = snapshot() if records is None else records
+    lines = [{"ts": timestamp, "process_peak_rss_mb": process_peak_rss_mb()}]
+    lines += [{"ts": timestamp, **r} for r in records]
+    return "".join(json.dumps(line) + "\n" for line in lines)
+
+def export_jsonl(path):
+    """Hängt den aktuellen Stand an eine JSONL-Datei an (für Verlaufsvergleiche)."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(to_jsonl())
+    return path
@@ -0,0 +1,110 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+class LiveStreamRuntime:
+    """
+    Asynchroner Live-Scan: ein Producer gibt Batches im Takt von delay aus, ein Consumer
+    bewertet sie mit der ComplianceEngine. Beide sind über eine begrenzte Queue verbunden
+    (Backpressure: ist die Queue voll, wartet der Producer). Ein dritter Task ruft
+    on_update in festem Abstand auf, unabhängig davon, wie schnell das Scoring läuft.
+    Asynchron iterierbare Quellen mit Ziel-Rate (StreamReplay mit rate) takten sich selbst,
+    alle übrigen Quellen werden im Takt von delay ausgegeben.
+    """
+
+    def __init__(self, engine, delay=0.0, queue_size=8, refresh_interval=0.5, alert_level="HIGH"):
+        self.engine = engine
+        self.delay = delay
+        self.queue_size = queue_size
+        self.refresh_interval = refresh_interval
+        self.alert_level = alert_level
+        self._reset()
+
+    def _reset(self):
+        self.snapshot = None
+        self.version = 0
+        self.transactions = 0
+        self.batches = 0
+        self.alerts = 0
+        self.alert_latencies = []
+        self._done = False
+
+    async def _producer(self, queue, batches):
+        if hasattr(batches, "__aiter__"):
+            # Quelle mit eigener Taktung (StreamReplay mit Ziel-Rate); ohne Rate gilt delay
+            delay = self.delay if getattr(batches, "rate", None) is None else 0.0
+            async for batch in batches:
+                await queue.put((time.perf_counter(), batch))
+                if delay:
+                    await asyncio.sleep(delay)
+        else:
+            for batch in batches:
+                # Zeitstempel der Ausgabe für die End-to-End-Latenz bis zum Alarm
+                await queue.put((time.perf_counter(), batch))
+                await asyncio.sleep(self.delay)
+        await queue.put(None)
+
+    async def _consumer(self, queue, executor, on_batch):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            emitted, batch = item
+            # Scoring im Hilfsthread, damit der Render-Takt der Event-Loop nicht hängt
+            analyzed = await loop.run_in_executor(executor, self.engine.process_batch, batch)
+
+            alerts = int((analyzed['risk_level'] == self.alert_level).sum())
+            if alerts:
+                self.alerts += alerts
+                self.alert_latencies.append(time.perf_counter() - emitted)
+            self.transactions += len(batch)
+            self.batches += 1
+            if on_batch is not None:
+                on_batch(analyzed)
+            self.snapshot = {"batch": batch, "analyzed": analyzed, "alerts": alerts}
+            self.version += 1
+        self._done = True
+
+    async def _renderer(self, on_update):
+        rendered = 0
+        while not self._done:
+            await asyncio.sleep(self.refresh_interval)
+            if self.version != rendered and self.snapshot is not None:
+                rendered = self.version
+                on_update(self.snapshot)
+        # Letzten Stand immer anzeigen
+        if self.version != rendered and self.snapshot is not None:
+            on_update(self.snapshot)
+
+    async def run(self, batches, on_batch=None, on_update=None):
+        """Verarbeitet alle Batches; gibt Durchsatz- und Latenzkennzahlen zurück."""
+        self._reset()
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            tasks = [self._producer(queue, batches), self._consumer(queue, executor, on_batch)]
+            if on_update is not None:
+                tasks.append(self._renderer(on_update))
+            await asyncio.gather(*tasks)
+        return self.stats(time.perf_counter() - started)
+
+    def run_sync(self, batches, on_batch=None, on_update=None):
+        """Blockierende Variante für Streamlit und Skripte."""
+        return asyncio.run(self.run(batches, on_batch=on_batch, on_update=on_update))
+
+    def stats(self, elapsed):
+        latencies = np.array(self.alert_latencies) * 1000
+        return {
+            "transactions": self.transactions,
+            "batches": self.batches,
+            "alerts": self.alerts,
+            "elapsed_s": elapsed,
+            "tx_per_sec": self.transactions / elapsed if elapsed > 0 else 0.0,
+            "alert_latency_ms_mean": float(latencies.mean()) if len(latencies) else 0.0,
+            "alert_latency_ms_p95": float(np.percentile(latencies, 95)) if len(latencies) else 0.0,
+            "alert_latency_ms_max": float(latencies.max()) if len(latencies) else 0.0,
+        }
@@ -1,7 +1,102 @@
+import hashlib
 import io
+import json
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
 from fpdf import FPDF
+from modules.compliance_engine import decode_flags
+from modules.instrumentation import timed
+
+INCIDENT_HEADER = ['Step', 'Type', 'Amount', 'Risk-Level', 'Flags']
+INCIDENT_WIDTHS = [15, 30, 30, 25, 90] # Gesamtbreite 190mm
+SUMMARY_HEADER = ['Type', 'Flags', 'Anzahl', 'Summe Amount']
+SUMMARY_WIDTHS = [30, 100, 25, 35]
+ROW_HEIGHT = 7
+
+
+def _ascii(values, max_chars=None):
+    """Text ohne Umlaute/Symbole (latin-1-kompatibel); jeder unterschiedliche Wert wird nur einmal bereinigt."""
+    codes, uniques = pd.factorize(pd.Series(values, copy=False), use_na_sentinel=False)
+    cleaned = np.array([str(v).encode('ascii', 'ignore').decode('ascii')[:max_chars] for v in uniques], dtype=object)
+    return cleaned[codes]
+
+def _amounts(values):
+    return [f"{amount:,.2f}" for amount in np.asarray(values, dtype=float).tolist()]
+
+@timed("pdf.format_rows", rows_arg=0)
+def format_incident_rows(incident_df, rules=None):
+    """Formatiert alle Tabellenspalten spaltenweise vorab; gibt eine Liste von Text-Tupeln zurück."""
+    if 'flags' in incident_df.columns:
+        # Flag-Bitmaske einmalig für alle Zeilen in Klartext übersetzen
+        flag_labels = decode_flags(incident_df['flags'], rules)
+    else:
+        flag_labels = ['None'] * len(incident_df)
+    return list(zip(
+        _ascii(incident_df['step'].to_numpy()),
+        _ascii(incident_df['type'].to_numpy()),
+        _amounts(incident_df['amount'].to_numpy()),
+        _ascii(incident_df['risk_level'].to_numpy()),
+        _ascii(flag_labels, max_chars=60),
+    ))
+
+def _table_header(pdf, header, widths):
+    pdf.set_fill_color(240, 240, 240)
+    for width, col in zip(widths, header):
+        pdf.cell(width, 8, col, 1, 0, 'C', fill=True)
+    pdf.ln()
+
+def _table_rows(pdf, rows, widths, h=ROW_HEIGHT):
+    """
+    Zeichnet Tabellenzeilen mit text()/line() statt einer cell() je Feld: cell() prüft
+    Zeilenumbrüche und kopiert den Grafikzustand bei jedem Aufruf (~8x teurer).
+    Das Ergebnis entspricht optisch linksbündigen cell()-Zeilen mit Rahmen.
+    """
+    edges = np.cumsum([pdf.l_margin] + list(widths)).tolist()
+    text_x = [x + pdf.c_margin for x in edges[:-1]]
+    baseline = 0.5 * h + 0.3 * pdf.font_size
+
+    def frame(top, bottom):
+        pdf.line(edges[0], top, edges[-1], top)
+        for x in edges:
+            pdf.line(x, top, x, bottom)
+
+    y = top = pdf.get_y()
+    for row in rows:
+        if y + h > pdf.page_break_trigger:
+            frame(top, y)
+            pdf.add_page()
+            y = top = pdf.get_y()
+        for x, value in zip(text_x, row):
+            pdf.text(x, y + baseline, value)
+        y += h
+        pdf.line(edges[0], y, edges[-1], y)
+    frame(top, y)
+    pdf.set_y(y)
 
-def generate_audit_pdf(incident_df, stats, steps, liq_metrics):
+def _summary_rows(incident_df, rules=None):
+    """Verdichtung nach Type und Flags (Anzahl, Summe Amount), größte Gruppen zuerst."""
+    if 'flags' in incident_df.columns:
+        flag_labels = decode_flags(incident_df['flags'], rules)
+    else:
+        flag_labels = np.full(len(incident_df), 'None', dtype=object)
+    groups = pd.DataFrame({
+        'type': _ascii(incident_df['type'].to_numpy()),
+        'flags': _ascii(flag_labels, max_chars=65),
+        'amount': np.asarray(incident_df['amount'], dtype=float),
+    }).groupby(['type', 'flags'], sort=False)['amount'].agg(['size', 'sum'])
+    groups = groups.sort_values('size', ascending=False, kind='stable')
+    return [(t, f, f"{n:,}", f"{total:,.2f}")
+            for (t, f), n, total in zip(groups.index, groups['size'].tolist(), groups['sum'].tolist())]
+
+@timed("pdf.generate", rows_arg=0)
+def generate_audit_pdf(incident_df, stats, steps, liq_metrics, rules=None, max_rows=None):
+    """
+    Erzeugt den Audit-Bericht als PDF-Bytes.
+    max_rows begrenzt die Einzelauflistung des Incident Logs (Fälle mit dem höchsten
+    risk_score zuerst); die übrigen Fälle erscheinen verdichtet in einem Anhang.
+    """
     # fpdf2 nutzen (Standard in modernen Umgebungen)
     pdf = FPDF()
     pdf.add_page()
@@ -64,28 +159,69 @@ def generate_audit_pdf(incident_df, stats, steps, liq_metrics):
     pdf.set_font("Arial", size=8)
 
     if not incident_df.empty:
-        header = ['Step', 'Type', 'Amount', 'Risk-Level', 'Flags']
-        w = [15, 30, 30, 25, 90] # Gesamtbreite 190mm
-        
-        # Tabellenkopf
-        pdf.set_fill_color(240, 240, 240)
-        for i, col in enumerate(header):
-            pdf.cell(w[i], 8, col, 1, 0, 'C', fill=True)
-        pdf.ln()
-        
-        # Datenzeilen
-        for _, row in incident_df.iterrows():
-            # Daten säubern (Umlaute/Symbole entfernen für latin-1 Kompatibilität)
-            clean_type = str(row['type']).encode('ascii', 'ignore').decode('ascii')
-            clean_flags = str(row.get('flags', 'None')).encode('ascii', 'ignore').decode('ascii')[:60]
-            
-            pdf.cell(w[0], 7, str(row['step']), 1)
-            pdf.cell(w[1], 7, clean_type, 1)
-            pdf.cell(w[2], 7, f"{float(row['amount']):,.2f}", 1)
-            pdf.cell(w[3], 7, str(row['risk_level']), 1)
-            pdf.cell(w[4], 7, clean_flags, 1)
-            pdf.ln()
+        listed, omitted = incident_df, incident_df.iloc[0:0]
+        if max_rows is not None and len(incident_df) > max_rows:
+            # Höchste Scores einzeln, Reihenfolge innerhalb der Auswahl wie im Log
+            if 'risk_score' in incident_df.columns:
+                order = np.argsort(-incident_df['risk_score'].to_numpy(), kind='stable')
+            else:
+                order = np.arange(len(incident_df))
+            keep = np.zeros(len(incident_df), dtype=bool)
+            keep[order[:max_rows]] = True
+            listed, omitted = incident_df[keep], incident_df[~keep]
+
+        _table_header(pdf, INCIDENT_HEADER, INCIDENT_WIDTHS)
+        _table_rows(pdf, format_incident_rows(listed, rules), INCIDENT_WIDTHS)
+
+        if not omitted.empty:
+            pdf.ln(8)
+            pdf.set_font("Arial", 'B', 14)
+            pdf.cell(190, 10, "4. Anhang: Verdichtung weiterer Incidents", ln=True)
+            pdf.set_font("Arial", size=10)
+            pdf.multi_cell(180, 6,
+                f"{len(omitted):,} von {len(incident_df):,} Faellen sind nicht einzeln aufgefuehrt "
+                f"(Einzelauflistung begrenzt auf {max_rows:,} Faelle mit dem hoechsten Score)."
+            )
+            pdf.ln(2)
+            pdf.set_font("Arial", size=8)
+            _table_header(pdf, SUMMARY_HEADER, SUMMARY_WIDTHS)
+            _table_rows(pdf, _summary_rows(omitted, rules), SUMMARY_WIDTHS)
     else:
         pdf.cell(190, 10, "Keine Live-Incidents aufgezeichnet.", ln=True)
 
-    return bytes(pdf.output())
\ No newline at end of file
+    return bytes(pdf.output())
+
+
+# --- Bericht-Cache ---
+# Streamlit führt das Skript bei jeder Interaktion neu aus; der Bericht wird nur neu
+# erzeugt, wenn sich eine seiner Eingaben geändert hat.
+
+def report_key(log_version, steps, stats, liq_metrics, rules=None, max_rows=None):
+    """Inhalts-Hash über alle Eingaben eines Berichts (Incident-Log-Version statt Log-Inhalt)."""
+    payload = json.dumps(
+        [log_version, list(steps), stats, liq_metrics,
+         rules.config.model_dump() if rules is not None else None, max_rows],
+        sort_keys=True, default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class ReportCache:
+    """Die zuletzt erzeugten Berichte (LRU, maxsize Einträge) nach report_key."""
+
+    def __init__(self, maxsize=4):
+        self.maxsize = maxsize
+        self._reports = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, key, build):
+        if key in self._reports:
+            self._reports.move_to_end(key)
+            self.hits += 1
+            return self._reports[key]
+        self.misses += 1
+        report = build()
+        self._reports[key] = report
+        if len(self._reports) > self.maxsize:
+            self._reports.popitem(last=False)
+        return report
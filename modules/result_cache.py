@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from modules.instrumentation import timed
+from modules.stats_engine import StepSummaryBuilder
+
+
+def engine_fingerprint(engine):
+    """Kurzer Hash des Regelsatzes (Regeln, Parameter, Gewichte, Risikostufen) einer Engine."""
+    return hashlib.sha256(engine.rules.config.model_dump_json().encode("utf-8")).hexdigest()[:16]
+
+def data_fingerprint(streamer):
+    """Kurzer Hash des geladenen Datenstands (siehe DataStreamer.fingerprint)."""
+    payload = json.dumps(streamer.fingerprint(), sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+def default_results_dir(file_path):
+    return f"{file_path}.results"
+
+
+class _CoveredSummary:
+    """Step-Tabelle eines Regelsatzes samt Markierung, welche Steps bereits ausgewertet sind."""
+
+    def __init__(self, engine, min_step, max_step):
+        self.min_step = min_step
+        self.builder = StepSummaryBuilder(engine, steps=(min_step, max_step))
+        self.covered = np.zeros(max(max_step - min_step + 1, 0), dtype=bool)
+        self._summary = None
+
+    def gaps(self, lo, hi):
+        """Zusammenhängende, noch nicht ausgewertete Step-Bereiche innerhalb lo..hi."""
+        missing = ~self.covered[lo - self.min_step:hi - self.min_step + 1]
+        if not missing.any():
+            return []
+        edges = np.flatnonzero(np.diff(np.concatenate([[0], missing.astype(np.int8), [0]])))
+        return [(lo + int(a), lo + int(b) - 1) for a, b in zip(edges[::2], edges[1::2])]
+
+    def fill(self, frame, lo, hi, chunk_rows):
+        """Verbucht die Zeilen der Steps lo..hi blockweise."""
+        for start in range(0, len(frame), chunk_rows):
+            self.builder.add(frame.iloc[start:start + chunk_rows])
+        self.covered[lo - self.min_step:hi - self.min_step + 1] = True
+        self._summary = None
+
+    def summary(self):
+        if self._summary is None:
+            self._summary = self.builder.result()
+        return self._summary
+
+
+class StepSummaryCache:
+    """
+    Ergebnis-Cache der Statistischen Revision.
+    Je (Regelsatz-Hash, Datenstand-Hash) wird eine StepSummary gehalten, die nur für die
+    tatsächlich angefragten Steps berechnet ist: Wird nach 1-100 der Zeitraum 1-200
+    angefragt, werden nur die Steps 101-200 bewertet. Der Speicher hält höchstens maxsize
+    Regelsätze (LRU); mit spill_dir wird jeder Stand zusätzlich als .npz abgelegt und bei
+    erneuter Anfrage (auch nach einem Neustart) von dort geladen.
+    """
+
+    def __init__(self, streamer, maxsize=4, spill_dir=None, chunk_rows=1_000_000):
+        self.streamer = streamer
+        self.maxsize = maxsize
+        self.spill_dir = spill_dir
+        self.chunk_rows = chunk_rows
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.scored_steps = 0
+        self.reused_steps = 0
+
+    def key(self, engine):
+        return engine_fingerprint(engine), data_fingerprint(self.streamer)
+
+    def _spill_path(self, key):
+        return os.path.join(self.spill_dir, f"summary-{key[0]}-{key[1]}.npz")
+
+    def _entry(self, engine, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return entry
+
+        entry = _CoveredSummary(engine, self.streamer.min_step, self.streamer.max_step)
+        if self.spill_dir and os.path.exists(self._spill_path(key)):
+            with np.load(self._spill_path(key)) as spilled:
+                # Abgelegte Stände mit anderem Aufbau (z.B. ältere Version) werden neu berechnet
+                if ("score_hist" in spilled and spilled["table"].shape == entry.builder.table.shape
+                        and spilled["score_hist"].shape == entry.builder.score_hist.shape):
+                    entry.builder.table[:] = spilled["table"]
+                    entry.builder.score_hist[:] = spilled["score_hist"]
+                    entry.covered[:] = spilled["covered"]
+        self._entries[key] = entry
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return entry
+
+    def _spill(self, key, entry):
+        os.makedirs(self.spill_dir, exist_ok=True)
+        path = self._spill_path(key)
+        tmp_path = f"{path}.tmp-{os.getpid()}.npz"
+        np.savez(tmp_path, table=entry.builder.table, score_hist=entry.builder.score_hist, covered=entry.covered)
+        os.replace(tmp_path, path)
+
+    @timed("cache.step_summary")
+    def summary(self, engine, lo, hi):
+        """StepSummary, die mindestens die Steps lo..hi abdeckt (fehlende Steps werden nachberechnet)."""
+        if getattr(engine, "account_state", None) is not None:
+            # Zustandsbehaftete Regeln hängen von der Reihenfolge ab, Teilbereiche sind nicht kombinierbar
+            raise ValueError("StepSummaryCache erfordert eine Engine ohne stateful-Regeln")
+        lo = max(lo, self.streamer.min_step)
+        hi = min(hi, self.streamer.max_step)
+        key = self.key(engine)
+        with self._lock:
+            entry = self._entry(engine, key)
+            if hi < lo:
+                return entry.summary()
+            gaps = entry.gaps(lo, hi)
+            new_steps = sum(b - a + 1 for a, b in gaps)
+            self.reused_steps += (hi - lo + 1) - new_steps
+            self.scored_steps += new_steps
+            for a, b in gaps:
+                entry.fill(self.streamer.get_step_range(a, b), a, b, self.chunk_rows)
+            if gaps and self.spill_dir:
+                self._spill(key, entry)
+            return entry.summary()
+
+    def performance_report(self, engine, lo, hi):
+        """Szenario-Vergleich für lo..hi (Format von get_performance_report)."""
+        return self.summary(engine, lo, hi).performance_report(lo, hi)
@@ -0,0 +1,345 @@
+import ast
+import json
+import os
+from typing import Literal
+
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel, Field, field_validator, model_validator
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "rules.json")
+
+
+class RuleConfig(BaseModel):
+    """
+    Deklaration einer einzelnen Regel: benötigte Spalten, Prädikat, Gewicht und Flag-Name.
+    Texte sind nur in Gleichheitsvergleichen und Listen erlaubt (type == 'TRANSFER',
+    type in ['TRANSFER', 'CASH_OUT']), Arithmetik und Ordnungsvergleiche nur auf Zahlen.
+    """
+    flag: str
+    weight: int
+    columns: list[str]
+    predicate: str
+    description: str = ""
+
+
+class StatefulRuleConfig(BaseModel):
+    """Regel über die Historie eines Kontos (siehe modules/account_state.py), Schwellen in params."""
+    flag: str
+    weight: int
+    kind: Literal["velocity", "transfer_cashout", "fan_in"]
+    description: str = ""
+
+
+class AccountStateConfig(BaseModel):
+    """Speichergrenzen des Konten-Zustands: max. Anzahl Konten, Verfall und Fensterlänge in Steps."""
+    capacity: int = Field(default=500_000, gt=0)
+    ttl_steps: int = Field(default=24, gt=0)
+    window_steps: int = Field(default=24, gt=0)
+
+
+class RiskLevelConfig(BaseModel):
+    name: str
+    min_score: int
+
+
+class RuleSetConfig(BaseModel):
+    """Vollständiger Regelsatz, wie er aus der Konfigurationsdatei geladen wird."""
+    params: dict[str, float] = Field(default_factory=dict)
+    rules: list[RuleConfig]
+    stateful_rules: list[StatefulRuleConfig] = Field(default_factory=list)
+    account_state: AccountStateConfig = Field(default_factory=AccountStateConfig)
+    risk_levels: list[RiskLevelConfig]
+    default_level: str = "LOW"
+    high_confidence_score: int = 55
+
+    @field_validator("risk_levels")
+    @classmethod
+    def _sort_levels(cls, levels):
+        # Höchste Stufe zuerst, damit die Zuordnung von oben nach unten greift
+        return sorted(levels, key=lambda level: level.min_score, reverse=True)
+
+    @model_validator(mode="after")
+    def _check_unique_flags(self):
+        flags = [rule.flag for rule in self.rules + self.stateful_rules]
+        duplicates = {flag for flag in flags if flags.count(flag) > 1}
+        if duplicates:
+            raise ValueError(f"Doppelte Flag-Namen im Regelsatz: {sorted(duplicates)}")
+        if len(flags) > 64:
+            raise ValueError("Maximal 64 Regeln pro Regelsatz (ein Bit je Flag)")
+        return self
+
+
+# --- Kompilierung der Prädikate ---
+# Erlaubt ist eine kleine Teilmenge von Python-Ausdrücken (Vergleiche, Arithmetik,
+# and/or/not, abs() und "in [...]"); Text-Konstanten nur in "==", "!=" und "in". Jeder Teilausdruck wird über einen kanonischen
+# Schlüssel genau einmal in den Plan aufgenommen, gemeinsame Teilausdrücke mehrerer
+# Regeln (z.B. "amount > 0") werden so nur einmal pro Batch berechnet.
+
+_BINARY_OPS = {
+    ast.Add: ("add", np.add, True),
+    ast.Sub: ("sub", np.subtract, False),
+    ast.Mult: ("mul", np.multiply, True),
+    ast.Div: ("div", np.true_divide, False),
+}
+
+_COMPARE_OPS = {
+    ast.Eq: ("eq", np.equal, True),
+    ast.NotEq: ("ne", np.not_equal, True),
+    ast.Lt: ("lt", np.less, False),
+    ast.LtE: ("le", np.less_equal, False),
+    ast.Gt: ("gt", np.greater, False),
+    ast.GtE: ("ge", np.greater_equal, False),
+}
+
+_BOOL_OPS = {
+    ast.And: ("and", np.logical_and),
+    ast.Or: ("or", np.logical_or),
+}
+
+
+class EvaluationPlan:
+    """
+    Kompilierter Regelsatz: eine topologisch sortierte Liste eindeutiger Operationen.
+    evaluate() berechnet jede Operation genau einmal und liefert eine Maske je Regel.
+    """
+
+    def __init__(self, rules, params):
+        self.params = dict(params)
+        self.columns = []
+        self._ops = []
+        self._slots = {}
+        self.rule_slots = []
+
+        for rule in rules:
+            try:
+                tree = ast.parse(rule.predicate, mode="eval")
+                slot = self._compile(tree.body, set(rule.columns))
+            except (SyntaxError, ValueError) as e:
+                raise ValueError(f"Regel {rule.flag}: ungültiges Prädikat '{rule.predicate}' ({e})") from e
+            self.rule_slots.append(slot)
+
+    @property
+    def size(self):
+        """Anzahl eindeutiger Operationen im Plan."""
+        return len(self._ops)
+
+    def _add(self, key, op):
+        if key not in self._slots:
+            self._slots[key] = len(self._ops)
+            self._ops.append(op)
+        return self._slots[key]
+
+    def _compile(self, node, allowed_columns):
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+            return self._add(("const", node.value), ("const", node.value))
+
+        if isinstance(node, ast.Name):
+            if node.id in allowed_columns:
+                if node.id not in self.columns:
+                    self.columns.append(node.id)
+                return self._add(("col", node.id), ("col", node.id))
+            if node.id in self.params:
+                value = self.params[node.id]
+                return self._add(("const", value), ("const", value))
+            raise ValueError(f"unbekannter Name '{node.id}' (nicht in columns/params)")
+
+        if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPS:
+            name, fn, commutative = _BINARY_OPS[type(node.op)]
+            return self._binary(name, fn, commutative, node.left, node.right, allowed_columns)
+
+        if isinstance(node, ast.UnaryOp):
+            operand = self._compile(node.operand, allowed_columns)
+            if isinstance(node.op, ast.Not):
+                return self._add(("not", operand), ("call", np.logical_not, (operand,)))
+            if isinstance(node.op, ast.USub):
+                return self._add(("neg", operand), ("call", np.negative, (operand,)))
+
+        if isinstance(node, ast.BoolOp) and type(node.op) in _BOOL_OPS:
+            name, fn = _BOOL_OPS[type(node.op)]
+            slot = self._compile(node.values[0], allowed_columns)
+            for value in node.values[1:]:
+                other = self._compile(value, allowed_columns)
+                left, right = sorted((slot, other))
+                slot = self._add((name, left, right), ("call", fn, (left, right)))
+            return slot
+
+        if isinstance(node, ast.Compare):
+            # Verkettete Vergleiche (a < b < c) werden als (a < b) and (b < c) aufgelöst
+            slots = []
+            left = node.left
+            for op, right in zip(node.ops, node.comparators):
+                slots.append(self._comparison(op, left, right, allowed_columns))
+                left = right
+            slot = slots[0]
+            for other in slots[1:]:
+                a, b = sorted((slot, other))
+                slot = self._add(("and", a, b), ("call", np.logical_and, (a, b)))
+            return slot
+
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+                and node.func.id == "abs" and len(node.args) == 1 and not node.keywords):
+            operand = self._compile(node.args[0], allowed_columns)
+            return self._add(("abs", operand), ("call", np.abs, (operand,)))
+
+        raise ValueError(f"nicht unterstützter Ausdruck: {ast.unparse(node)}")
+
+    def _binary(self, name, fn, commutative, left, right, allowed_columns):
+        a = self._compile(left, allowed_columns)
+        b = self._compile(right, allowed_columns)
+        if commutative:
+            a, b = sorted((a, b))
+        return self._add((name, a, b), ("call", fn, (a, b)))
+
+    def _comparison(self, op, left, right, allowed_columns):
+        if isinstance(op, (ast.In, ast.NotIn)):
+            if not isinstance(right, (ast.List, ast.Tuple, ast.Set)):
+                raise ValueError("'in' erwartet eine Liste von Konstanten")
+            values = []
+            for element in right.elts:
+                if not isinstance(element, ast.Constant):
+                    raise ValueError("'in' erwartet eine Liste von Konstanten")
+                values.append(element.value)
+            return self._membership(left, values, isinstance(op, ast.NotIn), allowed_columns)
+
+        if isinstance(op, (ast.Eq, ast.NotEq)):
+            # Vergleich mit Text (type == 'TRANSFER') wie "in" mit einem Element: nutzt den
+            # Kategorien-Pfad von isin und teilt sich den Slot mit type in ['TRANSFER']
+            for text, operand in ((right, left), (left, right)):
+                if isinstance(text, ast.Constant) and isinstance(text.value, str):
+                    return self._membership(operand, [text.value], isinstance(op, ast.NotEq), allowed_columns)
+
+        if type(op) not in _COMPARE_OPS:
+            raise ValueError(f"nicht unterstützter Vergleich: {type(op).__name__}")
+        name, fn, commutative = _COMPARE_OPS[type(op)]
+        return self._binary(name, fn, commutative, left, right, allowed_columns)
+
+    def _membership(self, left, values, negate, allowed_columns):
+        operand = self._compile(left, allowed_columns)
+        slot = self._add(("in", operand, tuple(sorted(map(repr, values)))), ("isin", operand, tuple(values)))
+        if negate:
+            slot = self._add(("not", slot), ("call", np.logical_not, (slot,)))
+        return slot
+
+    def evaluate(self, data):
+        """
+        Wertet den Plan auf einem DataFrame (spaltenweise) oder einer einzelnen Zeile aus.
+        Gibt eine Liste boolescher Masken in Regel-Reihenfolge zurück.
+        """
+        values = [None] * len(self._ops)
+        series = {}
+        for slot, op in enumerate(self._ops):
+            kind = op[0]
+            if kind == "const":
+                values[slot] = op[1]
+            elif kind == "col":
+                column = data[op[1]]
+                if isinstance(column, pd.Series):
+                    series[slot] = column
+                    column = column.to_numpy()
+                values[slot] = column
+            elif kind == "isin":
+                operand = op[1]
+                if operand in series:
+                    values[slot] = series[operand].isin(op[2]).to_numpy()
+                elif np.ndim(values[operand]) == 0:
+                    values[slot] = values[operand] in op[2]
+                else:
+                    values[slot] = np.isin(values[operand], op[2])
+            else:
+                values[slot] = op[1](*(values[arg] for arg in op[2]))
+        return [values[slot] for slot in self.rule_slots]
+
+
+class RuleRegistry:
+    """Hält einen validierten Regelsatz samt kompiliertem Auswertungsplan."""
+
+    def __init__(self, config):
+        self.config = config
+        self.plan = EvaluationPlan(config.rules, config.params)
+
+    @classmethod
+    def from_file(cls, path=None, **param_overrides):
+        """Lädt einen Regelsatz aus einer JSON-Datei (Standard: config/rules.json)."""
+        with open(path or DEFAULT_RULES_PATH, encoding="utf-8") as f:
+            config = RuleSetConfig.model_validate(json.load(f))
+        if param_overrides:
+            config = config.model_copy(update={"params": {**config.params, **param_overrides}})
+        return cls(config)
+
+    @property
+    def flags(self):
+        """Alle Flags in Bit-Reihenfolge: zuerst die zeilenweisen, dann die zustandsbehafteten Regeln."""
+        return [rule.flag for rule in self.config.rules + self.config.stateful_rules]
+
+    @property
+    def stateful_offset(self):
+        """Bit-Position der ersten zustandsbehafteten Regel."""
+        return len(self.config.rules)
+
+    @property
+    def flag_dtype(self):
+        """Kleinster vorzeichenloser Integer-Typ, der ein Bit je Regel aufnimmt."""
+        for dtype in (np.uint8, np.uint16, np.uint32, np.uint64):
+            if len(self.flags) <= np.iinfo(dtype).bits:
+                return np.dtype(dtype)
+
+    def flag_bit(self, flag):
+        """Bitmaske eines Flags, z.B. flag_bit("INTEGRITY_ERROR") -> 0b100."""
+        try:
+            return 1 << self.flags.index(flag)
+        except ValueError:
+            raise KeyError(f"Unbekanntes Flag '{flag}', bekannt: {self.flags}") from None
+
+    def flag_label(self, code):
+        """Klartext eines einzelnen Bitmusters (", "-getrennt, "CLEAN" ohne Treffer)."""
+        code = int(code)
+        return ", ".join(flag for bit, flag in enumerate(self.flags) if code & (1 << bit)) or "CLEAN"
+
+    def decode_flags(self, codes):
+        """Dekodiert eine Flag-Spalte in Klartext; jedes Bitmuster wird nur einmal übersetzt."""
+        codes = np.asarray(codes)
+        if codes.size == 0:
+            return np.empty(0, dtype=object)
+        if codes.dtype.itemsize <= 2:
+            present = np.flatnonzero(np.bincount(codes.astype(np.int64)))
+            table = np.empty(present[-1] + 1, dtype=object)
+            table[present] = [self.flag_label(code) for code in present]
+            return table[codes]
+        unique_codes, inverse = np.unique(codes, return_inverse=True)
+        return np.array([self.flag_label(code) for code in unique_codes], dtype=object)[inverse.reshape(-1)]
+
+    @property
+    def weights(self):
+        return np.array([rule.weight for rule in self.config.rules + self.config.stateful_rules], dtype=np.int64)
+
+    @property
+    def score_range(self):
+        """Kleinster und größter erreichbarer risk_score (alle negativen bzw. positiven Gewichte)."""
+        weights = self.weights
+        return int(weights[weights < 0].sum()), int(weights[weights > 0].sum())
+
+    @property
+    def high_confidence_score(self):
+        return self.config.high_confidence_score
+
+    def risk_levels(self, scores):
+        """Ordnet Scores den konfigurierten Risikostufen zu (höchste zuerst)."""
+        levels = np.full(np.shape(scores), self.config.default_level, dtype=object)
+        assigned = np.zeros(np.shape(scores), dtype=bool)
+        for level in self.config.risk_levels:
+            hit = (scores >= level.min_score) & ~assigned
+            levels[hit] = level.name
+            assigned |= hit
+        return levels
+
+    def risk_level(self, score):
+        for level in self.config.risk_levels:
+            if score >= level.min_score:
+                return level.name
+        return self.config.default_level
+
+
+def load_rules(path=None, **param_overrides):
+    """Kurzform für RuleRegistry.from_file."""
+    return RuleRegistry.from_file(path, **param_overrides)
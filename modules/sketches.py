@@ -0,0 +1,345 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from modules.instrumentation import timed
+
+# 2^12 Register je HyperLogLog: 4 KiB, Standardfehler 1,04 / sqrt(4096) = 1,6 %
+HLL_PRECISION = 12
+# Einträge je Space-Saving-Zusammenfassung (je Step bzw. Block und Kennzahl)
+TOP_K = 200
+# Größter Block der Top-Empfänger-Zusammenfassungen: 2^9 = 512 Steps
+MAX_BLOCK_LEVEL = 9
+
+
+def _unique_values(series):
+    """Codes und verschiedene Werte einer Spalte (kategoriale Spalten über ihre Codes)."""
+    codes, uniques = pd.factorize(series)
+    return codes, np.asarray(uniques, dtype=object)
+
+def _unique_hashes(series):
+    """64-Bit-Hashes der verschiedenen Werte einer Spalte (nur für HyperLogLog benötigt)."""
+    return pd.util.hash_array(_unique_values(series)[1], categorize=False)
+
+
+class HyperLogLog:
+    """
+    Schätzer für die Anzahl verschiedener Werte mit festem Speicher (2^p Byte).
+    Zwei Skizzen derselben Präzision werden per Register-Maximum vereinigt; da jeder Wert
+    nur einmal zählt, genügt es, je Batch die verschiedenen Werte einzuspeisen.
+    """
+
+    def __init__(self, p=HLL_PRECISION, registers=None):
+        self.p = p
+        self.registers = np.zeros(1 << p, dtype=np.uint8) if registers is None else registers
+
+    @staticmethod
+    def ranks(hashes, p=HLL_PRECISION):
+        """Register-Index (obere p Bit) und Rang (Position der ersten 1 im Rest) je Hash."""
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        index = (hashes >> np.uint64(64 - p)).astype(np.int64)
+        rest = hashes & np.uint64((1 << (64 - p)) - 1)
+        # frexp liefert die Bitlänge exakt (Werte < 2^53 sind als float64 exakt darstellbar)
+        bit_length = np.frexp(rest.astype(np.float64))[1]
+        return index, (64 - p - bit_length + 1).astype(np.uint8)
+
+    def add_hashes(self, hashes):
+        index, rank = self.ranks(hashes, self.p)
+        np.maximum.at(self.registers, index, rank)
+        return self
+
+    def add(self, values):
+        return self.add_hashes(_unique_hashes(values))
+
+    def merge(self, other):
+        if other.p != self.p:
+            raise ValueError(f"HyperLogLog-Präzisionen passen nicht zusammen ({self.p} vs. {other.p})")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def copy(self):
+        return HyperLogLog(self.p, self.registers.copy())
+
+    def estimate(self):
+        return estimate_cardinality(self.registers)
+
+def estimate_cardinality(registers):
+    """HLL-Schätzung aus den Registern (mit Linear Counting bei wenigen Werten)."""
+    m = registers.shape[-1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / np.ldexp(1.0, -registers.astype(np.int64)).sum(axis=-1)
+    zeros = (registers == 0).sum(axis=-1)
+    small = (raw <= 2.5 * m) & (zeros > 0)
+    with np.errstate(divide='ignore'):
+        linear = m * np.log(m / np.maximum(zeros, 1))
+    return np.where(small, linear, raw)
+
+
+class SpaceSaving:
+    """
+    Häufigste Werte (nach Anzahl oder Summe eines Gewichts) mit höchstens k Einträgen.
+    Je Eintrag werden Ober- und Untergrenze des wahren Werts geführt; für nicht enthaltene
+    Werte gilt wahrer Wert <= threshold. Zusammenfassungen sind mergeable: Blöcke werden
+    exakt verdichtet und mit merge_all zusammengeführt, die Schranken bleiben dabei gültig.
+    Rangfolge und Kürzung richten sich nach der Untergrenze (tatsächlich gezählter Anteil),
+    da sich die Schwellen vieler kleiner Blöcke sonst in der Obergrenze aufsummieren.
+    """
+
+    def __init__(self, k=TOP_K, labels=None, upper=None, lower=None, threshold=0.0):
+        self.k = k
+        self.labels = np.empty(0, dtype=object) if labels is None else labels
+        self.upper = np.empty(0, dtype=np.float64) if upper is None else upper
+        self.lower = np.empty(0, dtype=np.float64) if lower is None else lower
+        self.threshold = threshold
+
+    def __len__(self):
+        return len(self.labels)
+
+    @classmethod
+    def from_counts(cls, labels, weights, k=TOP_K):
+        """Exakte Zusammenfassung (Werte sind eindeutig), gekürzt auf die k größten."""
+        weights = np.asarray(weights, dtype=np.float64)
+        return cls._truncate(k, labels, weights, weights.copy(), 0.0)
+
+    @classmethod
+    def _truncate(cls, k, labels, upper, lower, threshold):
+        if len(labels) > k:
+            order = np.argsort(-lower, kind='stable')
+            # Werte ab Rang k+1 fallen heraus: ihre Obergrenze geht in die Schwelle ein
+            threshold = max(threshold, float(upper[order[k:]].max()))
+            keep = order[:k]
+            labels, upper, lower = labels[keep], upper[keep], lower[keep]
+        return cls(k, labels, upper, lower, threshold)
+
+    @classmethod
+    def merge_all(cls, summaries, k=None):
+        """Führt beliebig viele Zusammenfassungen in einem Schritt zusammen."""
+        summaries = [s for s in summaries if s is not None]
+        k = k or (summaries[0].k if summaries else TOP_K)
+        summaries = [s for s in summaries if len(s) or s.threshold]
+        if not summaries:
+            return cls(k)
+        if len(summaries) == 1:
+            s = summaries[0]
+            return cls._truncate(k, s.labels, s.upper, s.lower, s.threshold)
+
+        labels = np.concatenate([s.labels for s in summaries])
+        thresholds = np.concatenate([np.full(len(s), s.threshold) for s in summaries])
+        codes, uniques = pd.factorize(labels)
+        n = len(uniques)
+        upper = np.bincount(codes, np.concatenate([s.upper for s in summaries]), minlength=n)
+        lower = np.bincount(codes, np.concatenate([s.lower for s in summaries]), minlength=n)
+        # Fehlt ein Wert in einer Zusammenfassung, kann er dort höchstens deren Schwelle erreichen
+        total_threshold = float(sum(s.threshold for s in summaries))
+        upper += total_threshold - np.bincount(codes, thresholds, minlength=n)
+        return cls._truncate(k, np.asarray(uniques, dtype=object), upper, lower, total_threshold)
+
+    def add(self, values, weights=None):
+        """Verbucht einen Block (weights: z.B. Beträge; ohne Angabe wird gezählt)."""
+        codes, labels = _unique_values(values)
+        counts = np.bincount(codes, weights, minlength=len(labels))
+        merged = SpaceSaving.merge_all([self, SpaceSaving.from_counts(labels, counts, self.k)], self.k)
+        self.labels, self.upper, self.lower, self.threshold = merged.labels, merged.upper, merged.lower, merged.threshold
+        return self
+
+    def top(self, n=10):
+        """Die n größten Einträge mit gezähltem Wert (Untergrenze) und Obergrenze des wahren Werts."""
+        order = np.argsort(-self.lower, kind='stable')[:n]
+        return pd.DataFrame({"account": self.labels[order], "estimate": self.lower[order],
+                             "upper_bound": self.upper[order]})
+
+
+class AccountSketch:
+    """Konten-Kennzahlen eines Zeitraums, zusammengeführt aus den Skizzen je Step."""
+
+    def __init__(self, registers, fraud_rows, dest_count, dest_volume):
+        self._estimates = estimate_cardinality(registers)
+        self.union_estimate = float(estimate_cardinality(registers[:2].max(axis=0)))
+        self.fraud_rows = fraud_rows
+        self.dest_count = dest_count
+        self.dest_volume = dest_volume
+
+    @property
+    def distinct_origins(self):
+        return float(self._estimates[0])
+
+    @property
+    def distinct_destinations(self):
+        return float(self._estimates[1])
+
+    @property
+    def distinct_accounts(self):
+        """Verschiedene Konten als Auftraggeber oder Empfänger (Vereinigung beider Skizzen)."""
+        return self.union_estimate
+
+    @property
+    def fraud_accounts(self):
+        return float(self._estimates[2])
+
+    @property
+    def fraud_reuse(self):
+        """Auftritte je beteiligtem Konto in Betrugsfällen (1,0 = jedes Konto nur einmal)."""
+        return 2 * self.fraud_rows / self.fraud_accounts if self.fraud_accounts else 0.0
+
+    def as_dict(self):
+        return {"distinct_origins": self.distinct_origins, "distinct_destinations": self.distinct_destinations,
+                "distinct_accounts": self.distinct_accounts, "fraud_rows": self.fraud_rows,
+                "fraud_accounts": self.fraud_accounts, "fraud_reuse": self.fraud_reuse}
+
+
+def dyadic_blocks(a, b, max_level=MAX_BLOCK_LEVEL):
+    """
+    Zerlegt die Step-Positionen a..b-1 in ausgerichtete Blöcke (level, index) mit 2^level
+    Steps ab Position index * 2^level. Ein Zeitraum braucht höchstens 2 * max_level Blöcke
+    plus einen je 2^max_level Steps.
+    """
+    blocks = []
+    while a < b:
+        level = 0
+        while level < max_level and a % (2 << level) == 0 and a + (2 << level) <= b:
+            level += 1
+        blocks.append((level, a >> level))
+        a += 1 << level
+    return blocks
+
+
+class StepSketches:
+    """
+    Konten-Skizzen je Step: drei HyperLogLogs (Auftraggeber, Empfänger, Konten in
+    Betrugsfällen) als Register-Tabelle sowie je eine Space-Saving-Zusammenfassung der
+    Empfänger nach Anzahl und Volumen. Ein Zeitraum wird über das Register-Maximum und
+    merge_all der betroffenen Steps beantwortet, ohne die Rohdaten erneut zu lesen.
+    Speicher: 12 KiB Register plus 2 * k Einträge je Step.
+    Die Kürzung je Step verliert Konten, die erst über viele Steps häufig sind; für die
+    Top-Empfänger langer Zeiträume siehe AccountSketchCache (Blöcke über mehrere Steps).
+    """
+
+    SKETCHES = ("origins", "destinations", "fraud_accounts")
+
+    def __init__(self, min_step, max_step, p=HLL_PRECISION, k=TOP_K):
+        self.min_step = min_step
+        self.p = p
+        self.k = k
+        n = max(max_step - min_step + 1, 0)
+        self.registers = np.zeros((n, len(self.SKETCHES), 1 << p), dtype=np.uint8)
+        self.fraud_rows = np.zeros(n, dtype=np.int64)
+        self.dest_count = [None] * n
+        self.dest_volume = [None] * n
+
+    def _add_hll(self, i, sketch, hashes):
+        index, rank = HyperLogLog.ranks(hashes, self.p)
+        np.maximum.at(self.registers[i, sketch], index, rank)
+
+    @timed("stats.sketch_add", rows_arg=1)
+    def add(self, chunk):
+        """Verbucht einen Block (beliebig viele Steps, z.B. Batch aus dem DataStreamer)."""
+        if len(chunk) == 0:
+            return
+        steps = chunk['step'].to_numpy().astype(np.int64)
+        if not (steps[1:] >= steps[:-1]).all():
+            order = np.argsort(steps, kind='stable')
+            chunk, steps = chunk.iloc[order], steps[order]
+        bounds = np.flatnonzero(np.diff(steps)) + 1
+        for start, end in zip(np.concatenate([[0], bounds]), np.concatenate([bounds, [len(steps)]])):
+            self._add_step(int(steps[start]) - self.min_step, chunk.iloc[start:end])
+
+    def _add_step(self, i, rows):
+        self._add_hll(i, 0, _unique_hashes(rows['nameOrig']))
+        self._add_hll(i, 1, _unique_hashes(rows['nameDest']))
+
+        fraud = rows['isFraud'].to_numpy() == 1
+        if fraud.any():
+            self.fraud_rows[i] += int(fraud.sum())
+            frauds = rows[fraud]
+            self._add_hll(i, 2, _unique_hashes(frauds['nameOrig']))
+            self._add_hll(i, 2, _unique_hashes(frauds['nameDest']))
+
+        # Space-Saving je Step, ein Step kann auf mehrere Blöcke verteilt eintreffen
+        for store, weights in ((self.dest_count, None), (self.dest_volume, rows['amount'].to_numpy())):
+            if store[i] is None:
+                store[i] = SpaceSaving(self.k)
+            store[i].add(rows['nameDest'], weights)
+
+    def merge(self, other):
+        """Addiert die Skizzen eines anderen StepSketches mit gleichem Step-Bereich (z.B. aus Workern)."""
+        if other.min_step != self.min_step or other.registers.shape != self.registers.shape:
+            raise ValueError("StepSketches mit unterschiedlichem Aufbau lassen sich nicht zusammenführen")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        self.fraud_rows += other.fraud_rows
+        for store, others in ((self.dest_count, other.dest_count), (self.dest_volume, other.dest_volume)):
+            for i, summary in enumerate(others):
+                if summary is not None:
+                    store[i] = SpaceSaving.merge_all([store[i], summary], self.k)
+        return self
+
+    def positions(self, lo, hi):
+        """Positionen a..b-1 der Steps lo..hi (auf den vorhandenen Bereich begrenzt)."""
+        a = min(max(lo - self.min_step, 0), len(self.registers))
+        b = min(max(hi - self.min_step + 1, a), len(self.registers))
+        return a, b
+
+    def merged_registers(self, a, b):
+        if b > a:
+            return self.registers[a:b].max(axis=0)
+        return np.zeros(self.registers.shape[1:], dtype=np.uint8)
+
+    def range(self, lo, hi):
+        """Zusammengeführte Konten-Kennzahlen für lo <= step <= hi."""
+        a, b = self.positions(lo, hi)
+        return AccountSketch(self.merged_registers(a, b), int(self.fraud_rows[a:b].sum()),
+                             SpaceSaving.merge_all(self.dest_count[a:b], self.k),
+                             SpaceSaving.merge_all(self.dest_volume[a:b], self.k))
+
+
+class AccountSketchCache:
+    """
+    Konten-Skizzen eines DataStreamers, nur für tatsächlich angefragte Steps berechnet
+    (wie StepSummaryCache, aber unabhängig vom Regelsatz).
+    Die Top-Empfänger eines Zeitraums stammen aus ausgerichteten Blöcken von 2^level Steps:
+    Ebene 0 sind die Space-Saving-Zusammenfassungen je Step, jede höhere Ebene entsteht per
+    merge_all aus ihren beiden Hälften. Ein Zeitraum setzt sich aus wenigen Blöcken
+    zusammen, statt hunderte Zusammenfassungen je Step einzeln zu verschmelzen.
+    """
+
+    def __init__(self, streamer, p=HLL_PRECISION, k=TOP_K, max_level=MAX_BLOCK_LEVEL):
+        self.streamer = streamer
+        self.sketches = StepSketches(streamer.min_step, streamer.max_step, p, k)
+        self.covered = np.zeros(len(self.sketches.registers), dtype=bool)
+        self.max_level = max_level
+        # (level, index) -> (Anzahl, Volumen) als Space-Saving-Zusammenfassungen
+        self._blocks = {}
+        self._lock = threading.Lock()
+
+    def _block(self, level, index):
+        """Top-Empfänger (Anzahl, Volumen) des Blocks; höhere Ebenen entstehen nur per merge_all."""
+        if level == 0:
+            # Einzelne Steps: Space-Saving-Zusammenfassungen aus den Skizzen je Step
+            return self.sketches.dest_count[index], self.sketches.dest_volume[index]
+        summaries = self._blocks.get((level, index))
+        if summaries is None:
+            left, right = self._block(level - 1, 2 * index), self._block(level - 1, 2 * index + 1)
+            summaries = tuple(SpaceSaving.merge_all([a, b], self.sketches.k) for a, b in zip(left, right))
+            self._blocks[(level, index)] = summaries
+        return summaries
+
+    def range(self, lo, hi):
+        lo = max(lo, self.streamer.min_step)
+        hi = min(hi, self.streamer.max_step)
+        with self._lock:
+            if hi >= lo:
+                offset = self.streamer.min_step
+                missing = np.flatnonzero(~self.covered[lo - offset:hi - offset + 1])
+                if len(missing):
+                    # Nur den Bereich der fehlenden Steps lesen (ein Slice über den Step-Index)
+                    a, b = lo + int(missing[0]), lo + int(missing[-1])
+                    frame = self.streamer.get_step_range(a, b)
+                    steps = frame['step'].to_numpy()
+                    self.sketches.add(frame[~self.covered[steps - offset]])
+                    self.covered[a - offset:b - offset + 1] = True
+            a, b = self.sketches.positions(lo, hi)
+            blocks = [self._block(level, index) for level, index in dyadic_blocks(a, b, self.max_level)]
+            k = self.sketches.k
+            return AccountSketch(self.sketches.merged_registers(a, b), int(self.sketches.fraud_rows[a:b].sum()),
+                                 SpaceSaving.merge_all([count for count, _ in blocks], k),
+                                 SpaceSaving.merge_all([volume for _, volume in blocks], k))
@@ -1,21 +1,105 @@
 import numpy as np
 import pandas as pd
 
-def calculate_benfords_law(series):
-    """Prüft die Verteilung der ersten Ziffer gegen das Benford'sche Gesetz."""
-    # Erste Ziffer extrahieren (Nullen ignorieren)
-    first_digits = series[series > 0].astype(str).str[0].astype(int)
-    counts = first_digits.value_counts(normalize=True).sort_index()
-    
-    # Theoretische Benford-Verteilung
-    benford_probs = np.log10(1 + 1/np.arange(1, 10))
-    
+from modules.instrumentation import timed
+
+# Nigrini-Grenzwerte der mittleren absoluten Abweichung (MAD) je Test
+# (close / acceptable / marginal conformity, darüber: nonconformity)
+MAD_THRESHOLDS = {
+    1: (0.006, 0.012, 0.015),
+    2: (0.0012, 0.0018, 0.0022),
+}
+
+# Kritische Chi-Quadrat-Werte bei 5% Signifikanz (8 bzw. 89 Freiheitsgrade)
+CHI2_CRITICAL_5PCT = {1: 15.507, 2: 112.022}
+
+# Zehnerpotenzen als Lookup-Tabelle (bis 1e22 exakt darstellbar)
+_POW10 = 10.0 ** np.arange(309)
+
+def leading_digits(values, n_digits=1):
+    """
+    Erste n Ziffern positiver Beträge rein numerisch über log10/floor (ohne Strings).
+    Beträge unter 1 werden korrekt behandelt (0.5 -> 5, 0.042 -> 4 bzw. 42).
+    Nicht-positive Werte ergeben 0.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    digits = np.zeros(values.shape, dtype=np.int64)
+    positive = values > 0
+    v = values[positive]
+    # Skalierung mit exakten Zehnerpotenzen; der Zuschlag von wenigen ULP gleicht die
+    # Binärdarstellung dezimaler Beträge aus (0.29 * 100 = 28.999999999999996 -> 29)
+    shift = (n_digits - 1) - np.floor(np.log10(v)).astype(np.int64)
+    scaled = v * _POW10[np.clip(shift, 0, 308)] / _POW10[np.clip(-shift, 0, 308)]
+    scaled = scaled + 4 * np.spacing(scaled)
+    lead = np.floor(scaled)
+    # Rundungsfehler von log10 an Zehnerpotenzen korrigieren
+    upper, lower = 10 ** n_digits, 10 ** (n_digits - 1)
+    lead = np.where(lead >= upper, np.floor(lead / 10), lead)
+    lead = np.where(lead < lower, np.floor(scaled * 10), lead)
+    digits[positive] = lead
+    return digits
+
+@timed("stats.leading_digit_counts", rows_arg=0)
+def leading_digit_counts(values, n_digits=1, chunk_size=1_000_000):
+    """
+    Häufigkeit der ersten n Ziffern (Index = Ziffernfolge, z.B. 1..9 bzw. 10..99).
+    Arbeitet blockweise, damit der Speicherbedarf unabhängig von der Datenmenge bleibt.
+    """
+    values = np.asarray(values)
+    counts = np.zeros(10 ** n_digits, dtype=np.int64)
+    for start in range(0, len(values), chunk_size):
+        digits = leading_digits(values[start:start + chunk_size], n_digits)
+        counts += np.bincount(digits[digits > 0], minlength=10 ** n_digits)
+    return counts
+
+def benford_expected(n_digits=1):
+    """Theoretische Benford-Wahrscheinlichkeiten für die ersten n Ziffern."""
+    digits = np.arange(10 ** (n_digits - 1), 10 ** n_digits)
+    return digits, np.log10(1 + 1/digits)
+
+def benford_table(counts, n_digits=1):
+    """Benford-Tabelle (Ziffer / Tatsächlich / Benford) aus absoluten Ziffernhäufigkeiten."""
+    digits, expected = benford_expected(n_digits)
+    observed = np.asarray(counts, dtype=np.float64)[digits]
+    total = observed.sum()
     return pd.DataFrame({
-        'Ziffer': np.arange(1, 10),
-        'Tatsächlich': counts.reindex(range(1, 10), fill_value=0).values,
-        'Benford': benford_probs
+        'Ziffer': digits,
+        'Tatsächlich': observed / total if total > 0 else np.zeros(len(digits)),
+        'Benford': expected
     })
 
+def benford_conformity(counts, n_digits=1):
+    """
+    Konformitätstests gegen Benford: Chi-Quadrat (mit kritischem Wert bei 5%) und
+    MAD mit Einstufung nach Nigrini.
+    """
+    digits, expected = benford_expected(n_digits)
+    observed = np.asarray(counts, dtype=np.float64)[digits]
+    total = observed.sum()
+    if total == 0:
+        return {"n": 0, "chi2": 0.0, "dof": len(digits) - 1, "chi2_critical": CHI2_CRITICAL_5PCT[n_digits],
+                "chi2_reject": False, "mad": 0.0, "conformity": "keine Daten"}
+
+    chi2 = float(((observed - total * expected) ** 2 / (total * expected)).sum())
+    mad = float(np.abs(observed / total - expected).mean())
+    close, acceptable, marginal = MAD_THRESHOLDS[n_digits]
+    if mad <= close:
+        conformity = "close"
+    elif mad <= acceptable:
+        conformity = "acceptable"
+    elif mad <= marginal:
+        conformity = "marginal"
+    else:
+        conformity = "nonconformity"
+    return {"n": int(total), "chi2": chi2, "dof": len(digits) - 1, "chi2_critical": CHI2_CRITICAL_5PCT[n_digits],
+            "chi2_reject": chi2 > CHI2_CRITICAL_5PCT[n_digits], "mad": mad, "conformity": conformity}
+
+def calculate_benfords_law(series, n_digits=1):
+    """Prüft die Verteilung der ersten Ziffer (bzw. der ersten zwei Ziffern) gegen das Benford'sche Gesetz."""
+    # Erste Ziffer(n) numerisch extrahieren (Nullen und negative Beträge ignorieren)
+    counts = leading_digit_counts(series.to_numpy(), n_digits)
+    return benford_table(counts, n_digits)
+
 def get_benford_interpretation(benford_df):
     # Wir berechnen die Differenz zwischen Tatsächlich und Benford
     benford_df['diff'] = abs(benford_df['Tatsächlich'] - benford_df['Benford'])
@@ -29,29 +113,287 @@ def get_benford_interpretation(benford_df):
     else:
         return "🚨 **Hohe Anomalie:** Die Verteilung weicht massiv von der natürlichen Erwartung ab. Dies ist ein starkes Indiz für künstlich generierte Daten oder systematische Manipulation.", "error"
 
-def get_performance_report(analyzed_df):
-    """Vergleicht System-Warnungen mit der tatsächlichen Fraud-Spalte für zwei Szenarien."""
+def _scenario_masks(analyzed_df, high_confidence_score):
+    """Alarm-Masken der beiden Szenarien (Standard bzw. High Confidence)."""
+    # Szenario A: Standard (Medium & High)
+    standard_mask = analyzed_df['risk_level'].isin(['MEDIUM', 'HIGH'])
+
+    # Szenario B: High Confidence (Nur High Risk & Score >= high_confidence_score)
+    # Falls risk_score in analyzed_df existiert:
+    high_conf_mask = (analyzed_df['risk_level'] == 'HIGH') & (analyzed_df['risk_score'] >= high_confidence_score)
+
+    return {"standard": standard_mask, "high_confidence": high_conf_mask}
+
+@timed("stats.performance_report", rows_arg=0)
+def get_performance_report(analyzed_df, high_confidence_score=55):
+    """
+    Vergleicht System-Warnungen mit der tatsächlichen Fraud-Spalte für zwei Szenarien.
+    high_confidence_score kommt aus dem Regelsatz (ComplianceEngine.rules.high_confidence_score).
+    """
     
     actually_fraud = analyzed_df['isFraud'] == 1
 
     def calculate_metrics(detected_mask):
-        tp = len(analyzed_df[detected_mask & actually_fraud])
-        fp = len(analyzed_df[detected_mask & ~actually_fraud])
-        fn = len(analyzed_df[~detected_mask & actually_fraud])
+        # Zählen über die Masken, ohne gefilterte DataFrames aufzubauen
+        tp = int((detected_mask & actually_fraud).sum())
+        fp = int((detected_mask & ~actually_fraud).sum())
+        fn = int((~detected_mask & actually_fraud).sum())
         
         recall = tp / (tp + fn) if (tp + fn) > 0 else 0
         precision = tp / (tp + fp) if (tp + fp) > 0 else 0
         return {"tp": tp, "fp": fp, "fn": fn, "recall": recall, "precision": precision}
 
-    # Szenario A: Standard (Medium & High)
-    standard_mask = analyzed_df['risk_level'].isin(['MEDIUM', 'HIGH'])
-    
-    # Szenario B: High Confidence (Nur High Risk & Score >= 55)
-    # Falls risk_score in analyzed_df existiert:
-    high_conf_mask = (analyzed_df['risk_level'] == 'HIGH') & (analyzed_df['risk_score'] >= 55)
+    masks = _scenario_masks(analyzed_df, high_confidence_score)
 
     return {
-        "standard": calculate_metrics(standard_mask),
-        "high_confidence": calculate_metrics(high_conf_mask),
+        "standard": calculate_metrics(masks["standard"]),
+        "high_confidence": calculate_metrics(masks["high_confidence"]),
         "total_count": len(analyzed_df)
-    }
\ No newline at end of file
+    }
+
+
+def score_histograms(scores, is_fraud, score_min=0, n_bins=None):
+    """Häufigkeit je risk_score, getrennt nach Betrug und legitimen Transaktionen (Zeilen 0/1 = Betrug/legitim)."""
+    bins = np.asarray(scores, dtype=np.int64) - score_min
+    n_bins = n_bins or (int(bins.max()) + 1 if len(bins) else 1)
+    is_fraud = np.asarray(is_fraud) == 1
+    return np.stack([np.bincount(bins[is_fraud], minlength=n_bins),
+                     np.bincount(bins[~is_fraud], minlength=n_bins)])
+
+def sweep_from_histograms(histograms, score_min=0):
+    """
+    Precision, Recall und Alarmlast für jede Schwelle (Alarm bei risk_score >= threshold).
+    Die Kumulation von oben über die Score-Histogramme liefert alle Schwellen in einem Durchgang.
+    """
+    fraud_hist, clean_hist = np.asarray(histograms, dtype=np.int64)
+    # tp[i] = Betrugsfälle mit Score >= score_min + i
+    tp = np.cumsum(fraud_hist[::-1])[::-1]
+    fp = np.cumsum(clean_hist[::-1])[::-1]
+    total_fraud = int(fraud_hist.sum())
+    total = total_fraud + int(clean_hist.sum())
+    alerts = tp + fp
+    with np.errstate(divide='ignore', invalid='ignore'):
+        precision = np.where(alerts > 0, tp / alerts, 0.0)
+        recall = tp / total_fraud if total_fraud else np.zeros(len(tp))
+        alert_rate = alerts / total if total else np.zeros(len(tp))
+    return pd.DataFrame({
+        "threshold": np.arange(score_min, score_min + len(tp)),
+        "alerts": alerts, "tp": tp, "fp": fp, "fn": total_fraud - tp,
+        "precision": precision, "recall": recall, "alert_rate": alert_rate,
+    })
+
+@timed("stats.threshold_sweep", rows_arg=0)
+def threshold_sweep(analyzed_df, score_range=None):
+    """
+    Schwellen-Analyse über alle risk_score-Werte eines bewerteten DataFrames (eine Zeile je Schwelle).
+    score_range: (min, max) aus RuleRegistry.score_range, sonst 0 bis zum höchsten vorkommenden Score.
+    """
+    score_min, score_max = score_range or (0, None)
+    n_bins = None if score_max is None else score_max - score_min + 1
+    histograms = score_histograms(analyzed_df['risk_score'].to_numpy(), analyzed_df['isFraud'].to_numpy(),
+                                  score_min, n_bins)
+    return sweep_from_histograms(histograms, score_min)
+
+
+def _metrics_from_counts(tp, fp, fn):
+    recall = tp / (tp + fn) if (tp + fn) > 0 else 0
+    precision = tp / (tp + fp) if (tp + fp) > 0 else 0
+    return {"tp": tp, "fp": fp, "fn": fn, "recall": recall, "precision": precision}
+
+class StepSummary:
+    """
+    Vorberechnete Kennzahlen je Step mit Präfixsummen.
+    Jede Kennzahl ist über Steps summierbar; ein beliebiger Zeitraum wird daher mit
+    zwei Zeilen-Lookups statt eines Scans über die Rohdaten beantwortet.
+    """
+
+    FIRST_DIGITS = [f"d1_{d}" for d in range(1, 10)]
+    FIRST_TWO_DIGITS = [f"d2_{d}" for d in range(10, 100)]
+    SCENARIOS = ["standard", "high_confidence"]
+    FIELDS = (["rows", "fraud"] + FIRST_DIGITS + FIRST_TWO_DIGITS + ["liq_tp", "liq_fp"]
+              + [f"{s}_{m}" for s in SCENARIOS for m in ("tp", "fp", "fn")])
+
+    def __init__(self, min_step, table, score_hist=None, score_min=0):
+        """score_hist: optional (Steps, 2, Score-Werte) mit den Histogrammen aus score_histograms."""
+        self.min_step = min_step
+        self.max_step = min_step + len(table) - 1
+        self.table = table
+        # prefix[i] = Summe der Steps min_step .. min_step + i - 1
+        self.prefix = np.vstack([np.zeros((1, table.shape[1]), dtype=np.int64), np.cumsum(table, axis=0)])
+        self._col = {name: i for i, name in enumerate(self.FIELDS)}
+        self.score_min = score_min
+        self.score_hist = score_hist
+        if score_hist is not None:
+            self.score_prefix = np.concatenate(
+                [np.zeros((1,) + score_hist.shape[1:], dtype=np.int64), np.cumsum(score_hist, axis=0)])
+
+    def _bounds(self, lo, hi):
+        a = min(max(lo - self.min_step, 0), len(self.table))
+        b = min(max(hi - self.min_step + 1, a), len(self.table))
+        return a, b
+
+    def totals(self, lo, hi):
+        """Summe aller Kennzahlen für lo <= step <= hi als Dictionary."""
+        a, b = self._bounds(lo, hi)
+        row = self.prefix[b] - self.prefix[a]
+        return {name: int(row[i]) for name, i in self._col.items()}
+
+    def digit_counts(self, lo, hi, n_digits=1):
+        """Absolute Ziffernhäufigkeiten im Format von leading_digit_counts."""
+        t = self.totals(lo, hi)
+        counts = np.zeros(10 ** n_digits, dtype=np.int64)
+        for d in range(10 ** (n_digits - 1), 10 ** n_digits):
+            counts[d] = t[f"d{n_digits}_{d}"]
+        return counts
+
+    def benford(self, lo, hi, n_digits=1):
+        """Benford-Tabelle im Format von calculate_benfords_law."""
+        return benford_table(self.digit_counts(lo, hi, n_digits), n_digits)
+
+    def benford_conformity(self, lo, hi, n_digits=1):
+        return benford_conformity(self.digit_counts(lo, hi, n_digits), n_digits)
+
+    def liquidation(self, lo, hi):
+        """TP/FP der 100%-Liquidation-Regel und Abdeckung des Betrugs im Zeitraum."""
+        t = self.totals(lo, hi)
+        coverage = (t["liq_tp"] / t["fraud"]) * 100 if t["fraud"] > 0 else 0
+        return {"tp_count": t["liq_tp"], "fp_count": t["liq_fp"], "total_fraud": t["fraud"], "coverage": coverage}
+
+    def performance_report(self, lo, hi):
+        """Szenario-Vergleich im Format von get_performance_report."""
+        t = self.totals(lo, hi)
+        report = {s: _metrics_from_counts(t[f"{s}_tp"], t[f"{s}_fp"], t[f"{s}_fn"]) for s in self.SCENARIOS}
+        report["total_count"] = t["rows"]
+        return report
+
+    def threshold_sweep(self, lo, hi):
+        """Schwellen-Analyse im Format von threshold_sweep, aus den Score-Histogrammen je Step."""
+        if self.score_hist is None:
+            raise ValueError("StepSummary ohne Score-Histogramme")
+        a, b = self._bounds(lo, hi)
+        return sweep_from_histograms(self.score_prefix[b] - self.score_prefix[a], self.score_min)
+
+
+# Spalten, die StepSummaryBuilder.add neben den Regel-Spalten benötigt
+SUMMARY_COLUMNS = ['step', 'amount', 'oldbalanceOrg', 'isFraud']
+
+class StepSummaryBuilder:
+    """
+    Baut eine StepSummary inkrementell aus beliebig vielen Blöcken auf.
+    Der Speicherbedarf hängt nur von der Anzahl der Steps ab, nicht von der Datenmenge;
+    Teilergebnisse (z.B. aus mehreren Prozessen) lassen sich per merge() zusammenführen.
+    """
+
+    def __init__(self, engine, steps=None):
+        """steps: optional (lo, hi), um die Tabelle vorab für einen bekannten Step-Bereich anzulegen."""
+        self.engine = engine
+        self.min_step = None
+        self.table = np.zeros((0, len(StepSummary.FIELDS)), dtype=np.int64)
+        self._col = {name: i for i, name in enumerate(StepSummary.FIELDS)}
+        self.score_min, score_max = engine.rules.score_range
+        self.score_hist = np.zeros((0, 2, score_max - self.score_min + 1), dtype=np.int64)
+        if steps is not None and steps[1] >= steps[0]:
+            self._ensure_steps(*steps)
+
+    def _ensure_steps(self, lo, hi):
+        """Erweitert die Tabelle, falls ein Block neue Steps enthält."""
+        if self.min_step is None:
+            self.min_step = lo
+            self.table = np.zeros((hi - lo + 1, len(StepSummary.FIELDS)), dtype=np.int64)
+            self.score_hist = np.zeros((hi - lo + 1,) + self.score_hist.shape[1:], dtype=np.int64)
+            return
+        new_min = min(lo, self.min_step)
+        new_max = max(hi, self.min_step + len(self.table) - 1)
+        if new_min < self.min_step or new_max >= self.min_step + len(self.table):
+            offset = self.min_step - new_min
+            grown = np.zeros((new_max - new_min + 1, len(StepSummary.FIELDS)), dtype=np.int64)
+            grown[offset:offset + len(self.table)] = self.table
+            grown_hist = np.zeros((new_max - new_min + 1,) + self.score_hist.shape[1:], dtype=np.int64)
+            grown_hist[offset:offset + len(self.table)] = self.score_hist
+            self.min_step, self.table, self.score_hist = new_min, grown, grown_hist
+
+    @property
+    def columns(self):
+        """Spalten, die add() liest (Summary-Kennzahlen und Regel-Spalten des Regelsatzes)."""
+        return list(dict.fromkeys(SUMMARY_COLUMNS + self.engine.rules.plan.columns))
+
+    @timed("stats.summary_add", rows_arg=1)
+    def add(self, chunk, scored=None):
+        """Verbucht einen Block; scored (Ergebnis von engine.score) wird bei Bedarf berechnet und zurückgegeben."""
+        if len(chunk) == 0:
+            return scored
+        if scored is None:
+            scored = self.engine.score(chunk)
+
+        steps = chunk['step'].to_numpy().astype(np.int64)
+        self._ensure_steps(int(steps.min()), int(steps.max()))
+        step_idx = steps - self.min_step
+        n_steps = len(self.table)
+        table, col = self.table, self._col
+
+        def add(field, mask=None):
+            idx = step_idx if mask is None else step_idx[mask]
+            table[:, col[field]] += np.bincount(idx, minlength=n_steps)
+
+        amount = chunk['amount'].to_numpy()
+        old_org = chunk['oldbalanceOrg'].to_numpy()
+        fraud = chunk['isFraud'].to_numpy() == 1
+
+        add("rows")
+        add("fraud", fraud)
+
+        # Benford: Ziffernfolge je Zeile -> kombinierter Index (Step, Ziffern)
+        positive = amount > 0
+        for n_digits, first_field in ((1, "d1_1"), (2, "d2_10")):
+            digits = leading_digits(amount[positive], n_digits)
+            lower, width = 10 ** (n_digits - 1), 9 * 10 ** (n_digits - 1)
+            counts = np.bincount(step_idx[positive] * width + (digits - lower), minlength=n_steps * width)
+            table[:, col[first_field]:col[first_field] + width] += counts.reshape(n_steps, width)
+
+        # 100%-Liquidation-Regel
+        liquidation = (amount == old_org) & (old_org > 0)
+        add("liq_tp", liquidation & fraud)
+        add("liq_fp", liquidation & ~fraud)
+
+        # Szenario-Konfusionsmatrizen auf Basis des Scorings
+        masks = _scenario_masks(scored, self.engine.rules.high_confidence_score)
+        for scenario, mask in masks.items():
+            mask = np.asarray(mask)
+            add(f"{scenario}_tp", mask & fraud)
+            add(f"{scenario}_fp", mask & ~fraud)
+            add(f"{scenario}_fn", ~mask & fraud)
+
+        # Score-Histogramme je Step (Betrug/legitim) für die Schwellen-Analyse
+        n_bins = self.score_hist.shape[2]
+        bins = step_idx * n_bins + (scored['risk_score'].to_numpy().astype(np.int64) - self.score_min)
+        self.score_hist[:, 0] += np.bincount(bins[fraud], minlength=n_steps * n_bins).reshape(n_steps, n_bins)
+        self.score_hist[:, 1] += np.bincount(bins[~fraud], minlength=n_steps * n_bins).reshape(n_steps, n_bins)
+        return scored
+
+    def merge(self, other):
+        """Addiert die Zählwerte eines anderen Builders bzw. einer StepSummary."""
+        if other.min_step is None or len(other.table) == 0:
+            return self
+        self._ensure_steps(other.min_step, other.min_step + len(other.table) - 1)
+        offset = other.min_step - self.min_step
+        self.table[offset:offset + len(other.table)] += other.table
+        if other.score_hist is not None:
+            self.score_hist[offset:offset + len(other.table)] += other.score_hist
+        return self
+
+    def result(self):
+        if self.min_step is None:
+            return StepSummary(1, np.zeros((0, len(StepSummary.FIELDS)), dtype=np.int64),
+                               self.score_hist.copy(), self.score_min)
+        return StepSummary(self.min_step, self.table.copy(), self.score_hist.copy(), self.score_min)
+
+
+def build_step_summary(df, engine, chunk_rows=1_000_000):
+    """
+    Baut die StepSummary einmalig beim Laden (Scoring über den gesamten Datensatz).
+    Verarbeitet den DataFrame in Blöcken, damit die Zwischenergebnisse klein bleiben.
+    """
+    builder = StepSummaryBuilder(engine)
+    for start in range(0, len(df), chunk_rows):
+        builder.add(df.iloc[start:start + chunk_rows])
+    return builder.result()
@@ -0,0 +1,151 @@
+import numpy as np
+import pandas as pd
+
+# Bei Änderungen der Verteilungen erhöhen (Teil des Dateinamens in der Mess-Suite)
+GENERATOR_VERSION = 2
+
+# Spaltenreihenfolge des Kaggle-Exports
+PAYSIM_COLUMNS = ['step', 'type', 'amount', 'nameOrig', 'oldbalanceOrg', 'newbalanceOrig',
+                  'nameDest', 'oldbalanceDest', 'newbalanceDest', 'isFraud', 'isFlaggedFraud']
+
+# Randverteilungen des Originaldatensatzes (6,36 Mio. Zeilen, 743 Stunden):
+# Anteil je Typ sowie Median und Streuung der log-normalen Beträge
+TYPE_SHARES = {'CASH_OUT': 0.3517, 'PAYMENT': 0.3381, 'CASH_IN': 0.2199, 'TRANSFER': 0.0838, 'DEBIT': 0.0065}
+AMOUNT_MEDIAN = {'CASH_OUT': 147_072, 'PAYMENT': 9_482, 'CASH_IN': 143_427, 'TRANSFER': 486_308, 'DEBIT': 3_048}
+AMOUNT_SIGMA = {'CASH_OUT': 0.60, 'PAYMENT': 0.80, 'CASH_IN': 0.57, 'TRANSFER': 1.12, 'DEBIT': 1.08}
+OUTFLOW_TYPES = ('CASH_OUT', 'PAYMENT', 'TRANSFER', 'DEBIT')
+
+# Betrug (0,129 %) nur als TRANSFER auf ein Mittelskonto und anschließendes CASH_OUT,
+# jeweils in Höhe des gesamten Kontostands, gedeckelt wie in PaySim bei 10 Mio.
+FRAUD_RATE = 0.00129
+FRAUD_MEDIAN = 441_423
+FRAUD_SIGMA = 1.55
+FRAUD_CAP = 10_000_000
+
+# Beliebtheit der Zielkunden: Index = Bestand * u^DEST_SKEW (u gleichverteilt)
+DEST_SKEW = 1.5
+
+# Tagesgang: relatives Volumen je Stunde (nachts kaum Verkehr), ab Stunde 400 deutlich weniger
+HOUR_PROFILE = np.array([0.05, 0.02, 0.01, 0.01, 0.01, 0.02, 0.10, 0.45, 0.75, 0.95, 1.00, 1.00,
+                         1.00, 0.98, 0.95, 0.92, 0.90, 0.90, 0.95, 1.00, 0.90, 0.60, 0.35, 0.15])
+LATE_STEP, LATE_FACTOR = 400, 0.08
+
+
+def step_weights(steps=743):
+    """Relatives Transaktionsvolumen der Steps 1..steps."""
+    step = np.arange(1, steps + 1)
+    weights = HOUR_PROFILE[step % 24] * np.where(step > LATE_STEP, LATE_FACTOR, 1.0)
+    return weights / weights.sum()
+
+def rows_per_step(n_rows, steps=743, seed=0):
+    """Zeilen je Step (Summe n_rows), unabhängig von der späteren Blockgröße."""
+    rng = np.random.default_rng([seed, 0])
+    return rng.multinomial(n_rows, step_weights(steps))
+
+
+def _lognormal(rng, median, sigma, n):
+    return np.round(rng.lognormal(np.log(median), sigma, n), 2)
+
+def _names(prefix, ids):
+    return np.char.add(prefix, ids.astype(str)).astype(object)
+
+def _generate_step(step, n, n_rows, seed, fraud_rate):
+    """Zeilen eines Steps; jeder Step hat einen eigenen Zufallsstrom (seed, step)."""
+    rng = np.random.default_rng([seed, step])
+    types = np.array(list(TYPE_SHARES))[rng.choice(len(TYPE_SHARES), n, p=list(TYPE_SHARES.values()))]
+
+    amount = np.empty(n)
+    for kind in TYPE_SHARES:
+        mask = types == kind
+        amount[mask] = _lognormal(rng, AMOUNT_MEDIAN[kind], AMOUNT_SIGMA[kind], mask.sum())
+
+    # Ein Drittel der Auftraggeber ohne Guthaben, sonst log-normal um den Betrag herum
+    old_orig = np.where(rng.random(n) < 0.33, 0.0, _lognormal(rng, 60_000, 2.0, n))
+    outflow = np.isin(types, OUTFLOW_TYPES)
+    new_orig = np.round(np.where(outflow, np.maximum(old_orig - amount, 0.0), old_orig + amount), 2)
+
+    # Kunden (C) für alle Typen, Händler (M) als Ziel von Zahlungen (nahezu einmalig).
+    # Zielkunden stammen aus einem kleineren Bestand mit ungleicher Beliebtheit: wenige
+    # Konten empfangen sehr viele Überweisungen, die meisten nur eine oder zwei
+    customers = max(n_rows, 1_000)
+    name_orig = _names('C', rng.integers(1_000_000_000, 1_000_000_000 + customers, n))
+    payment = types == 'PAYMENT'
+    popular = (max(customers // 3, 1_000) * rng.random(n) ** DEST_SKEW).astype(np.int64)
+    dest_ids = 1_000_000_000 + np.where(payment, rng.integers(0, customers, n), popular)
+    name_dest = _names(np.where(payment, 'M', 'C'), dest_ids)
+
+    # Händlerkonten führen in PaySim keine Salden; bei Kunden fehlt die Historie teilweise
+    old_dest = np.where(payment | (rng.random(n) < 0.35), 0.0, _lognormal(rng, 550_000, 1.5, n))
+    new_dest = np.where(payment, 0.0,
+                        np.where(types == 'CASH_IN', np.maximum(old_dest - amount, 0.0), old_dest + amount))
+    new_dest = np.round(np.where(~payment & (rng.random(n) < 0.05), 0.0, new_dest), 2)
+
+    is_fraud = np.zeros(n, dtype=np.int8)
+    n_fraud = min(rng.binomial(n, fraud_rate), n)
+    if n_fraud:
+        # Paare TRANSFER -> CASH_OUT über dasselbe Mittelskonto, TRANSFER steht jeweils zuerst
+        positions = np.sort(rng.choice(n, n_fraud, replace=False))
+        n_pairs = n_fraud // 2
+        pairs = rng.permutation(positions[:2 * n_pairs]).reshape(-1, 2)
+        pairs.sort(axis=1)
+        transfers = np.concatenate([pairs[:, 0], positions[2 * n_pairs:]])
+        cashouts = pairs[:, 1]
+
+        fraud_amount = np.minimum(_lognormal(rng, FRAUD_MEDIAN, FRAUD_SIGMA, len(transfers)), FRAUD_CAP)
+        mules = _names('C', rng.integers(2_000_000_000, 2_100_000_000, len(transfers)))
+        types[transfers] = 'TRANSFER'
+        amount[transfers] = old_orig[transfers] = fraud_amount
+        new_orig[transfers] = 0.0
+        name_dest[transfers] = mules
+        # Die Hälfte der Betrugsziele ohne Salden (bekanntes PaySim-Artefakt)
+        empty_dest = rng.random(len(transfers)) < 0.5
+        old_dest[transfers] = np.where(empty_dest, 0.0, old_dest[transfers])
+        new_dest[transfers] = np.where(empty_dest, 0.0, old_dest[transfers] + fraud_amount)
+
+        types[cashouts] = 'CASH_OUT'
+        amount[cashouts] = old_orig[cashouts] = fraud_amount[:n_pairs]
+        new_orig[cashouts] = 0.0
+        name_orig[cashouts] = mules[:n_pairs]
+        is_fraud[positions] = 1
+
+    # isFlaggedFraud markiert in PaySim nur wenige Betrugs-TRANSFERs (Kappungsgrenze, leeres Ziel)
+    is_flagged = ((is_fraud == 1) & (types == 'TRANSFER') & (amount >= FRAUD_CAP)
+                  & (old_dest == 0)).astype(np.int8)
+
+    return pd.DataFrame({
+        'step': np.full(n, step, dtype=np.int64), 'type': types, 'amount': amount,
+        'nameOrig': name_orig, 'oldbalanceOrg': old_orig, 'newbalanceOrig': new_orig,
+        'nameDest': name_dest, 'oldbalanceDest': np.round(old_dest, 2), 'newbalanceDest': new_dest,
+        'isFraud': is_fraud, 'isFlaggedFraud': is_flagged
+    }, columns=PAYSIM_COLUMNS)
+
+
+def iter_paysim(n_rows, seed=0, steps=743, fraud_rate=FRAUD_RATE, chunk_rows=1_000_000):
+    """
+    Erzeugt einen synthetischen Datensatz im PaySim-Schema blockweise in Step-Reihenfolge.
+    Typ-Mix, Betragsverteilung, Tagesgang und Betrugsquote folgen dem Originaldatensatz.
+    Das Ergebnis hängt nur von n_rows, seed, steps und fraud_rate ab (nicht von chunk_rows),
+    die Blöcke halten den Speicherbedarf auch bei 50 Mio. Zeilen begrenzt.
+    """
+    pending, pending_rows = [], 0
+    for step, n in enumerate(rows_per_step(n_rows, steps, seed), start=1):
+        if n == 0:
+            continue
+        pending.append(_generate_step(step, int(n), n_rows, seed, fraud_rate))
+        pending_rows += n
+        if pending_rows >= chunk_rows:
+            yield pd.concat(pending, ignore_index=True)
+            pending, pending_rows = [], 0
+    if pending:
+        yield pd.concat(pending, ignore_index=True)
+
+def generate_paysim(n_rows, seed=0, steps=743, fraud_rate=FRAUD_RATE):
+    """Synthetischer PaySim-Datensatz als DataFrame (für kleine bis mittlere Größen)."""
+    chunks = list(iter_paysim(n_rows, seed, steps, fraud_rate))
+    return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=PAYSIM_COLUMNS)
+
+def write_paysim_csv(path, n_rows, seed=0, steps=743, fraud_rate=FRAUD_RATE, chunk_rows=1_000_000):
+    """Schreibt einen synthetischen Datensatz blockweise als CSV im Format des Kaggle-Exports."""
+    for i, chunk in enumerate(iter_paysim(n_rows, seed, steps, fraud_rate, chunk_rows)):
+        chunk.to_csv(path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+    return path
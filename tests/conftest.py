@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests laufen gegen das Projektverzeichnis (modules/ ist kein installiertes Paket)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.compliance_engine import ComplianceEngine, has_flag
+from modules.rule_registry import AccountStateConfig, RuleRegistry
+from modules.synthetic_data import generate_paysim
+
+CHAIN, FAN_IN, VELOCITY = "TRANSFER_CASHOUT_CHAIN", "FAN_IN", "VELOCITY_OUTFLOW"
+
+
+def _engine(**account_state):
+    rules = RuleRegistry.from_file()
+    if account_state:
+        config = rules.config.model_copy(update={
+            "account_state": AccountStateConfig(**{**rules.config.account_state.model_dump(), **account_state})})
+        rules = RuleRegistry(config)
+    return ComplianceEngine(rules=rules, stateful=True)
+
+def _tx(step, type_, amount, orig, dest):
+    # Salden konsistent und ungleich null, damit nur die zustandsbehafteten Regeln greifen
+    return {'step': step, 'type': type_, 'amount': amount, 'nameOrig': orig, 'oldbalanceOrg': amount + 100.0,
+            'newbalanceOrig': 100.0, 'nameDest': dest, 'oldbalanceDest': 1.0, 'newbalanceDest': 1.0 + amount,
+            'isFraud': 0}
+
+def _flags(engine, rows, flag):
+    result = engine.process_batch(pd.DataFrame(rows))
+    return has_flag(result, flag, engine.rules).tolist()
+
+
+def test_transfer_cashout_chain():
+    rows = [_tx(1, 'TRANSFER', 1_000.0, 'A', 'M'), _tx(2, 'CASH_OUT', 950.0, 'M', 'X')]
+    assert _flags(_engine(), rows, CHAIN) == [False, True]
+
+@pytest.mark.parametrize("cashout", [
+    _tx(2, 'CASH_OUT', 500.0, 'M', 'X'),     # deutlich weniger als eingegangen
+    _tx(30, 'CASH_OUT', 1_000.0, 'M', 'X'),  # später als chain_max_steps
+    _tx(2, 'CASH_OUT', 1_000.0, 'Z', 'X'),   # anderes Konto
+])
+def test_chain_requires_similar_amount_same_account_and_short_gap(cashout):
+    assert _flags(_engine(), [_tx(1, 'TRANSFER', 1_000.0, 'A', 'M'), cashout], CHAIN) == [False, False]
+
+def test_chain_split_across_batches():
+    engine = _engine()
+    assert _flags(engine, [_tx(1, 'TRANSFER', 1_000.0, 'A', 'M')], CHAIN) == [False]
+    assert _flags(engine, [_tx(3, 'CASH_OUT', 1_000.0, 'M', 'X')], CHAIN) == [True]
+
+
+def test_fan_in_from_min_count():
+    engine = _engine()
+    threshold = int(engine.rules.config.params["fan_in_min_count"])
+    rows = [_tx(1, 'TRANSFER', 10.0, f"O{i}", 'D') for i in range(threshold)]
+    assert _flags(engine, rows, FAN_IN) == [False] * (threshold - 1) + [True]
+
+def test_velocity_over_window():
+    engine = _engine()
+    limit = engine.rules.config.params["velocity_amount"]
+    rows = [_tx(1, 'CASH_OUT', limit * 0.6, 'A', 'X'), _tx(2, 'CASH_OUT', limit * 0.6, 'A', 'Y')]
+    assert _flags(engine, rows, VELOCITY) == [False, True]
+
+
+def test_ttl_expiry_drops_history():
+    engine = _engine(ttl_steps=5)
+    rows = [_tx(1, 'TRANSFER', 1_000.0, 'A', 'M')]
+    assert _flags(engine, rows, CHAIN) == [False]
+    # Nach Ablauf der TTL gilt M als neues Konto ohne offenen TRANSFER
+    assert _flags(engine, [_tx(10, 'CASH_OUT', 1_000.0, 'M', 'X')], CHAIN) == [False]
+    assert engine.account_state.expired >= 1
+
+def test_lru_eviction_drops_history():
+    rows = [_tx(1, 'TRANSFER', 1_000.0, 'A', 'M'),
+            _tx(1, 'TRANSFER', 5.0, 'B', 'C'),      # verdrängt A und M bei Kapazität 2
+            _tx(2, 'CASH_OUT', 1_000.0, 'M', 'X')]
+    small = _engine(capacity=2)
+    assert _flags(small, rows, CHAIN) == [False, False, False]
+    assert small.account_state.evicted >= 2
+    assert len(small.account_state) <= 2
+    assert _flags(_engine(), rows, CHAIN) == [False, False, True]
+
+def test_reset_state_forgets_accounts():
+    engine = _engine()
+    _flags(engine, [_tx(1, 'TRANSFER', 1_000.0, 'A', 'M')], CHAIN)
+    engine.reset_state()
+    assert len(engine.account_state) == 0
+    assert _flags(engine, [_tx(2, 'CASH_OUT', 1_000.0, 'M', 'X')], CHAIN) == [False]
+
+
+def test_row_wise_and_columnar_paths_agree_when_stateful():
+    df = generate_paysim(20_000, seed=13)
+    columnar, row_wise = _engine(), _engine()
+    results = {"columnar": [], "row_wise": []}
+    for start in range(0, len(df), 2_500):
+        batch = df.iloc[start:start + 2_500]
+        results["columnar"].append(columnar.process_batch(batch))
+        results["row_wise"].append(row_wise.process_batch(batch, vectorized=False))
+    a, b = (pd.concat(results[key]) for key in ("columnar", "row_wise"))
+    for col in ("risk_score", "risk_level", "flags"):
+        np.testing.assert_array_equal(a[col].to_numpy(), b[col].to_numpy())
+    # Die synthetischen Betrugspaare lösen die Kettenregel aus
+    assert has_flag(a, CHAIN, columnar.rules).any()
@@ -0,0 +1,58 @@
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from modules.audit_pipeline import run_chunked_audit
+from modules.compliance_engine import ComplianceEngine
+from modules.data_handler import DataStreamer
+from modules.stats_engine import build_step_summary
+from modules.synthetic_data import write_paysim_csv
+
+CHUNK_SIZE = 10_000
+SIZES = [20_000, 80_000, 320_000]
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return ComplianceEngine()
+
+
+@pytest.fixture(scope="module")
+def sources(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("paysim")
+    return {n: write_paysim_csv(str(directory / f"paysim-{n}.csv"), n, seed=11) for n in SIZES}
+
+
+def _audit_peak(path, engine, incidents_path):
+    streamer = DataStreamer(path, use_cache=False)
+    tracemalloc.start()
+    try:
+        result = run_chunked_audit(streamer, engine, chunk_size=CHUNK_SIZE, incidents_path=incidents_path)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, peak
+
+
+def test_peak_memory_bounded_by_chunk_size(sources, engine, tmp_path):
+    peaks = {}
+    for n, path in sources.items():
+        result, peaks[n] = _audit_peak(path, engine, str(tmp_path / f"incidents-{n}.csv"))
+        assert result["rows"] == n
+    # 16-fache Datenmenge, der Spitzenverbrauch darf dagegen kaum wachsen
+    assert peaks[SIZES[-1]] < 1.25 * peaks[SIZES[0]], peaks
+
+
+@pytest.mark.parametrize("n", SIZES[:2])
+def test_summary_matches_in_memory_build(sources, engine, n):
+    result = run_chunked_audit(DataStreamer(sources[n], use_cache=False), engine, chunk_size=CHUNK_SIZE)
+    streamer = DataStreamer(sources[n], use_cache=False)
+    streamer.load_data()
+    expected = build_step_summary(streamer.df, engine)
+
+    summary = result["summary"]
+    assert (summary.min_step, summary.max_step) == (expected.min_step, expected.max_step)
+    np.testing.assert_array_equal(summary.table, expected.table)
+    np.testing.assert_array_equal(summary.score_hist, expected.score_hist)
+    assert result["incidents"] == int((engine.score_batch(streamer.df)['risk_level'] == "HIGH").sum())
@@ -0,0 +1,47 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from modules.batch_audit import _audit_shard_task, audit_shard
+from modules.compliance_engine import ComplianceEngine
+from modules.data_handler import DataStreamer, load_columnar_rows
+from modules.stats_engine import StepSummaryBuilder
+from modules.synthetic_data import write_paysim_csv
+
+
+def test_shard_incidents_do_not_carry_account_dictionary(tmp_path):
+    source = write_paysim_csv(str(tmp_path / "paysim.csv"), 50_000, seed=3)
+    streamer = DataStreamer(source, cache_dir=str(tmp_path / "cache"))
+    streamer.load_data()
+    assert isinstance(streamer.df['nameDest'].dtype, pd.CategoricalDtype)
+
+    _, found, rows = audit_shard(streamer, ComplianceEngine(), 1, 100)
+    assert rows > 0 and len(found) > 0
+    assert not any(isinstance(dtype, pd.CategoricalDtype) for dtype in found.dtypes)
+    # Nutzlast wächst mit den Incidents, nicht mit der Zahl der Konten
+    assert len(pickle.dumps(found)) < 1_000 * len(found)
+
+
+def test_worker_task_reads_only_needed_columns_and_matches_in_process(tmp_path):
+    source = write_paysim_csv(str(tmp_path / "paysim.csv"), 50_000, seed=3)
+    streamer = DataStreamer(source, cache_dir=str(tmp_path / "cache"))
+    streamer.load_data()
+    engine = ComplianceEngine()
+    lo, hi = 20, 80
+    start, end = streamer.step_rows(lo, hi)
+
+    columns = StepSummaryBuilder(engine).columns
+    frame = load_columnar_rows(streamer.cache_dir, slice(start, end), columns)
+    assert set(frame.columns) == set(columns) and 'nameOrig' not in frame.columns
+    assert (frame.index == streamer.get_step_range(lo, hi).index).all()
+
+    summary, found, rows = _audit_shard_task((streamer.cache_dir, engine.rules.config.model_dump_json(),
+                                              lo, hi, start, end, 10_000, "HIGH"))
+    expected_summary, expected, expected_rows = audit_shard(streamer, engine, lo, hi, 10_000)
+    assert rows == expected_rows
+    np.testing.assert_array_equal(summary.table, expected_summary.table)
+    assert list(found.columns) == list(expected.columns)
+    assert (found.index == expected.index).all()
+    for col in found.columns:
+        assert (found[col].astype(str).to_numpy() == expected[col].astype(str).to_numpy()).all(), col
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.compliance_engine import ComplianceEngine, decode_flags
+from modules.synthetic_data import generate_paysim
+
+
+def original_check(row, threshold_high_amount=500000):
+    """Regelwerk der ursprünglichen zeilenweisen Prüfung (Referenz für die Parität)."""
+    score = 0
+    flags = []
+    if row['amount'] > threshold_high_amount:
+        score += 40
+        flags.append("HIGH_AMOUNT")
+    if row['amount'] == row['oldbalanceOrg'] and row['amount'] > 0:
+        score += 30
+        flags.append("FULL_BALANCE_TRANSFER")
+    expected_balance = row['oldbalanceOrg'] - row['amount']
+    if abs(expected_balance - row['newbalanceOrig']) > 0.01:
+        if row['type'] in ['TRANSFER', 'CASH_OUT']:
+            score += 20
+            flags.append("INTEGRITY_ERROR")
+    if row['oldbalanceDest'] == 0 and row['newbalanceDest'] == 0 and row['amount'] > 0:
+        score += 25
+        flags.append("ZERO_BALANCE_DESTINATION")
+    return {
+        "risk_score": score,
+        "risk_level": "HIGH" if score >= 50 else "MEDIUM" if score >= 20 else "LOW",
+        "flags": ", ".join(flags) if flags else "CLEAN"
+    }
+
+def _row(type_, amount, old_org, new_org, old_dest=1.0, new_dest=1.0):
+    return {'step': 1, 'type': type_, 'amount': amount, 'nameOrig': 'C1', 'oldbalanceOrg': old_org,
+            'newbalanceOrig': new_org, 'nameDest': 'C2', 'oldbalanceDest': old_dest,
+            'newbalanceDest': new_dest, 'isFraud': 0}
+
+EDGE_ROWS = pd.DataFrame([
+    _row('TRANSFER', 0.0, 0.0, 0.0),                       # amount == 0
+    _row('TRANSFER', 0.0, 0.0, 0.0, 0.0, 0.0),             # amount == 0 mit leerem Zielkonto
+    _row('TRANSFER', 500000.0, 600000.0, 100000.0),        # amount == Schwellenwert
+    _row('TRANSFER', 500000.01, 600000.0, 99999.99),       # knapp über dem Schwellenwert
+    _row('CASH_OUT', 50.0, 100.0, 50.0),                   # Saldo exakt
+    _row('CASH_OUT', 50.0, 100.0, 49.99),                  # Differenz genau 0,01 (Toleranz, kein Treffer)
+    _row('CASH_OUT', 50.0, 100.0, 49.989),                 # Differenz 0,011 (knapp über der Toleranz)
+    _row('CASH_IN', 50.0, 100.0, 10.0),                    # Inkonsistenz, aber kein Abgang
+    _row('PAYMENT', 75.0, 75.0, 0.0, 0.0, 0.0),            # Vollständige Leerung + leeres Ziel
+    _row('TRANSFER', 700000.0, 700000.0, 0.0, 0.0, 0.0),   # alle Regeln
+])
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return ComplianceEngine()
+
+@pytest.fixture(scope="module")
+def sample():
+    return pd.concat([generate_paysim(3_000, seed=7), EDGE_ROWS], ignore_index=True)
+
+@pytest.fixture(scope="module")
+def expected(sample):
+    return sample.apply(original_check, axis=1, result_type='expand')
+
+
+def test_score_batch_matches_original_rules(engine, sample, expected):
+    result = engine.score_batch(sample)
+    np.testing.assert_array_equal(result['risk_score'].to_numpy(), expected['risk_score'].to_numpy())
+    np.testing.assert_array_equal(result['risk_level'].to_numpy(dtype=object), expected['risk_level'].to_numpy())
+    np.testing.assert_array_equal(np.asarray(decode_flags(result['flags'], engine.rules), dtype=object),
+                                  expected['flags'].to_numpy())
+
+def test_check_transaction_matches_original_rules(engine, sample, expected):
+    for i, row in sample.iloc[-200:].iterrows():
+        result = engine.check_transaction(row)
+        assert result['risk_score'] == expected.at[i, 'risk_score']
+        assert result['risk_level'] == expected.at[i, 'risk_level']
+        assert decode_flags(pd.Series([result['flags']]), engine.rules)[0] == expected.at[i, 'flags']
+
+def test_edge_rows(engine):
+    labels = list(decode_flags(engine.score_batch(EDGE_ROWS)['flags'], engine.rules))
+    assert labels[0] == "CLEAN"
+    assert labels[1] == "CLEAN"
+    assert "HIGH_AMOUNT" not in labels[2]
+    assert "HIGH_AMOUNT" in labels[3]
+    assert labels[4] == "CLEAN"
+    assert labels[5] == "CLEAN"
+    assert labels[6] == "INTEGRITY_ERROR"
+    assert labels[7] == "CLEAN"
+
+def test_process_batch_paths_agree(engine, sample):
+    columnar = engine.process_batch(sample)
+    row_wise = engine.process_batch(sample.iloc[-500:], vectorized=False)
+    for column in ("risk_score", "risk_level", "flags"):
+        np.testing.assert_array_equal(columnar[column].iloc[-500:].to_numpy(), row_wise[column].to_numpy())
+
+@pytest.mark.parametrize("vectorized", [True, False])
+def test_process_batch_empty_frame(engine, sample, vectorized):
+    result = engine.process_batch(sample.iloc[:0], vectorized=vectorized)
+    assert len(result) == 0
+    assert list(result.columns[-3:]) == ["risk_score", "risk_level", "flags"]
+    assert result['flags'].dtype == engine.rules.flag_dtype
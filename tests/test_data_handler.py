@@ -0,0 +1,148 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from modules.data_handler import CACHE_VERSION, DataStreamer, cache_is_fresh, load_columnar_cache
+from modules.synthetic_data import generate_paysim, write_paysim_csv
+
+# Steps 20-29 fehlen in den Daten
+MISSING = range(20, 30)
+
+
+@pytest.fixture(scope="module", params=[True, False], ids=["cache", "csv"])
+def streamer(request, tmp_path_factory):
+    tmp_path = tmp_path_factory.mktemp("steps")
+    df = generate_paysim(20_000, seed=4, steps=60)
+    df = df[~df['step'].isin(MISSING)]
+    # Unsortiert ablegen, damit load_data den Step-Index selbst aufbauen muss
+    source = str(tmp_path / "paysim.csv")
+    df.sample(frac=1.0, random_state=0).to_csv(source, index=False)
+    streamer = DataStreamer(source, use_cache=request.param, cache_dir=str(tmp_path / "cache"))
+    streamer.load_data()
+    return streamer
+
+
+def _scan(streamer, lo, hi):
+    steps = streamer.df['step']
+    return streamer.df[(steps >= lo) & (steps <= hi)]
+
+
+def _assert_same(result, expected):
+    assert (result.index == expected.index).all()
+    for col in expected.columns:
+        # Cache-Spalten sind np.memmap, der Scan liefert Kopien
+        np.testing.assert_array_equal(np.asarray(result[col]), np.asarray(expected[col]))
+
+
+def test_step_index_covers_data(streamer):
+    assert (streamer.min_step, streamer.max_step) == (1, 60)
+    assert (np.diff(streamer.df['step'].to_numpy()) >= 0).all()
+    assert streamer.step_offsets[-1] == len(streamer.df)
+
+
+@pytest.mark.parametrize("lo, hi", [(1, 60), (5, 40), (25, 35), (-10, 3), (55, 1_000), (-5, 1_000)])
+def test_range_matches_boolean_scan(streamer, lo, hi):
+    _assert_same(streamer.get_step_range(lo, hi), _scan(streamer, lo, hi))
+
+
+@pytest.mark.parametrize("lo, hi", [(100, 200), (-20, -1), (0, 0), (61, 61)])
+def test_range_outside_data_is_empty(streamer, lo, hi):
+    assert len(streamer.get_step_range(lo, hi)) == 0
+
+
+def test_inverted_range_is_empty(streamer):
+    assert len(streamer.get_step_range(40, 10)) == 0
+    assert streamer.step_rows(40, 10) == (0, 0)
+
+
+def test_missing_steps(streamer):
+    assert len(streamer.get_step_range(MISSING.start, MISSING.stop - 1)) == 0
+    assert len(streamer.get_step_data(MISSING.start)) == 0
+    # Lücke innerhalb des Zeitraums: nur die vorhandenen Steps
+    result = streamer.get_step_range(18, 31)
+    assert set(result['step']) == {18, 19, 30, 31}
+    _assert_same(result, _scan(streamer, 18, 31))
+
+
+def test_single_step(streamer):
+    for step in (1, 17, 60):
+        result = streamer.get_step_data(step)
+        assert len(result) > 0 and (result['step'] == step).all()
+        _assert_same(result, _scan(streamer, step, step))
+        _assert_same(streamer.get_step_range(step, step), result)
+
+
+def test_empty_dataset(tmp_path):
+    source = str(tmp_path / "empty.csv")
+    generate_paysim(100, seed=1).iloc[:0].to_csv(source, index=False)
+    streamer = DataStreamer(source, use_cache=False)
+    streamer.load_data()
+    assert len(streamer.get_step_range(1, 743)) == 0
+    assert streamer.step_rows(1, 743) == (0, 0)
+
+
+# --- Spalten-Cache ---
+
+
+def _load(source, cache_dir):
+    streamer = DataStreamer(source, cache_dir=cache_dir)
+    streamer.load_data()
+    return streamer
+
+
+def test_cache_is_rebuilt_after_source_changes(tmp_path):
+    source, cache_dir = str(tmp_path / "paysim.csv"), str(tmp_path / "cache")
+    write_paysim_csv(source, 5_000, seed=1)
+    assert len(_load(source, cache_dir).df) == 5_000
+    assert cache_is_fresh(source, cache_dir)
+
+    write_paysim_csv(source, 6_000, seed=2)
+    assert not cache_is_fresh(source, cache_dir)
+    streamer = _load(source, cache_dir)
+    assert len(streamer.df) == 6_000
+    expected = generate_paysim(6_000, seed=2)
+    assert streamer.df['nameOrig'].astype(str).tolist() == expected['nameOrig'].tolist()
+    np.testing.assert_array_equal(streamer.df['amount'], expected['amount'])
+    assert cache_is_fresh(source, cache_dir)
+
+
+def test_cache_with_other_version_is_rebuilt(tmp_path):
+    source, cache_dir = str(tmp_path / "paysim.csv"), str(tmp_path / "cache")
+    write_paysim_csv(source, 2_000, seed=1)
+    _load(source, cache_dir)
+    meta_path = os.path.join(cache_dir, "meta.json")
+    with open(meta_path, encoding="utf-8") as f:
+        meta = json.load(f)
+    meta["version"] = CACHE_VERSION - 1
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+    assert not cache_is_fresh(source, cache_dir)
+    _load(source, cache_dir)
+    with open(meta_path, encoding="utf-8") as f:
+        assert json.load(f)["version"] == CACHE_VERSION
+
+
+def test_cache_without_source_is_reused(tmp_path):
+    source, cache_dir = str(tmp_path / "paysim.csv"), str(tmp_path / "cache")
+    write_paysim_csv(source, 2_000, seed=1)
+    before = _load(source, cache_dir).df
+    os.remove(source)
+    assert cache_is_fresh(source, cache_dir)
+    assert _load(source, cache_dir).df['nameDest'].tolist() == before['nameDest'].tolist()
+
+
+def test_unsorted_account_dictionary_is_rejected(tmp_path):
+    source, cache_dir = str(tmp_path / "paysim.csv"), str(tmp_path / "cache")
+    write_paysim_csv(source, 2_000, seed=1)
+    _load(source, cache_dir)
+    path = os.path.join(cache_dir, "accounts.npy")
+    accounts = np.load(path)
+    np.save(path, accounts[::-1])
+    with pytest.raises(ValueError):
+        load_columnar_cache(cache_dir)
+    np.save(path, np.concatenate([accounts[:1], accounts]))
+    with pytest.raises(ValueError):
+        load_columnar_cache(cache_dir)
@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.compliance_engine import ComplianceEngine
+from modules.incident_log import IncidentLog
+from modules.synthetic_data import generate_paysim
+
+
+@pytest.fixture(scope="module")
+def incidents():
+    analyzed = ComplianceEngine().process_batch(generate_paysim(20_000, seed=2))
+    found = analyzed[analyzed['risk_level'] != "LOW"].reset_index(drop=True)
+    assert len(found) > 100
+    return found.head(100)
+
+
+def assert_log_equals(log, expected):
+    view = log.view()
+    assert list(view.columns) == list(expected.columns)
+    assert len(view) == len(expected)
+    for col in expected.columns:
+        np.testing.assert_array_equal(np.asarray(view[col], dtype=object), np.asarray(expected[col], dtype=object))
+
+
+def test_re_appended_transactions_are_skipped(incidents):
+    log = IncidentLog()
+    assert log.append(incidents.iloc[:60]) == 60
+    assert log.append(incidents.iloc[:60]) == 0
+    # Überlappender Batch: nur die neuen Zeilen werden angehängt
+    assert log.append(incidents.iloc[40:80]) == 20
+    # Duplikat innerhalb eines Batches
+    assert log.append(pd.concat([incidents.iloc[80:90], incidents.iloc[85:95]])) == 15
+    assert_log_equals(log, incidents.iloc[:95])
+
+
+def test_identity_ignores_index_and_score_columns(incidents):
+    log = IncidentLog()
+    log.append(incidents.iloc[:10])
+    rescored = incidents.iloc[:10].assign(risk_score=0).set_axis(range(100, 110))
+    assert log.append(rescored) == 0
+    changed = incidents.iloc[:10].assign(amount=incidents['amount'].iloc[:10] + 1)
+    assert log.append(changed) == 10
+
+
+def test_buffers_grow_beyond_initial_capacity(incidents):
+    log = IncidentLog(initial_capacity=4)
+    for start in range(0, len(incidents), 7):
+        log.append(incidents.iloc[start:start + 7])
+    assert len(log) == len(incidents)
+    assert all(len(buffer.data) >= len(incidents) for buffer in log._columns.values())
+    assert_log_equals(log, incidents)
+    assert log.view()['amount'].dtype == incidents['amount'].dtype
+
+
+def test_categorical_batches_with_other_categories_fall_back_to_objects(incidents):
+    first = incidents.iloc[:5].astype({'nameDest': 'category'})
+    second = incidents.iloc[5:10].astype({'nameDest': 'category'})
+    log = IncidentLog(initial_capacity=2)
+    log.append(first)
+    assert isinstance(log.view()['nameDest'].dtype, pd.CategoricalDtype)
+    log.append(second)
+    assert log.view()['nameDest'].tolist() == incidents['nameDest'].iloc[:10].tolist()
+
+
+def test_version_and_view(incidents):
+    log = IncidentLog()
+    assert log.version == 0 and log.empty and log.view().empty
+    log.append(incidents.iloc[:10])
+    assert log.version == 1
+    view = log.view()
+    assert log.view() is view
+    with pytest.raises(ValueError):
+        view['amount'].to_numpy()[0] = 0.0
+
+    # Nur Duplikate oder leere Batches: keine neue Version, Sicht bleibt gültig
+    log.append(incidents.iloc[:10])
+    log.append(incidents.iloc[:0])
+    assert log.version == 1 and log.view() is view
+
+    log.append(incidents.iloc[10:20])
+    assert log.version == 2 and log.view() is not view
+    log.clear()
+    assert log.version == 3 and log.empty
+
+
+def test_journal_restores_log_after_restart(incidents, tmp_path):
+    path = str(tmp_path / "incidents" / "journal.csv")
+    log = IncidentLog(path=path)
+    log.append(incidents.iloc[:30])
+    log.append(incidents.iloc[20:50])
+    lines = sum(1 for _ in open(path))
+    assert lines == 1 + 50
+
+    restored = IncidentLog(path=path)
+    assert len(restored) == 50
+    assert restored.view()['amount'].tolist() == incidents['amount'].iloc[:50].tolist()
+    assert restored.view()['nameOrig'].tolist() == incidents['nameOrig'].iloc[:50].tolist()
+    # Das Journal kennt alle Transaktionen: erneutes Anhängen fügt nichts hinzu
+    assert restored.append(incidents.iloc[:50]) == 0
+    assert restored.append(incidents.iloc[45:60]) == 10
+    assert sum(1 for _ in open(path)) == 1 + 60
+
+    restored.clear()
+    assert IncidentLog(path=path).empty
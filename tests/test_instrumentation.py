@@ -0,0 +1,141 @@
+import json
+import threading
+
+import pytest
+
+from modules import instrumentation
+from modules.instrumentation import record, snapshot, stage, timed
+
+
+@pytest.fixture
+def enabled():
+    was_enabled = instrumentation.is_enabled()
+    instrumentation.set_enabled(True)
+    instrumentation.reset()
+    yield
+    instrumentation.reset()
+    instrumentation.set_enabled(was_enabled)
+
+
+def _stages():
+    return {r["stage"]: r for r in snapshot()}
+
+
+@timed("test.function", rows_arg=0)
+def _function(rows):
+    return rows
+
+@timed("test.result", rows_arg="result")
+def _result(n):
+    return list(range(n))
+
+class _Worker:
+    @timed("test.method", rows_arg=1)
+    def run(self, rows):
+        return len(rows)
+
+
+def test_disabled_records_nothing():
+    was_enabled = instrumentation.is_enabled()
+    instrumentation.set_enabled(False)
+    instrumentation.reset()
+    try:
+        assert _function([1, 2]) == [1, 2]
+        with stage("test.stage") as s:
+            s.rows = 10
+        assert snapshot() == []
+    finally:
+        instrumentation.set_enabled(was_enabled)
+
+
+def test_timed_counts_rows_by_argument_and_result(enabled):
+    _function([1, 2, 3])
+    _function([1])
+    _result(7)
+    _Worker().run([0] * 5)
+    _Worker().run(rows=[0] * 9)   # Schlüsselwort-Argument: keine Zeilen zuordenbar
+
+    stages = _stages()
+    assert (stages["test.function"]["count"], stages["test.function"]["rows"]) == (2, 4)
+    assert stages["test.result"]["rows"] == 7
+    assert (stages["test.method"]["count"], stages["test.method"]["rows"]) == (2, 5)
+    assert _function.__name__ == "_function"
+
+
+def test_stage_aggregates_repeated_measurements(enabled):
+    for rows in (100, 200, 300):
+        with stage("test.stage") as s:
+            s.rows = rows
+    with pytest.raises(RuntimeError):
+        with stage("test.stage", rows=50):
+            raise RuntimeError("Messung trotz Fehler")
+
+    s = _stages()["test.stage"]
+    assert s["count"] == 4 and s["rows"] == 650
+    assert s["total_ms"] >= s["max_ms"] >= s["mean_ms"] > 0
+    assert s["rows_per_s"] == pytest.approx(650 / (s["total_ms"] / 1000))
+
+
+def test_percentiles_come_from_log_buckets(enabled):
+    for _ in range(95):
+        record("test.latency", 0.001)
+    for _ in range(5):
+        record("test.latency", 0.5)
+
+    s = _stages()["test.latency"]
+    # Obere Grenze des Buckets, vier Buckets je Zehnerpotenz
+    assert 1.0 <= s["p50_ms"] <= 1.0 * 10 ** 0.25
+    assert 1.0 <= s["p95_ms"] <= 1.0 * 10 ** 0.25
+    assert s["p99_ms"] == pytest.approx(500.0)    # begrenzt auf das Maximum
+    assert s["max_ms"] == pytest.approx(500.0)
+    assert s["mean_ms"] == pytest.approx((95 * 1.0 + 5 * 500.0) / 100)
+    assert s["rows_per_s"] is None
+
+
+def test_extreme_latencies_fall_into_edge_buckets(enabled):
+    record("test.edges", 1e-9)
+    record("test.edges", 500.0)
+    s = _stages()["test.edges"]
+    assert s["p50_ms"] == pytest.approx(1e-3)     # unterste Grenze 1 µs
+    assert s["p99_ms"] == pytest.approx(500_000.0)
+
+
+def test_concurrent_records_are_not_lost(enabled):
+    def work():
+        for _ in range(1_000):
+            record("test.threads", 0.0001, rows=1)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    s = _stages()["test.threads"]
+    assert s["count"] == s["rows"] == 8_000
+
+
+def test_snapshot_reports_no_per_stage_memory(enabled):
+    record("test.a", 0.01)
+    assert not any("rss" in key for key in snapshot()[0])
+
+
+def test_jsonl_export(enabled, tmp_path):
+    record("test.b", 0.002, rows=10)
+    record("test.a", 0.001)
+
+    lines = [json.loads(line) for line in instrumentation.to_jsonl().splitlines()]
+    process, stages = lines[0], lines[1:]
+    assert "stage" not in process and "process_peak_rss_mb" in process
+    if process["process_peak_rss_mb"] is not None:
+        assert process["process_peak_rss_mb"] > 0
+    assert [line["stage"] for line in stages] == ["test.a", "test.b"]
+    assert all(line["ts"] == process["ts"] for line in stages)
+    assert stages[1]["rows"] == 10
+
+    path = str(tmp_path / "diag" / "diagnostics.jsonl")
+    instrumentation.export_jsonl(path)
+    instrumentation.export_jsonl(path)
+    with open(path, encoding="utf-8") as f:
+        exported = [json.loads(line) for line in f]
+    assert len(exported) == 2 * 3
+    assert sum("process_peak_rss_mb" in line for line in exported) == 2
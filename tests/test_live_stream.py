@@ -0,0 +1,25 @@
+from modules.compliance_engine import ComplianceEngine
+from modules.data_handler import StreamReplay
+from modules.live_stream import LiveStreamRuntime
+from modules.synthetic_data import generate_paysim
+
+DELAY = 0.02
+
+
+def _replay(rate=None):
+    df = generate_paysim(2_000, seed=5)
+    return StreamReplay(df, [(0, 100), (100, 200)], rate=rate, batch_size=10, seed=1)
+
+
+def test_delay_applies_to_replay_without_rate():
+    runtime = LiveStreamRuntime(ComplianceEngine(), delay=DELAY)
+    stats = runtime.run_sync(_replay())
+    assert stats["batches"] > 1
+    assert stats["elapsed_s"] >= stats["batches"] * DELAY
+
+
+def test_replay_with_rate_is_not_delayed_twice():
+    replay = _replay(rate=100_000)
+    runtime = LiveStreamRuntime(ComplianceEngine(), delay=1.0)
+    stats = runtime.run_sync(replay)
+    assert stats["elapsed_s"] < stats["batches"] * 1.0
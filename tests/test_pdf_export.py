@@ -0,0 +1,118 @@
+import re
+import zlib
+
+import pytest
+
+from modules.compliance_engine import ComplianceEngine
+from modules.pdf_export import ReportCache, generate_audit_pdf, report_key
+from modules.rule_registry import RuleRegistry
+from modules.stats_engine import get_performance_report
+from modules.synthetic_data import generate_paysim
+
+LIQ = {"tp_count": 12, "coverage": 80.0, "total_fraud": 15}
+STEPS = (1, 743)
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return ComplianceEngine()
+
+
+@pytest.fixture(scope="module")
+def analyzed(engine):
+    return engine.process_batch(generate_paysim(5_000, seed=6))
+
+
+@pytest.fixture(scope="module")
+def incidents(analyzed):
+    return analyzed[analyzed['risk_level'] != "LOW"].head(300).reset_index(drop=True)
+
+
+@pytest.fixture(scope="module")
+def stats(analyzed, engine):
+    return get_performance_report(analyzed, engine.rules.high_confidence_score)
+
+
+def _pdf_text(pdf_bytes):
+    """Text aller (komprimierten) Inhalts-Streams eines PDFs."""
+    text = []
+    for stream in re.findall(rb"stream\r?\n(.*?)\r?\nendstream", pdf_bytes, re.S):
+        try:
+            text.append(zlib.decompress(stream).decode("latin-1"))
+        except zlib.error:
+            continue
+    return "".join(re.findall(r"\((.*?)\) ?Tj", "\n".join(text)))
+
+
+def test_pdf_lists_all_incidents_without_limit(incidents, stats, engine):
+    pdf = generate_audit_pdf(incidents, stats, STEPS, LIQ, rules=engine.rules)
+    text = _pdf_text(pdf)
+    assert pdf.startswith(b"%PDF")
+    assert "Anhang" not in text
+    assert text.count(f"{incidents['amount'].iloc[-1]:,.2f}") >= 1
+
+
+def test_max_rows_truncates_and_notes_truncation(incidents, stats, engine):
+    full = generate_audit_pdf(incidents, stats, STEPS, LIQ, rules=engine.rules)
+    pdf = generate_audit_pdf(incidents, stats, STEPS, LIQ, rules=engine.rules, max_rows=10)
+    text = _pdf_text(pdf)
+    assert len(pdf) < len(full)
+    assert "4. Anhang: Verdichtung weiterer Incidents" in text
+    assert f"{len(incidents) - 10:,} von {len(incidents):,} Faellen" in text
+    assert "begrenzt auf 10 Faelle" in text
+
+    # Einzeln aufgeführt werden die Fälle mit dem höchsten Score
+    top = incidents.sort_values('risk_score', ascending=False, kind='stable').head(10)
+    for amount in top['amount']:
+        assert f"{amount:,.2f}" in text
+
+
+def test_max_rows_above_log_size_does_not_truncate(incidents, stats, engine):
+    text = _pdf_text(generate_audit_pdf(incidents, stats, STEPS, LIQ, rules=engine.rules,
+                                        max_rows=len(incidents)))
+    assert "Anhang" not in text
+
+
+def test_empty_log(incidents, stats, engine):
+    text = _pdf_text(generate_audit_pdf(incidents.iloc[:0], stats, STEPS, LIQ, rules=engine.rules, max_rows=10))
+    assert "Keine Live-Incidents aufgezeichnet." in text
+
+
+def test_report_key_changes_with_inputs(stats, engine):
+    base = report_key(3, STEPS, stats, LIQ, rules=engine.rules, max_rows=10)
+    assert base == report_key(3, list(STEPS), stats, dict(LIQ), rules=engine.rules, max_rows=10)
+
+    changed_stats = {**stats, "standard": {**stats["standard"], "tp": stats["standard"]["tp"] + 1}}
+    other_rules = RuleRegistry(engine.rules.config.model_copy(
+        update={"params": {**engine.rules.config.params, "threshold_high_amount": 1.0}}))
+    variants = [
+        report_key(4, STEPS, stats, LIQ, rules=engine.rules, max_rows=10),
+        report_key(3, (1, 742), stats, LIQ, rules=engine.rules, max_rows=10),
+        report_key(3, STEPS, changed_stats, LIQ, rules=engine.rules, max_rows=10),
+        report_key(3, STEPS, stats, {**LIQ, "tp_count": 13}, rules=engine.rules, max_rows=10),
+        report_key(3, STEPS, stats, LIQ, rules=other_rules, max_rows=10),
+        report_key(3, STEPS, stats, LIQ, rules=engine.rules, max_rows=11),
+    ]
+    assert len({base, *variants}) == len(variants) + 1
+
+
+def test_report_cache_returns_cached_bytes():
+    cache = ReportCache(maxsize=2)
+    calls = []
+
+    def build(name):
+        def _build():
+            calls.append(name)
+            return f"%PDF {name}".encode()
+        return _build
+
+    first = cache.get_or_build("a", build("a"))
+    assert cache.get_or_build("a", build("a-neu")) is first
+    assert calls == ["a"] and (cache.hits, cache.misses) == (1, 1)
+
+    cache.get_or_build("b", build("b"))
+    cache.get_or_build("a", build("a-neu"))   # "a" wird zuletzt genutzt, "b" ist ältester Eintrag
+    cache.get_or_build("c", build("c"))
+    assert cache.get_or_build("a", build("a-neu")) is first
+    cache.get_or_build("b", build("b"))
+    assert calls == ["a", "b", "c", "b"]
@@ -0,0 +1,119 @@
+import os
+
+import numpy as np
+import pytest
+
+from modules.compliance_engine import ComplianceEngine
+from modules.data_handler import DataStreamer
+from modules.result_cache import StepSummaryCache
+from modules.stats_engine import build_step_summary
+from modules.synthetic_data import write_paysim_csv
+
+
+@pytest.fixture(scope="module")
+def streamer(tmp_path_factory):
+    tmp_path = tmp_path_factory.mktemp("results")
+    source = write_paysim_csv(str(tmp_path / "paysim.csv"), 30_000, seed=9, steps=200)
+    streamer = DataStreamer(source, cache_dir=str(tmp_path / "cache"))
+    streamer.load_data()
+    return streamer
+
+
+def _engine(threshold):
+    return ComplianceEngine(threshold_high_amount=threshold)
+
+
+def assert_same_summary(summary, reference, lo, hi):
+    assert summary.totals(lo, hi) == reference.totals(lo, hi)
+    assert summary.threshold_sweep(lo, hi).equals(reference.threshold_sweep(lo, hi))
+
+
+def test_overlapping_ranges_score_only_new_steps(streamer):
+    engine = _engine(200_000)
+    cache = StepSummaryCache(streamer, chunk_rows=5_000)
+    cache.summary(engine, 1, 100)
+    assert (cache.scored_steps, cache.reused_steps) == (100, 0)
+
+    summary = cache.summary(engine, 50, 150)
+    assert (cache.scored_steps, cache.reused_steps) == (150, 51)
+    cache.summary(engine, 20, 80)
+    assert (cache.scored_steps, cache.reused_steps) == (150, 112)
+
+    # Lücke in der Mitte: 1-20 und 180-200 sind bekannt, nur 151-179 fehlen
+    cache.summary(engine, 180, 200)
+    cache.summary(engine, 1, 200)
+    assert cache.scored_steps == 150 + 21 + 29
+
+    reference = build_step_summary(streamer.get_step_range(1, 200), engine)
+    for lo, hi in [(1, 200), (50, 150), (151, 179), (7, 7)]:
+        assert_same_summary(cache.summary(engine, lo, hi), reference, lo, hi)
+
+
+def test_range_is_clamped_to_data(streamer):
+    engine = _engine(200_000)
+    cache = StepSummaryCache(streamer)
+    cache.summary(engine, -50, 10)
+    cache.summary(engine, 195, 1_000)
+    assert cache.scored_steps == 10 + 6
+    cache.summary(engine, 500, 600)
+    assert cache.scored_steps == 16
+
+
+def test_lru_evicts_least_recently_used_rule_set(streamer):
+    engines = [_engine(t) for t in (100_000, 200_000, 300_000)]
+    cache = StepSummaryCache(streamer, maxsize=2)
+    cache.summary(engines[0], 1, 10)
+    cache.summary(engines[1], 1, 10)
+    cache.summary(engines[0], 1, 10)            # engines[0] zuletzt genutzt
+    cache.summary(engines[2], 1, 10)            # verdrängt engines[1]
+    assert set(cache._entries) == {cache.key(engines[0]), cache.key(engines[2])}
+
+    scored = cache.scored_steps
+    cache.summary(engines[0], 1, 10)
+    assert cache.scored_steps == scored
+    # Ohne spill_dir muss der verdrängte Regelsatz neu bewertet werden
+    cache.summary(engines[1], 1, 10)
+    assert cache.scored_steps == scored + 10
+
+
+def test_spill_reloads_after_eviction_and_restart(streamer, tmp_path):
+    engines = [_engine(t) for t in (100_000, 200_000)]
+    spill_dir = str(tmp_path / "spill")
+    cache = StepSummaryCache(streamer, maxsize=1, spill_dir=spill_dir)
+    first = cache.summary(engines[0], 1, 60)
+    cache.summary(engines[1], 1, 60)
+    assert len(os.listdir(spill_dir)) == 2 and all(name.endswith(".npz") for name in os.listdir(spill_dir))
+
+    # Verdrängt, aber von der Platte geladen: nichts wird neu bewertet
+    scored = cache.scored_steps
+    assert_same_summary(cache.summary(engines[0], 1, 60), first, 1, 60)
+    assert cache.scored_steps == scored
+
+    # Neue Instanz (Neustart) setzt auf dem abgelegten Stand auf
+    restarted = StepSummaryCache(streamer, spill_dir=spill_dir)
+    restarted.summary(engines[0], 1, 100)
+    assert (restarted.scored_steps, restarted.reused_steps) == (40, 60)
+    reference = build_step_summary(streamer.get_step_range(1, 100), engines[0])
+    assert_same_summary(restarted.summary(engines[0], 1, 100), reference, 1, 100)
+
+
+def test_spill_with_other_layout_is_recomputed(streamer, tmp_path):
+    engine = _engine(200_000)
+    spill_dir = str(tmp_path / "spill")
+    cache = StepSummaryCache(streamer, spill_dir=spill_dir)
+    path = cache._spill_path(cache.key(engine))
+    os.makedirs(spill_dir)
+    np.savez(path, table=np.zeros((3, 3), dtype=np.int64), covered=np.ones(3, dtype=bool))
+
+    cache.summary(engine, 1, 20)
+    assert cache.scored_steps == 20
+    with np.load(path) as spilled:
+        assert spilled["covered"][:20].all() and not spilled["covered"][20:].any()
+
+
+def test_stateful_engine_is_rejected(streamer):
+    engine = ComplianceEngine(stateful=True)
+    if engine.account_state is None:
+        pytest.skip("Regelsatz ohne zustandsbehaftete Regeln")
+    with pytest.raises(ValueError):
+        StepSummaryCache(streamer).summary(engine, 1, 10)
@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.rule_registry import EvaluationPlan, RuleConfig, RuleRegistry, RuleSetConfig
+
+COLUMNS = ['step', 'type', 'amount', 'oldbalanceOrg', 'newbalanceOrig']
+FRAME = pd.DataFrame({
+    'step': [1, 2, 3, 4],
+    'type': pd.Categorical(['TRANSFER', 'CASH_OUT', 'PAYMENT', 'TRANSFER']),
+    'amount': [100.0, 50.0, 10.0, 0.0],
+    'oldbalanceOrg': [100.0, 80.0, 5.0, 0.0],
+    'newbalanceOrig': [0.0, 30.0, 0.0, 0.0],
+})
+
+
+def _rule(predicate, flag="R", columns=COLUMNS):
+    return RuleConfig(flag=flag, weight=1, columns=columns, predicate=predicate)
+
+def _plan(*predicates, params=None):
+    return EvaluationPlan([_rule(p, f"R{i}") for i, p in enumerate(predicates)], params or {"limit": 60.0})
+
+def _masks(predicate, params=None):
+    columnar = np.asarray(_plan(predicate, params=params).evaluate(FRAME)[0], dtype=bool)
+    row_wise = [bool(_plan(predicate, params=params).evaluate(row)[0]) for _, row in FRAME.iterrows()]
+    assert columnar.tolist() == row_wise
+    return columnar.tolist()
+
+
+def test_repeated_subexpressions_are_compiled_once():
+    first = "abs((oldbalanceOrg - amount) - newbalanceOrig) > 0.01"
+    second = "(oldbalanceOrg - amount) > 0"
+    both = _plan(first, second)
+    # Gemeinsam: Spalten oldbalanceOrg und amount sowie die Differenz
+    assert both.size == _plan(first).size + _plan(second).size - 3
+
+def test_commutative_operands_share_a_slot():
+    for first, second in [("amount + 1 > 0", "1 + amount > 0"),
+                          ("amount > 0 and step > 1", "step > 1 and amount > 0")]:
+        plan = _plan(first, second)
+        assert plan.rule_slots[0] == plan.rule_slots[1]
+        assert plan.size == _plan(first).size
+
+def test_params_are_inlined_as_constants():
+    assert _masks("amount > limit") == [True, False, False, False]
+
+
+@pytest.mark.parametrize("predicate, message", [
+    ("balance > 0", "unbekannter Name"),                     # keine Spalte und kein Parameter
+    ("amount.real > 0", "nicht unterstützter Ausdruck"),     # Attributzugriff
+    ("amount[0] > 0", "nicht unterstützter Ausdruck"),       # Subscript
+    ("(lambda: 1)() > 0", "nicht unterstützter Ausdruck"),
+    ("max(amount, 1) > 0", "nicht unterstützter Ausdruck"),  # nur abs() ist erlaubt
+    ("__import__('os') == 0", "nicht unterstützter Ausdruck"),
+    ("abs(amount, 1) > 0", "nicht unterstützter Ausdruck"),
+    ("amount ** 2 > 0", "nicht unterstützter Ausdruck"),
+    ("amount is None", "nicht unterstützter Vergleich"),
+    ("type < 'TRANSFER'", "nicht unterstützter Ausdruck"),   # Text nur in ==, != und in
+    ("amount + 'x' > 0", "nicht unterstützter Ausdruck"),
+    ("type in amount", "erwartet eine Liste"),
+    ("amount >", "ungültiges Prädikat"),
+])
+def test_rejects_disallowed_predicates(predicate, message):
+    with pytest.raises(ValueError, match=message) as info:
+        _plan(predicate)
+    assert "Regel R0" in str(info.value)
+
+def test_rejects_columns_not_declared_by_the_rule():
+    with pytest.raises(ValueError, match="unbekannter Name 'amount'"):
+        EvaluationPlan([_rule("amount > 0", columns=['step'])], {})
+
+
+def test_in_list_comparisons():
+    assert _masks("type in ['TRANSFER', 'CASH_OUT']") == [True, True, False, True]
+    assert _masks("type not in ['TRANSFER', 'CASH_OUT']") == [False, False, True, False]
+    assert _masks("step in [2, 4]") == [False, True, False, True]
+
+def test_string_equality():
+    assert _masks("type == 'TRANSFER'") == [True, False, False, True]
+    assert _masks("'TRANSFER' != type") == [False, True, True, False]
+    assert _masks("type == 'TRANSFER' and amount > 0") == [True, False, False, False]
+
+def test_string_equality_shares_slot_with_single_element_list():
+    plan = _plan("type == 'TRANSFER'", "type in ['TRANSFER']")
+    assert plan.rule_slots[0] == plan.rule_slots[1]
+
+
+def _registry(n_rules):
+    rules = [{"flag": f"R{i}", "weight": 1, "columns": ["amount"], "predicate": f"amount > {i}"}
+             for i in range(n_rules)]
+    return RuleRegistry(RuleSetConfig.model_validate(
+        {"rules": rules, "risk_levels": [{"name": "HIGH", "min_score": 1}]}))
+
+@pytest.mark.parametrize("n_rules, dtype", [(1, np.uint8), (8, np.uint8), (9, np.uint16), (16, np.uint16),
+                                            (17, np.uint32), (64, np.uint64)])
+def test_flag_dtype_grows_with_rule_count(n_rules, dtype):
+    registry = _registry(n_rules)
+    assert registry.flag_dtype == np.dtype(dtype)
+    assert registry.flag_bit(f"R{n_rules - 1}") == 1 << (n_rules - 1)
+
+def test_more_than_64_rules_rejected():
+    with pytest.raises(ValueError, match="Maximal 64"):
+        _registry(65)
+
+def test_duplicate_flags_rejected():
+    with pytest.raises(ValueError, match="Doppelte Flag-Namen"):
+        RuleSetConfig.model_validate({"rules": [_rule("amount > 0").model_dump()] * 2,
+                                      "risk_levels": [{"name": "HIGH", "min_score": 1}]})
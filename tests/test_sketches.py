@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.data_handler import DataStreamer
+from modules.sketches import HLL_PRECISION, AccountSketchCache, SpaceSaving, StepSketches, dyadic_blocks
+from modules.synthetic_data import write_paysim_csv
+
+# Drei Standardfehler des HyperLogLog (1,04 / sqrt(2^p))
+HLL_TOLERANCE = 3 * 1.04 / np.sqrt(1 << HLL_PRECISION)
+STEPS = (1, 300)
+
+
+@pytest.fixture(scope="module")
+def streamer(tmp_path_factory):
+    path = write_paysim_csv(str(tmp_path_factory.mktemp("paysim") / "paysim.csv"), 300_000, seed=21)
+    streamer = DataStreamer(path, use_cache=False)
+    streamer.load_data()
+    return streamer
+
+
+@pytest.fixture(scope="module")
+def frame(streamer):
+    return streamer.get_step_range(*STEPS)
+
+
+@pytest.fixture(scope="module")
+def accounts(streamer):
+    return AccountSketchCache(streamer).range(*STEPS)
+
+
+def _exact(frame):
+    names = frame[['nameOrig', 'nameDest']].astype(object)
+    fraud = names[frame['isFraud'].to_numpy() == 1]
+    by_dest = frame.assign(nameDest=names['nameDest']).groupby('nameDest')['amount']
+    return {
+        "distinct_origins": names['nameOrig'].nunique(),
+        "distinct_destinations": names['nameDest'].nunique(),
+        "distinct_accounts": pd.unique(names.to_numpy().ravel()).size,
+        "fraud_accounts": pd.unique(fraud.to_numpy().ravel()).size,
+    }, by_dest.size().astype(float), by_dest.sum()
+
+
+def test_distinct_counts_within_three_sigma(frame, accounts):
+    exact, _, _ = _exact(frame)
+    estimates = accounts.as_dict()
+    for key, value in exact.items():
+        assert abs(estimates[key] - value) / value < HLL_TOLERANCE, key
+
+
+@pytest.mark.parametrize("metric", ["dest_count", "dest_volume"])
+def test_top_destinations_bounds_hold(frame, accounts, metric):
+    _, count, volume = _exact(frame)
+    reference = count if metric == "dest_count" else volume
+    summary = getattr(accounts, metric)
+
+    true_values = reference.reindex(summary.labels).to_numpy()
+    assert np.all(summary.lower <= true_values + 1e-6)
+    assert np.all(true_values <= summary.upper + 1e-6)
+    # Space-Saving: jedes Konto oberhalb der Schwelle ist enthalten
+    assert set(reference[reference > summary.threshold + 1e-6].index) <= set(summary.labels)
+
+
+def test_account_heavy_in_every_step_survives_merges(tmp_path):
+    # Mittelskonto mit drei eingehenden Transaktionen je Step: je Step unauffällig, über
+    # den Zeitraum aber das mit Abstand häufigste Ziel
+    source = write_paysim_csv(str(tmp_path / "paysim.csv"), 100_000, seed=8)
+    df = pd.read_csv(source)
+    first_rows = df.groupby('step').head(3).index
+    df.loc[first_rows, 'nameDest'] = "C_MULE"
+    df.to_csv(source, index=False)
+    streamer = DataStreamer(source, use_cache=False)
+    streamer.load_data()
+
+    result = AccountSketchCache(streamer).range(*STEPS)
+    top = result.dest_count.top(3)
+    assert top['account'].iloc[0] == "C_MULE"
+    true_count = (streamer.get_step_range(*STEPS)['nameDest'] == "C_MULE").sum()
+    assert top['estimate'].iloc[0] <= true_count <= top['upper_bound'].iloc[0]
+
+def test_blocks_are_merged_from_their_halves(streamer):
+    cache = AccountSketchCache(streamer)
+    cache.range(1, 64)
+    a, b = cache.sketches.positions(1, 64)
+    assert (6, 0) in dyadic_blocks(a, b) and (6, 0) in cache._blocks
+    for metric in range(2):
+        parent = cache._blocks[(6, 0)][metric]
+        children = SpaceSaving.merge_all([cache._block(5, 0)[metric], cache._block(5, 1)[metric]], parent.k)
+        assert parent.labels.tolist() == children.labels.tolist()
+        np.testing.assert_array_equal(parent.lower, children.lower)
+        np.testing.assert_array_equal(parent.upper, children.upper)
+        assert parent.threshold == children.threshold
+
+
+def test_step_sketches_merge_matches_single_pass(frame, streamer):
+    single = StepSketches(streamer.min_step, streamer.max_step)
+    single.add(frame)
+    left = StepSketches(streamer.min_step, streamer.max_step)
+    right = StepSketches(streamer.min_step, streamer.max_step)
+    half = len(frame) // 2
+    left.add(frame.iloc[:half])
+    right.add(frame.iloc[half:])
+    left.merge(right)
+    np.testing.assert_array_equal(left.registers, single.registers)
+    assert left.range(*STEPS).as_dict() == single.range(*STEPS).as_dict()
+
+
+def test_dyadic_blocks_cover_range_exactly():
+    for a, b in [(0, 300), (3, 17), (0, 743), (5, 5), (511, 1024)]:
+        covered = []
+        for level, index in dyadic_blocks(a, b):
+            covered.extend(range(index << level, (index + 1) << level))
+        assert covered == list(range(a, b))
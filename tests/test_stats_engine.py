@@ -0,0 +1,180 @@
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.compliance_engine import ComplianceEngine
+from modules.stats_engine import (MAD_THRESHOLDS, benford_conformity, benford_expected, build_step_summary,
+                                  calculate_benfords_law, leading_digit_counts, leading_digits, score_histograms,
+                                  sweep_from_histograms, threshold_sweep)
+from modules.synthetic_data import generate_paysim
+
+
+def reference_digits(x, n_digits=1):
+    """Erste n signifikante Ziffern aus der kürzesten Dezimaldarstellung (repr) des Betrags."""
+    if not x > 0:
+        return 0
+    digits = "".join(map(str, Decimal(repr(float(x))).as_tuple().digits)).lstrip("0")
+    return int(digits[:n_digits].ljust(n_digits, "0"))
+
+def _amounts():
+    rng = np.random.default_rng(3)
+    return np.concatenate([
+        np.round(rng.lognormal(np.log(150_000), 2.0, 50_000), 2),   # Beträge im PaySim-Stil
+        np.round(rng.uniform(0, 1, 10_000), 2),                     # unter 1 (0.5 -> 5, 0.04 -> 4)
+        rng.uniform(0, 1e-3, 5_000),                                # sehr kleine Werte
+        [float(f"1e{k}") for k in range(-8, 16)],                   # exakte Zehnerpotenzen
+        [0.29, 0.1, 0.01, 9.99, 99.99, 99.995, 1e-300, 1.7e308, 123456789.12],
+    ])
+
+
+@pytest.mark.parametrize("n_digits", [1, 2])
+def test_kernel_matches_decimal_reference(n_digits):
+    values = _amounts()
+    expected = np.array([reference_digits(x, n_digits) for x in values])
+    np.testing.assert_array_equal(leading_digits(values, n_digits), expected)
+
+def test_amounts_below_one_and_powers_of_ten():
+    assert leading_digits([0.5, 0.042, 0.29], 1).tolist() == [5, 4, 2]
+    assert leading_digits([0.5, 0.042, 0.29], 2).tolist() == [50, 42, 29]
+    powers = np.array([float(f"1e{k}") for k in range(-5, 13)])
+    assert set(leading_digits(powers, 1)) == {1}
+    assert set(leading_digits(powers, 2)) == {10}
+
+def test_non_positive_values_are_ignored():
+    values = np.array([0.0, -12.5, np.nan, 3.0])
+    assert leading_digits(values).tolist() == [0, 0, 0, 3]
+    counts = leading_digit_counts(values)
+    assert counts.sum() == 1 and counts[3] == 1
+
+def test_counts_independent_of_chunk_size():
+    values = _amounts()
+    np.testing.assert_array_equal(leading_digit_counts(values, 2, chunk_size=997),
+                                  leading_digit_counts(values, 2))
+
+def test_benford_table_shares():
+    table = calculate_benfords_law(pd.Series(_amounts()), n_digits=2)
+    assert table['Ziffer'].tolist() == list(range(10, 100))
+    assert table['Tatsächlich'].sum() == pytest.approx(1.0)
+    assert table['Benford'].sum() == pytest.approx(1.0)
+
+
+def _counts_with_mad(mad, n_digits, total=10**9):
+    """Ziffernhäufigkeiten mit genau vorgegebener MAD (zwei Ziffern gegenläufig verschoben)."""
+    digits, expected = benford_expected(n_digits)
+    shares = expected.copy()
+    shift = mad * len(digits) / 2
+    shares[0] += shift
+    shares[-1] -= shift
+    counts = np.zeros(10 ** n_digits)
+    counts[digits] = shares * total
+    return counts
+
+@pytest.mark.parametrize("n_digits", [1, 2])
+def test_conformity_bands(n_digits):
+    close, acceptable, marginal = MAD_THRESHOLDS[n_digits]
+    for mad, label in [(0.0, "close"), (close * 0.9, "close"), ((close + acceptable) / 2, "acceptable"),
+                       ((acceptable + marginal) / 2, "marginal"), (marginal * 1.1, "nonconformity")]:
+        result = benford_conformity(_counts_with_mad(mad, n_digits), n_digits)
+        assert result["mad"] == pytest.approx(mad, abs=1e-9)
+        assert result["conformity"] == label, (mad, result)
+
+@pytest.mark.parametrize("n_digits, dof", [(1, 8), (2, 89)])
+def test_chi_square(n_digits, dof):
+    digits, expected = benford_expected(n_digits)
+    exact = np.zeros(10 ** n_digits)
+    exact[digits] = expected * 100_000
+    result = benford_conformity(exact, n_digits)
+    assert result["dof"] == dof
+    assert result["chi2"] == pytest.approx(0.0, abs=1e-9) and not result["chi2_reject"]
+
+    uniform = np.zeros(10 ** n_digits)
+    uniform[digits] = 1_000
+    result = benford_conformity(uniform, n_digits)
+    total = uniform.sum()
+    assert result["chi2"] == pytest.approx(((1_000 - total * expected) ** 2 / (total * expected)).sum())
+    assert result["chi2_reject"] and result["conformity"] == "nonconformity"
+
+def test_conformity_without_data():
+    result = benford_conformity(np.zeros(10))
+    assert result["n"] == 0 and result["conformity"] == "keine Daten" and not result["chi2_reject"]
+
+
+# --- Schwellen-Analyse ---
+
+def direct_metrics(scores, is_fraud, threshold):
+    """Precision/Recall einer Schwelle direkt aus der Alarm-Maske."""
+    alert = scores >= threshold
+    fraud = is_fraud == 1
+    tp, fp, fn = int((alert & fraud).sum()), int((alert & ~fraud).sum()), int((~alert & fraud).sum())
+    return {"alerts": tp + fp, "tp": tp, "fp": fp, "fn": fn,
+            "precision": tp / (tp + fp) if tp + fp else 0.0,
+            "recall": tp / (tp + fn) if tp + fn else 0.0}
+
+def assert_sweep_matches_masks(sweep, scores, is_fraud):
+    for row in sweep.itertuples():
+        expected = direct_metrics(scores, is_fraud, row.threshold)
+        for name in ("alerts", "tp", "fp", "fn"):
+            assert getattr(row, name) == expected[name], (row.threshold, name)
+        assert row.precision == pytest.approx(expected["precision"])
+        assert row.recall == pytest.approx(expected["recall"])
+        assert row.alert_rate == pytest.approx(expected["alerts"] / len(scores))
+
+
+@pytest.fixture(scope="module")
+def scored():
+    engine = ComplianceEngine()
+    df = generate_paysim(30_000, seed=11)
+    return engine, df, engine.process_batch(df)
+
+
+def test_sweep_matches_direct_masks(scored):
+    engine, _, analyzed = scored
+    sweep = threshold_sweep(analyzed, engine.rules.score_range)
+    lo, hi = engine.rules.score_range
+    assert sweep['threshold'].tolist() == list(range(lo, hi + 1))
+    assert_sweep_matches_masks(sweep, analyzed['risk_score'].to_numpy(), analyzed['isFraud'].to_numpy())
+
+
+def test_sweep_without_score_range_stops_at_highest_score(scored):
+    _, _, analyzed = scored
+    sweep = threshold_sweep(analyzed)
+    assert sweep['threshold'].iloc[-1] == analyzed['risk_score'].max()
+    assert_sweep_matches_masks(sweep, analyzed['risk_score'].to_numpy(), analyzed['isFraud'].to_numpy())
+
+
+def test_sweep_range_without_alerts():
+    scores = np.array([0, 5, 5, 10, 20])
+    is_fraud = np.array([0, 1, 0, 1, 0])
+    sweep = sweep_from_histograms(score_histograms(scores, is_fraud, -5, 41), -5)
+    assert_sweep_matches_masks(sweep, scores, is_fraud)
+
+    # Oberhalb des höchsten Scores gibt es keine Alarme: precision und recall 0, alle Betrugsfälle fn
+    empty = sweep[sweep['threshold'] > 20]
+    assert len(empty) == 15
+    assert (empty['alerts'] == 0).all() and (empty['precision'] == 0).all() and (empty['recall'] == 0).all()
+    assert (empty['fn'] == 2).all()
+    # Unterhalb des kleinsten Scores ist jede Transaktion ein Alarm
+    assert (sweep.loc[sweep['threshold'] <= 0, 'alerts'] == len(scores)).all()
+
+
+def test_sweep_without_fraud():
+    scores = np.array([0, 10, 30])
+    sweep = sweep_from_histograms(score_histograms(scores, np.zeros(3), 0, 31))
+    assert_sweep_matches_masks(sweep, scores, np.zeros(3))
+    assert (sweep['recall'] == 0).all() and (sweep['tp'] == 0).all()
+
+
+def test_step_summary_sweep_matches_direct_masks(scored):
+    engine, df, analyzed = scored
+    summary = build_step_summary(df, engine, chunk_rows=7_000)
+    for lo, hi in [(1, 743), (100, 180), (400, 400)]:
+        part = analyzed[(analyzed['step'] >= lo) & (analyzed['step'] <= hi)]
+        sweep = summary.threshold_sweep(lo, hi)
+        pd.testing.assert_frame_equal(sweep, threshold_sweep(part, engine.rules.score_range))
+        assert_sweep_matches_masks(sweep, part['risk_score'].to_numpy(), part['isFraud'].to_numpy())
+
+    # Zeitraum ohne Daten: keine Alarme bei keiner Schwelle
+    sweep = summary.threshold_sweep(900, 950)
+    assert (sweep['alerts'] == 0).all() and (sweep['precision'] == 0).all() and (sweep['recall'] == 0).all()